@@ -1,9 +1,12 @@
 """Alembic environment configuration."""
 
+import logging
+import time
 from logging.config import fileConfig
 
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
+from sqlalchemy import text
 
 from alembic import context
 
@@ -24,6 +27,8 @@ config.set_main_option("sqlalchemy.url", app_config.db_url)
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
 
+logger = logging.getLogger("alembic.env")
+
 # add your model's MetaData object here
 # for 'autogenerate' support
 target_metadata = Base.metadata
@@ -34,6 +39,54 @@ target_metadata = Base.metadata
 # ... etc.
 
 
+def include_name(name, type_, parent_names) -> bool:
+    """Limit autogenerate reflection to what the models define.
+
+    Filters before reflection runs, so autogenerate skips other schemas and
+    objects such as v_long_measurements instead of reflecting and
+    discarding them.
+    """
+    if type_ == "schema":
+        return name in (None, "public")
+    if type_ == "table":
+        return name in target_metadata.tables
+    return True
+
+
+_step_started = time.monotonic()
+
+
+def report_progress(ctx, step, heads, run_args) -> None:
+    """Log each applied revision and how long it took (on_version_apply hook)."""
+    global _step_started
+    now = time.monotonic()
+    logger.info(
+        "Applied %s (%.1fs), now at %s",
+        step, now - _step_started, ", ".join(heads) or "base"
+    )
+    _step_started = now
+
+
+def set_safe_session(connection) -> None:
+    """Apply bounded session timeouts to the migration connection.
+
+    Give up on locks instead of queueing behind (and blocking) live
+    traffic, bound runaway statements, and end sessions left idle inside a
+    transaction. Session-level, so they survive the per-migration commits.
+    """
+    settings = {
+        "lock_timeout": app_config.migration_lock_timeout,
+        "statement_timeout": app_config.migration_statement_timeout,
+        "idle_in_transaction_session_timeout": app_config.migration_idle_in_transaction_timeout,
+    }
+    for name, value in settings.items():
+        connection.execute(
+            text("SELECT set_config(:name, :value, false)"),
+            {"name": name, "value": value},
+        )
+    connection.commit()
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -52,6 +105,7 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        transaction_per_migration=True,
     )
 
     with context.begin_transaction():
@@ -72,8 +126,18 @@ def run_migrations_online() -> None:
     )
 
     with connectable.connect() as connection:
+        set_safe_session(connection)
+
+        # One transaction per revision, so autocommit_block() in a migration
+        # (needed for CREATE INDEX CONCURRENTLY) only commits that revision
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection,
+            target_metadata=target_metadata,
+            transaction_per_migration=True,
+            on_version_apply=report_progress,
+            # Autogenerate only; no effect on upgrade/downgrade
+            include_name=include_name,
+            compare_type=True,
         )
 
         with context.begin_transaction():
@@ -11,6 +11,9 @@ from alembic import op
 import sqlalchemy as sa
 from sqlalchemy.dialects import postgresql
 
+from metaloader.utils.bulk import batched_execute
+from metaloader.utils.migration import statement_timeout
+
 # revision identifiers, used by Alembic.
 revision: str = '003'
 down_revision: Union[str, None] = '002'
@@ -18,6 +21,50 @@ branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
+# Rows deleted per transaction when removing duplicate measurements
+DEDUPE_BATCH_SIZE = 10000
+
+
+def _delete_duplicate_measurements() -> None:
+    """Delete duplicate (sample_uid, feature_uid) measurements in batches.
+
+    Keeps the row with the highest id per pair. Duplicate ids are ranked once
+    into a temp table, then deleted in fixed-size slices, each committed on
+    its own so locks and WAL stay bounded.
+    """
+    op.execute("""
+        CREATE TEMP TABLE dup_measurement_ids AS
+        SELECT row_number() OVER () AS ix, id
+        FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY sample_uid, feature_uid ORDER BY id DESC
+            ) AS rn
+            FROM measurements
+            WHERE sample_uid IS NOT NULL AND feature_uid IS NOT NULL
+        ) ranked
+        WHERE rn > 1
+    """)
+    op.execute("CREATE INDEX ON dup_measurement_ids (ix)")
+
+    context = op.get_context()
+    if context.as_sql:
+        # Offline mode: no row counts to drive the loop
+        op.execute("DELETE FROM measurements m USING dup_measurement_ids d WHERE m.id = d.id")
+    else:
+        with context.autocommit_block():
+            batched_execute(
+                op.get_bind(),
+                "dup_measurement_ids",
+                "DELETE FROM measurements m USING dup_measurement_ids d "
+                "WHERE m.id = d.id AND {range}",
+                key="ix",
+                key_type="bigint",
+                batch_size=DEDUPE_BATCH_SIZE,
+            )
+
+    op.execute("DROP TABLE dup_measurement_ids")
+
+
 def upgrade() -> None:
     """Add new columns and constraints."""
     
@@ -26,30 +73,35 @@ def upgrade() -> None:
     
     # Add file_id to analyses table (FK to files)
     op.add_column('analyses', sa.Column('file_id', postgresql.UUID(as_uuid=True), nullable=True))
-    op.create_foreign_key(
-        'fk_analyses_file_id', 
-        'analyses', 
-        'files', 
-        ['file_id'], 
-        ['id'],
-        ondelete='SET NULL'
-    )
+    # NOT VALID skips the existing-row scan; validated below in its own
+    # transaction, which only needs SHARE UPDATE EXCLUSIVE
+    op.execute("""
+        ALTER TABLE analyses
+        ADD CONSTRAINT fk_analyses_file_id
+        FOREIGN KEY (file_id) REFERENCES files (id) ON DELETE SET NULL
+        NOT VALID
+    """)
     
     # Add unique constraint on measurements (sample_uid, feature_uid)
     # First, clean up any potential duplicates by keeping only the latest
+    _delete_duplicate_measurements()
+    
+    # Build the backing unique index concurrently, then attach it as the
+    # constraint; ADD CONSTRAINT ... USING INDEX only touches the catalog
+    with op.get_context().autocommit_block(), statement_timeout():
+        op.execute("""
+            CREATE UNIQUE INDEX CONCURRENTLY uq_measurement_sample_feature
+            ON measurements (sample_uid, feature_uid)
+        """)
+
     op.execute("""
-        DELETE FROM measurements m1
-        USING measurements m2
-        WHERE m1.id < m2.id
-        AND m1.sample_uid = m2.sample_uid
-        AND m1.feature_uid = m2.feature_uid
+        ALTER TABLE measurements
+        ADD CONSTRAINT uq_measurement_sample_feature
+        UNIQUE USING INDEX uq_measurement_sample_feature
     """)
-    
-    op.create_unique_constraint(
-        'uq_measurement_sample_feature',
-        'measurements',
-        ['sample_uid', 'feature_uid']
-    )
+
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE analyses VALIDATE CONSTRAINT fk_analyses_file_id")
 
 
 def downgrade() -> None:
@@ -11,6 +11,8 @@ from alembic import op
 import sqlalchemy as sa
 from sqlalchemy.dialects import postgresql
 
+from metaloader.utils.migration import statement_timeout
+
 # revision identifiers, used by Alembic.
 revision: str = '004'
 down_revision: Union[str, None] = '003'
@@ -26,26 +28,13 @@ def upgrade() -> None:
     op.add_column('measurements', sa.Column('col_index', sa.Integer(), nullable=True))
     op.add_column('measurements', sa.Column('replicate_ix', sa.SmallInteger(), nullable=True))
 
-    # Add FK constraint for file_id
-    op.create_foreign_key(
-        'fk_measurements_file_id',
-        'measurements',
-        'files',
-        ['file_id'],
-        ['id'],
-        ondelete='CASCADE'
-    )
-
-    # Add index on file_id for faster lookups
-    op.create_index('idx_measurement_file_id', 'measurements', ['file_id'])
-
-    # Add new unique constraint for MS data
-    # This allows same sample+feature from different files/columns
-    # Using partial index: only when file_id is NOT NULL
+    # Add FK constraint for file_id. NOT VALID skips the scan of existing
+    # measurements; the constraint is validated after the index builds.
     op.execute("""
-        CREATE UNIQUE INDEX uq_measurement_file_col_feature
-        ON measurements (file_id, col_index, feature_uid)
-        WHERE file_id IS NOT NULL
+        ALTER TABLE measurements
+        ADD CONSTRAINT fk_measurements_file_id
+        FOREIGN KEY (file_id) REFERENCES files (id) ON DELETE CASCADE
+        NOT VALID
     """)
 
     # Add refmet column to features (optional, for RefMet mapping)
@@ -53,19 +42,46 @@ def upgrade() -> None:
 
     # Add analysis_id to features for grouping
     op.add_column('features', sa.Column('analysis_id', sa.Text(), nullable=True))
-    op.create_index('idx_feature_analysis_id', 'features', ['analysis_id'])
+
+    # Build indexes concurrently so writes to measurements are not blocked.
+    # CONCURRENTLY cannot run inside a transaction block.
+    with op.get_context().autocommit_block(), statement_timeout():
+        # Add index on file_id for faster lookups
+        op.create_index(
+            'idx_measurement_file_id', 'measurements', ['file_id'],
+            postgresql_concurrently=True
+        )
+
+        # Add new unique constraint for MS data
+        # This allows same sample+feature from different files/columns
+        # Using partial index: only when file_id is NOT NULL
+        op.execute("""
+            CREATE UNIQUE INDEX CONCURRENTLY uq_measurement_file_col_feature
+            ON measurements (file_id, col_index, feature_uid)
+            WHERE file_id IS NOT NULL
+        """)
+
+        op.create_index(
+            'idx_feature_analysis_id', 'features', ['analysis_id'],
+            postgresql_concurrently=True
+        )
+
+        # Validation takes SHARE UPDATE EXCLUSIVE, so writes continue
+        op.execute("ALTER TABLE measurements VALIDATE CONSTRAINT fk_measurements_file_id")
 
 
 def downgrade() -> None:
     """Remove MS measurement columns."""
 
-    # Drop index and constraint
-    op.drop_index('idx_feature_analysis_id', 'features')
+    # Drop indexes
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_feature_analysis_id', 'features', postgresql_concurrently=True)
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS uq_measurement_file_col_feature")
+        op.drop_index('idx_measurement_file_id', 'measurements', postgresql_concurrently=True)
+
     op.drop_column('features', 'analysis_id')
     op.drop_column('features', 'refmet_name')
 
-    op.execute("DROP INDEX IF EXISTS uq_measurement_file_col_feature")
-    op.drop_index('idx_measurement_file_id', 'measurements')
     op.drop_constraint('fk_measurements_file_id', 'measurements', type_='foreignkey')
 
     op.drop_column('measurements', 'replicate_ix')
@@ -24,17 +24,11 @@ def upgrade() -> None:
     op.add_column('samples', sa.Column('exposure', sa.Text(), nullable=True))
     op.add_column('samples', sa.Column('sample_matrix', sa.Text(), nullable=True))
 
-    # Add indexes for samples category columns
-    op.create_index('idx_samples_exposure', 'samples', ['exposure'])
-    op.create_index('idx_samples_sample_matrix', 'samples', ['sample_matrix'])
-
     # Add device column to files table
     op.add_column('files', sa.Column('device', sa.Text(), nullable=True))
-    op.create_index('idx_files_device', 'files', ['device'])
 
     # Also add device to analyses for convenience
     op.add_column('analyses', sa.Column('device', sa.Text(), nullable=True))
-    op.create_index('idx_analyses_device', 'analyses', ['device'])
 
     # Create the v_long_measurements view for R export
     op.execute("""
@@ -67,6 +61,25 @@ def upgrade() -> None:
         LEFT JOIN analyses a ON ft.analysis_id = a.analysis_id AND a.study_pk = st.id
     """)
 
+    # Build category indexes concurrently (outside the migration transaction)
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_samples_exposure', 'samples', ['exposure'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'idx_samples_sample_matrix', 'samples', ['sample_matrix'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'idx_files_device', 'files', ['device'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'idx_analyses_device', 'analyses', ['device'],
+            postgresql_concurrently=True
+        )
+
 
 def downgrade() -> None:
     """Remove category columns and view."""
@@ -74,16 +87,19 @@ def downgrade() -> None:
     # Drop the view
     op.execute("DROP VIEW IF EXISTS public.v_long_measurements")
 
+    # Drop category indexes
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_analyses_device', 'analyses', postgresql_concurrently=True)
+        op.drop_index('idx_files_device', 'files', postgresql_concurrently=True)
+        op.drop_index('idx_samples_sample_matrix', 'samples', postgresql_concurrently=True)
+        op.drop_index('idx_samples_exposure', 'samples', postgresql_concurrently=True)
+
     # Drop analyses columns
-    op.drop_index('idx_analyses_device', 'analyses')
     op.drop_column('analyses', 'device')
 
     # Drop files columns
-    op.drop_index('idx_files_device', 'files')
     op.drop_column('files', 'device')
 
     # Drop samples columns
-    op.drop_index('idx_samples_sample_matrix', 'samples')
-    op.drop_index('idx_samples_exposure', 'samples')
     op.drop_column('samples', 'sample_matrix')
     op.drop_column('samples', 'exposure')
@@ -10,6 +10,8 @@ from typing import Sequence, Union
 from alembic import op
 import sqlalchemy as sa
 
+from metaloader.utils.bulk import batched_execute
+
 # revision identifiers, used by Alembic.
 revision: str = '006'
 down_revision: Union[str, None] = '005'
@@ -17,14 +19,30 @@ branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
 
+def _backfill_parse_status() -> None:
+    """Set parse_status = 'pending' on existing files in keyset batches."""
+    context = op.get_context()
+    backfill = "UPDATE files SET parse_status = 'pending' WHERE parse_status IS NULL"
+
+    if context.as_sql:
+        # Offline mode: no row counts to drive the loop
+        op.execute(backfill)
+        return
+
+    with context.autocommit_block():
+        batched_execute(op.get_bind(), "files", backfill + " AND {range}")
+
+
 def upgrade() -> None:
     """Add parse status tracking columns to files table."""
 
-    # Add parse_status column with default 'pending'
+    # Add parse_status as nullable without a default (catalog-only), then
+    # default new rows to 'pending'; existing rows are backfilled below
     op.add_column(
         'files',
-        sa.Column('parse_status', sa.Text(), nullable=False, server_default='pending')
+        sa.Column('parse_status', sa.Text(), nullable=True)
     )
+    op.alter_column('files', 'parse_status', server_default='pending')
 
     # Add parse_error column for storing error messages
     op.add_column(
@@ -38,15 +56,37 @@ def upgrade() -> None:
         sa.Column('parsed_at', sa.TIMESTAMP(timezone=True), nullable=True)
     )
 
-    # Add index for parse_status to enable efficient filtering
-    op.create_index('idx_files_parse_status', 'files', ['parse_status'])
+    _backfill_parse_status()
+
+    # NOT NULL and valid parse_status values as NOT VALID checks: only new
+    # writes are checked while the ACCESS EXCLUSIVE lock is held
+    op.execute("""
+        ALTER TABLE files
+        ADD CONSTRAINT ck_files_parse_status_nn CHECK (parse_status IS NOT NULL)
+        NOT VALID
+    """)
+    op.execute("""
+        ALTER TABLE files
+        ADD CONSTRAINT ck_files_parse_status
+        CHECK (parse_status IN ('pending', 'success', 'failed', 'skipped'))
+        NOT VALID
+    """)
+
+    with op.get_context().autocommit_block():
+        # Scans files under SHARE UPDATE EXCLUSIVE; reads and writes continue
+        op.execute("ALTER TABLE files VALIDATE CONSTRAINT ck_files_parse_status_nn")
+        op.execute("ALTER TABLE files VALIDATE CONSTRAINT ck_files_parse_status")
+
+    # SET NOT NULL skips its table scan when a valid CHECK proves it
+    op.alter_column('files', 'parse_status', nullable=False)
+    op.drop_constraint('ck_files_parse_status_nn', 'files', type_='check')
 
-    # Add check constraint for valid parse_status values
-    op.create_check_constraint(
-        'ck_files_parse_status',
-        'files',
-        "parse_status IN ('pending', 'success', 'failed', 'skipped')"
-    )
+    # Add index for parse_status to enable efficient filtering
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_files_parse_status', 'files', ['parse_status'],
+            postgresql_concurrently=True
+        )
 
 
 def downgrade() -> None:
@@ -56,7 +96,8 @@ def downgrade() -> None:
     op.drop_constraint('ck_files_parse_status', 'files', type_='check')
 
     # Drop index
-    op.drop_index('idx_files_parse_status', 'files')
+    with op.get_context().autocommit_block():
+        op.drop_index('idx_files_parse_status', 'files', postgresql_concurrently=True)
 
     # Drop columns
     op.drop_column('files', 'parsed_at')
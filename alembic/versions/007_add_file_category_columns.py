@@ -38,26 +38,40 @@ def upgrade() -> None:
         sa.Column('platform', sa.Text(), nullable=True)
     )
 
-    # Add indexes for efficient filtering
-    op.create_index('idx_files_exposure', 'files', ['exposure'])
-    op.create_index('idx_files_sample_type', 'files', ['sample_type'])
-    op.create_index('idx_files_platform', 'files', ['platform'])
+    # Add indexes for efficient filtering, built concurrently
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_files_exposure', 'files', ['exposure'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'idx_files_sample_type', 'files', ['sample_type'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'idx_files_platform', 'files', ['platform'],
+            postgresql_concurrently=True
+        )
 
-    # Add index on detected_type if not exists (for type-based queries)
-    op.create_index(
-        'idx_files_detected_type', 'files', ['detected_type'],
-        if_not_exists=True
-    )
+        # Add index on detected_type if not exists (for type-based queries)
+        op.create_index(
+            'idx_files_detected_type', 'files', ['detected_type'],
+            postgresql_concurrently=True, if_not_exists=True
+        )
 
 
 def downgrade() -> None:
     """Remove category columns from files table."""
 
     # Drop indexes
-    op.drop_index('idx_files_detected_type', 'files', if_exists=True)
-    op.drop_index('idx_files_platform', 'files')
-    op.drop_index('idx_files_sample_type', 'files')
-    op.drop_index('idx_files_exposure', 'files')
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            'idx_files_detected_type', 'files',
+            postgresql_concurrently=True, if_exists=True
+        )
+        op.drop_index('idx_files_platform', 'files', postgresql_concurrently=True)
+        op.drop_index('idx_files_sample_type', 'files', postgresql_concurrently=True)
+        op.drop_index('idx_files_exposure', 'files', postgresql_concurrently=True)
 
     # Drop columns
     op.drop_column('files', 'platform')
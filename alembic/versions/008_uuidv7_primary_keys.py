@@ -0,0 +1,73 @@
+"""Generate time-ordered UUIDv7 primary keys
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '008'
+down_revision: Union[str, None] = '007'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Tables with a UUID primary key named "id"
+UUID_PK_TABLES = (
+    'imports',
+    'files',
+    'studies',
+    'analyses',
+    'samples',
+    'features',
+    'measurements',
+)
+
+
+def upgrade() -> None:
+    """Default UUID primary keys to uuid_generate_v7()."""
+
+    # UUIDv7 generator built on gen_random_uuid() (core since PostgreSQL 13),
+    # so no extension is required: overwrite the first 48 bits with the Unix
+    # time in milliseconds and flip the version nibble from 4 (0100) to 7 (0111).
+    op.execute("""
+        CREATE OR REPLACE FUNCTION uuid_generate_v7() RETURNS uuid
+        LANGUAGE sql VOLATILE
+        AS $$
+            SELECT encode(
+                set_bit(
+                    set_bit(
+                        overlay(
+                            uuid_send(gen_random_uuid())
+                            PLACING substring(
+                                int8send(
+                                    floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint
+                                )
+                                FROM 3
+                            )
+                            FROM 1 FOR 6
+                        ),
+                        52, 1
+                    ),
+                    53, 1
+                ),
+                'hex'
+            )::uuid
+        $$
+    """)
+
+    # Existing UUIDv4 values stay as they are; only new rows change
+    for table in UUID_PK_TABLES:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT uuid_generate_v7()")
+
+
+def downgrade() -> None:
+    """Remove uuid_generate_v7() defaults."""
+
+    for table in UUID_PK_TABLES:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN id DROP DEFAULT")
+
+    op.execute("DROP FUNCTION IF EXISTS uuid_generate_v7()")
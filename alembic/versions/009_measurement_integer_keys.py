@@ -0,0 +1,247 @@
+"""Join measurements to samples/features on integer surrogate keys
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+from metaloader.utils.bulk import batched_execute
+from metaloader.utils.migration import statement_timeout
+
+# revision identifiers, used by Alembic.
+revision: str = '009'
+down_revision: Union[str, None] = '008'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Measurements updated per transaction during backfill
+BACKFILL_BATCH_SIZE = 10000
+
+LONG_MEASUREMENTS_VIEW = """
+    CREATE OR REPLACE VIEW public.v_long_measurements AS
+    SELECT
+        m.id AS measurement_id,
+        s.sample_uid,
+        s.sample_label,
+        s.exposure,
+        s.sample_matrix,
+        f.id AS file_id,
+        f.device,
+        f.detected_type,
+        f.filename,
+        ft.feature_uid,
+        ft.feature_type,
+        ft.name_raw AS feature,
+        ft.refmet_name,
+        m.value,
+        m.unit,
+        m.col_index,
+        m.replicate_ix,
+        st.study_id,
+        a.analysis_id
+    FROM measurements m
+    LEFT JOIN samples s ON m.sample_id = s.sample_id
+    LEFT JOIN features ft ON m.feature_id = ft.feature_id
+    LEFT JOIN files f ON m.file_id = f.id
+    LEFT JOIN studies st ON s.study_pk = st.id
+    LEFT JOIN analyses a ON ft.analysis_id = a.analysis_id AND a.study_pk = st.id
+"""
+
+
+def _backfill_measurement_keys() -> None:
+    """Fill measurements.sample_id/feature_id in keyset batches over id."""
+    context = op.get_context()
+    backfill = """
+        UPDATE measurements m SET
+            sample_id = (
+                SELECT s.sample_id FROM samples s WHERE s.sample_uid = m.sample_uid
+            ),
+            feature_id = (
+                SELECT ft.feature_id FROM features ft WHERE ft.feature_uid = m.feature_uid
+            )
+    """
+
+    if context.as_sql:
+        # Offline mode: no row counts to drive the loop
+        op.execute(backfill)
+        return
+
+    with context.autocommit_block():
+        batched_execute(
+            op.get_bind(),
+            "measurements",
+            backfill + " WHERE {range}",
+            batch_size=BACKFILL_BATCH_SIZE,
+        )
+
+
+def upgrade() -> None:
+    """Add BIGINT surrogate keys and switch measurement joins to them."""
+
+    # Surrogate keys on the parents; the text uids stay for external lookup.
+    # Adding an identity column rewrites samples/features, which are small
+    # compared to measurements.
+    op.execute(
+        "ALTER TABLE samples ADD COLUMN sample_id BIGINT GENERATED BY DEFAULT AS IDENTITY"
+    )
+    op.execute(
+        "ALTER TABLE features ADD COLUMN feature_id BIGINT GENERATED BY DEFAULT AS IDENTITY"
+    )
+
+    # Nullable columns without defaults: catalog-only change on measurements
+    op.add_column('measurements', sa.Column('sample_id', sa.BigInteger(), nullable=True))
+    op.add_column('measurements', sa.Column('feature_id', sa.BigInteger(), nullable=True))
+
+    # Writers keep sending sample_uid/feature_uid; resolve the integer keys
+    # on the way in. A uid with no parent row raises foreign_key_violation,
+    # which keeps the guarantee the dropped text foreign keys provided.
+    op.execute("""
+        CREATE OR REPLACE FUNCTION measurements_resolve_keys() RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            NEW.sample_id := NULL;
+            IF NEW.sample_uid IS NOT NULL THEN
+                SELECT s.sample_id INTO NEW.sample_id
+                FROM samples s WHERE s.sample_uid = NEW.sample_uid;
+                IF NEW.sample_id IS NULL THEN
+                    RAISE foreign_key_violation USING MESSAGE =
+                        format('sample_uid %L not present in samples', NEW.sample_uid);
+                END IF;
+            END IF;
+
+            NEW.feature_id := NULL;
+            IF NEW.feature_uid IS NOT NULL THEN
+                SELECT ft.feature_id INTO NEW.feature_id
+                FROM features ft WHERE ft.feature_uid = NEW.feature_uid;
+                IF NEW.feature_id IS NULL THEN
+                    RAISE foreign_key_violation USING MESSAGE =
+                        format('feature_uid %L not present in features', NEW.feature_uid);
+                END IF;
+            END IF;
+
+            RETURN NEW;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_measurements_resolve_keys
+        BEFORE INSERT OR UPDATE OF sample_uid, feature_uid ON measurements
+        FOR EACH ROW EXECUTE FUNCTION measurements_resolve_keys()
+    """)
+
+    # Existing rows, committed batch by batch
+    _backfill_measurement_keys()
+
+    with op.get_context().autocommit_block(), statement_timeout():
+        # FK targets: unique index built concurrently, then attached
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY uq_samples_sample_id ON samples (sample_id)"
+        )
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY uq_features_feature_id ON features (feature_id)"
+        )
+
+        op.create_index(
+            'idx_measurement_sample_id', 'measurements', ['sample_id'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'idx_measurement_feature_id', 'measurements', ['feature_id'],
+            postgresql_concurrently=True
+        )
+
+    op.execute(
+        "ALTER TABLE samples "
+        "ADD CONSTRAINT uq_samples_sample_id UNIQUE USING INDEX uq_samples_sample_id"
+    )
+    op.execute(
+        "ALTER TABLE features "
+        "ADD CONSTRAINT uq_features_feature_id UNIQUE USING INDEX uq_features_feature_id"
+    )
+
+    op.execute("""
+        ALTER TABLE measurements
+        ADD CONSTRAINT fk_measurements_sample_id
+        FOREIGN KEY (sample_id) REFERENCES samples (sample_id)
+        NOT VALID
+    """)
+    op.execute("""
+        ALTER TABLE measurements
+        ADD CONSTRAINT fk_measurements_feature_id
+        FOREIGN KEY (feature_id) REFERENCES features (feature_id)
+        NOT VALID
+    """)
+
+    # Text foreign keys are replaced by the trigger + integer foreign keys
+    op.execute("ALTER TABLE measurements DROP CONSTRAINT IF EXISTS measurements_sample_uid_fkey")
+    op.execute("ALTER TABLE measurements DROP CONSTRAINT IF EXISTS measurements_feature_uid_fkey")
+
+    op.execute(LONG_MEASUREMENTS_VIEW)
+
+    with op.get_context().autocommit_block(), statement_timeout():
+        op.execute("ALTER TABLE measurements VALIDATE CONSTRAINT fk_measurements_sample_id")
+        op.execute("ALTER TABLE measurements VALIDATE CONSTRAINT fk_measurements_feature_id")
+
+        # sample_uid lookups are served by the uq_measurement_sample_feature
+        # prefix; nothing filters on feature_uid alone any more
+        op.drop_index('idx_measurement_sample', 'measurements', postgresql_concurrently=True)
+        op.drop_index('idx_measurement_feature', 'measurements', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Restore text joins and drop the surrogate keys."""
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_measurement_sample', 'measurements', ['sample_uid'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'idx_measurement_feature', 'measurements', ['feature_uid'],
+            postgresql_concurrently=True
+        )
+
+    op.execute("""
+        ALTER TABLE measurements
+        ADD CONSTRAINT measurements_sample_uid_fkey
+        FOREIGN KEY (sample_uid) REFERENCES samples (sample_uid)
+        NOT VALID
+    """)
+    op.execute("""
+        ALTER TABLE measurements
+        ADD CONSTRAINT measurements_feature_uid_fkey
+        FOREIGN KEY (feature_uid) REFERENCES features (feature_uid)
+        NOT VALID
+    """)
+
+    # Restore the text-join view before the integer columns go away
+    op.execute(
+        LONG_MEASUREMENTS_VIEW
+        .replace("m.sample_id = s.sample_id", "m.sample_uid = s.sample_uid")
+        .replace("m.feature_id = ft.feature_id", "m.feature_uid = ft.feature_uid")
+    )
+
+    op.execute("DROP TRIGGER IF EXISTS trg_measurements_resolve_keys ON measurements")
+    op.execute("DROP FUNCTION IF EXISTS measurements_resolve_keys()")
+
+    op.drop_constraint('fk_measurements_feature_id', 'measurements', type_='foreignkey')
+    op.drop_constraint('fk_measurements_sample_id', 'measurements', type_='foreignkey')
+    op.drop_index('idx_measurement_feature_id', 'measurements')
+    op.drop_index('idx_measurement_sample_id', 'measurements')
+    op.drop_column('measurements', 'feature_id')
+    op.drop_column('measurements', 'sample_id')
+
+    op.drop_constraint('uq_features_feature_id', 'features', type_='unique')
+    op.drop_constraint('uq_samples_sample_id', 'samples', type_='unique')
+    op.drop_column('features', 'feature_id')
+    op.drop_column('samples', 'sample_id')
+
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE measurements VALIDATE CONSTRAINT measurements_sample_uid_fkey")
+        op.execute("ALTER TABLE measurements VALIDATE CONSTRAINT measurements_feature_uid_fkey")
@@ -0,0 +1,71 @@
+"""Materialize v_long_measurements
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '010'
+down_revision: Union[str, None] = '009'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LONG_MEASUREMENTS_SELECT = """
+    SELECT
+        m.id AS measurement_id,
+        s.sample_uid,
+        s.sample_label,
+        s.exposure,
+        s.sample_matrix,
+        f.id AS file_id,
+        f.device,
+        f.detected_type,
+        f.filename,
+        ft.feature_uid,
+        ft.feature_type,
+        ft.name_raw AS feature,
+        ft.refmet_name,
+        m.value,
+        m.unit,
+        m.col_index,
+        m.replicate_ix,
+        st.study_id,
+        a.analysis_id
+    FROM measurements m
+    LEFT JOIN samples s ON m.sample_id = s.sample_id
+    LEFT JOIN features ft ON m.feature_id = ft.feature_id
+    LEFT JOIN files f ON m.file_id = f.id
+    LEFT JOIN studies st ON s.study_pk = st.id
+    LEFT JOIN analyses a ON ft.analysis_id = a.analysis_id AND a.study_pk = st.id
+"""
+
+
+def upgrade() -> None:
+    """Replace the v_long_measurements view with a materialized view."""
+
+    op.execute("DROP VIEW IF EXISTS public.v_long_measurements")
+
+    # Populated here so the first REFRESH ... CONCURRENTLY is allowed
+    op.execute(
+        "CREATE MATERIALIZED VIEW public.v_long_measurements AS"
+        + LONG_MEASUREMENTS_SELECT
+        + "WITH DATA"
+    )
+
+    # REFRESH MATERIALIZED VIEW CONCURRENTLY requires a unique index
+    op.execute("""
+        CREATE UNIQUE INDEX ix_vlm_measurement_id
+        ON public.v_long_measurements (measurement_id)
+    """)
+
+
+def downgrade() -> None:
+    """Restore the plain v_long_measurements view."""
+
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS public.v_long_measurements")
+    op.execute("CREATE VIEW public.v_long_measurements AS" + LONG_MEASUREMENTS_SELECT)
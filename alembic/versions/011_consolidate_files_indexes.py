@@ -0,0 +1,69 @@
+"""Replace single-column files indexes with composite indexes
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '011'
+down_revision: Union[str, None] = '010'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Single-column indexes replaced below: (name, column)
+SINGLE_COLUMN_INDEXES = (
+    ('idx_files_device', 'device'),
+    ('idx_files_exposure', 'exposure'),
+    ('idx_files_sample_type', 'sample_type'),
+    ('idx_files_platform', 'platform'),
+    ('idx_files_detected_type', 'detected_type'),
+    ('idx_files_parse_status', 'parse_status'),
+)
+
+
+def upgrade() -> None:
+    """Create composite files indexes and drop the single-column ones."""
+
+    with op.get_context().autocommit_block():
+        # Every service query on files filters by import_id and orders by
+        # created_at (tagging, get_import_files, parse-import); also serves
+        # the ON DELETE CASCADE from imports
+        op.create_index(
+            'idx_files_import_created', 'files', ['import_id', 'created_at'],
+            postgresql_concurrently=True
+        )
+
+        # Category filtering for ad-hoc/export queries
+        op.create_index(
+            'idx_files_type_platform_exposure', 'files',
+            ['detected_type', 'platform', 'exposure'],
+            postgresql_concurrently=True
+        )
+
+        # Files still to (re)parse; parsed files drop out of the index
+        op.create_index(
+            'idx_files_parse_status_detected', 'files',
+            ['parse_status', 'detected_type'],
+            postgresql_where="parse_status <> 'success'",
+            postgresql_concurrently=True
+        )
+
+        for name, _ in SINGLE_COLUMN_INDEXES:
+            op.drop_index(name, 'files', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Restore the single-column files indexes."""
+
+    with op.get_context().autocommit_block():
+        for name, column in SINGLE_COLUMN_INDEXES:
+            op.create_index(name, 'files', [column], postgresql_concurrently=True)
+
+        op.drop_index('idx_files_parse_status_detected', 'files', postgresql_concurrently=True)
+        op.drop_index('idx_files_type_platform_exposure', 'files', postgresql_concurrently=True)
+        op.drop_index('idx_files_import_created', 'files', postgresql_concurrently=True)
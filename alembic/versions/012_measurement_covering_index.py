@@ -0,0 +1,51 @@
+"""Cover per-sample measurement reads and drop redundant file_id index
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from metaloader.utils.migration import statement_timeout
+
+# revision identifiers, used by Alembic.
+revision: str = '012'
+down_revision: Union[str, None] = '011'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Replace idx_measurement_sample_id with a covering index."""
+
+    with op.get_context().autocommit_block(), statement_timeout():
+        # Study-filtered QC aggregates (counts, NaN/Inf, negatives, units)
+        # select measurements by sample_id and read only value/unit, so they
+        # become index-only scans
+        op.execute("""
+            CREATE INDEX CONCURRENTLY ix_meas_sample_id_inc
+            ON measurements (sample_id) INCLUDE (value, unit)
+        """)
+        op.drop_index('idx_measurement_sample_id', 'measurements', postgresql_concurrently=True)
+
+        # file_id = :x lookups (and the ON DELETE CASCADE from files) are
+        # served by the uq_measurement_file_col_feature partial unique index,
+        # whose leading column is file_id and which skips NULL file_id rows
+        op.drop_index('idx_measurement_file_id', 'measurements', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Restore the plain sample_id and file_id indexes."""
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_measurement_file_id', 'measurements', ['file_id'],
+            postgresql_concurrently=True
+        )
+        op.create_index(
+            'idx_measurement_sample_id', 'measurements', ['sample_id'],
+            postgresql_concurrently=True
+        )
+        op.drop_index('ix_meas_sample_id_inc', 'measurements', postgresql_concurrently=True)
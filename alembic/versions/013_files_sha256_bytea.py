@@ -0,0 +1,117 @@
+"""Store files.sha256 as 32-byte BYTEA
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+from metaloader.utils.bulk import batched_execute
+
+# revision identifiers, used by Alembic.
+revision: str = '013'
+down_revision: Union[str, None] = '012'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Files updated per transaction during backfill
+BACKFILL_BATCH_SIZE = 10000
+
+
+def _backfill(conversion: str) -> None:
+    """Set files.sha256_new from sha256 in keyset batches over id."""
+    context = op.get_context()
+    backfill = f"UPDATE files SET sha256_new = {conversion.format('sha256')}"
+
+    if context.as_sql:
+        # Offline mode: no row counts to drive the loop
+        op.execute(backfill)
+        return
+
+    with context.autocommit_block():
+        batched_execute(
+            op.get_bind(), "files", backfill + " WHERE {range}",
+            batch_size=BACKFILL_BATCH_SIZE,
+        )
+
+
+def _add_sha256_column(column_type: sa.types.TypeEngine, conversion: str) -> None:
+    """Add files.sha256_new, kept in step with sha256 and backfilled.
+
+    A trigger fills sha256_new on every write from here on, so the NOT
+    VALID check holds for new rows and can be validated after the backfill
+    without blocking writers.
+    """
+    op.add_column('files', sa.Column('sha256_new', column_type, nullable=True))
+    op.execute(f"""
+        CREATE OR REPLACE FUNCTION files_sync_sha256_new() RETURNS trigger
+        LANGUAGE plpgsql
+        AS $$
+        BEGIN
+            NEW.sha256_new := {conversion.format('NEW.sha256')};
+            RETURN NEW;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_files_sync_sha256_new
+        BEFORE INSERT OR UPDATE OF sha256 ON files
+        FOR EACH ROW EXECUTE FUNCTION files_sync_sha256_new()
+    """)
+    op.execute("""
+        ALTER TABLE files
+        ADD CONSTRAINT ck_files_sha256_new_not_null CHECK (sha256_new IS NOT NULL) NOT VALID
+    """)
+
+    _backfill(conversion)
+
+    # Scans the table under SHARE UPDATE EXCLUSIVE; writes keep going
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TABLE files VALIDATE CONSTRAINT ck_files_sha256_new_not_null")
+
+
+def _swap_sha256_column() -> None:
+    """Replace files.sha256 with the backfilled sha256_new column."""
+
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY uq_file_sha256_size_new "
+            "ON files (sha256_new, size_bytes)"
+        )
+        op.execute("CREATE INDEX CONCURRENTLY idx_file_sha256_new ON files (sha256_new)")
+
+    # Short exclusive section: swap columns and attach the prebuilt indexes.
+    # SET NOT NULL relies on the validated check instead of scanning.
+    op.execute("LOCK TABLE files IN ACCESS EXCLUSIVE MODE")
+    op.execute("DROP TRIGGER trg_files_sync_sha256_new ON files")
+    op.execute("DROP FUNCTION files_sync_sha256_new()")
+
+    op.drop_constraint('uq_file_sha256_size', 'files', type_='unique')
+    op.drop_index('idx_file_sha256', 'files')
+    op.drop_column('files', 'sha256')
+
+    op.alter_column('files', 'sha256_new', new_column_name='sha256', nullable=False)
+    op.drop_constraint('ck_files_sha256_new_not_null', 'files', type_='check')
+    op.execute("ALTER INDEX idx_file_sha256_new RENAME TO idx_file_sha256")
+    op.execute("""
+        ALTER TABLE files
+        ADD CONSTRAINT uq_file_sha256_size UNIQUE USING INDEX uq_file_sha256_size_new
+    """)
+
+
+def upgrade() -> None:
+    """Convert files.sha256 from 64-char hex text to raw digest bytes."""
+
+    _add_sha256_column(sa.LargeBinary(), "decode({}, 'hex')")
+    _swap_sha256_column()
+
+
+def downgrade() -> None:
+    """Convert files.sha256 back to hex text."""
+
+    _add_sha256_column(sa.String(length=64), "encode({}, 'hex')")
+    _swap_sha256_column()
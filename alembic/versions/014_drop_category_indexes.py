@@ -0,0 +1,42 @@
+"""Drop B-tree indexes on low-cardinality category columns
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '014'
+down_revision: Union[str, None] = '013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Indexes on columns with a handful of distinct values: (name, table, column)
+CATEGORY_INDEXES = (
+    ('idx_samples_exposure', 'samples', 'exposure'),
+    ('idx_samples_sample_matrix', 'samples', 'sample_matrix'),
+    ('idx_analyses_device', 'analyses', 'device'),
+)
+
+
+def upgrade() -> None:
+    """Drop single-column category indexes."""
+
+    # exposure/sample_matrix/device hold 2-5 values each, so any filter on
+    # one of them matches a large share of the table and the planner picks
+    # a sequential scan anyway; the indexes only cost writes during derive.
+    with op.get_context().autocommit_block():
+        for name, table, _ in CATEGORY_INDEXES:
+            op.drop_index(name, table, postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Restore single-column category indexes."""
+
+    with op.get_context().autocommit_block():
+        for name, table, column in CATEGORY_INDEXES:
+            op.create_index(name, table, [column], postgresql_concurrently=True)
@@ -0,0 +1,47 @@
+"""Index only the pending/failed files parse queue
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '015'
+down_revision: Union[str, None] = '014'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Replace idx_files_parse_status_detected with a parse queue index."""
+
+    with op.get_context().autocommit_block():
+        # Only files still waiting to be (re)parsed are indexed; successful
+        # and skipped files, the bulk of the table, never enter it. Ordered
+        # by created_at to match parse-import / parse mwtab-all.
+        op.create_index(
+            'idx_files_parse_queue', 'files',
+            ['parse_status', 'detected_type', 'created_at'],
+            postgresql_where="parse_status IN ('pending', 'failed')",
+            postgresql_concurrently=True
+        )
+
+        op.drop_index('idx_files_parse_status_detected', 'files', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Restore idx_files_parse_status_detected."""
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'idx_files_parse_status_detected', 'files',
+            ['parse_status', 'detected_type'],
+            postgresql_where="parse_status <> 'success'",
+            postgresql_concurrently=True
+        )
+
+        op.drop_index('idx_files_parse_queue', 'files', postgresql_concurrently=True)
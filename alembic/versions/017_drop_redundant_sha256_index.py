@@ -0,0 +1,32 @@
+"""Drop idx_file_sha256, covered by uq_file_sha256_size
+
+Revision ID: 017
+Revises: 016
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '017'
+down_revision: Union[str, None] = '016'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Drop the single-column sha256 index."""
+
+    with op.get_context().autocommit_block():
+        # uq_file_sha256_size leads with sha256, so it already serves
+        # sha256-only lookups; the extra index only slowed file inserts
+        op.drop_index('idx_file_sha256', 'files', postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Restore idx_file_sha256."""
+
+    with op.get_context().autocommit_block():
+        op.create_index('idx_file_sha256', 'files', ['sha256'], postgresql_concurrently=True)
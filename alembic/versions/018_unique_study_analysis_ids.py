@@ -0,0 +1,97 @@
+"""Make studies.study_id and analyses (study_pk, analysis_id) unique
+
+Revision ID: 018
+Revises: 017
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from metaloader.utils.migration import statement_timeout
+
+# revision identifiers, used by Alembic.
+revision: str = '018'
+down_revision: Union[str, None] = '017'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _merge_duplicate_studies() -> None:
+    """Point children of duplicate studies at the oldest row, then drop the rest."""
+    op.execute("""
+        CREATE TEMP TABLE study_merge ON COMMIT DROP AS
+        SELECT id, first_value(id) OVER (
+            PARTITION BY study_id ORDER BY created_at, id
+        ) AS keep_id
+        FROM studies
+        WHERE study_id IS NOT NULL
+    """)
+    op.execute("DELETE FROM study_merge WHERE id = keep_id")
+    op.execute("""
+        UPDATE analyses a SET study_pk = sm.keep_id
+        FROM study_merge sm WHERE a.study_pk = sm.id
+    """)
+    op.execute("""
+        UPDATE samples s SET study_pk = sm.keep_id
+        FROM study_merge sm WHERE s.study_pk = sm.id
+    """)
+    op.execute("DELETE FROM studies st USING study_merge sm WHERE st.id = sm.id")
+
+
+def _merge_duplicate_analyses() -> None:
+    """Keep the oldest analysis per (study_pk, analysis_id), filling in its file_id."""
+    op.execute("""
+        CREATE TEMP TABLE analysis_merge ON COMMIT DROP AS
+        SELECT id, file_id, first_value(id) OVER (
+            PARTITION BY study_pk, analysis_id ORDER BY created_at, id
+        ) AS keep_id
+        FROM analyses
+        WHERE study_pk IS NOT NULL AND analysis_id IS NOT NULL
+    """)
+    op.execute("DELETE FROM analysis_merge WHERE id = keep_id")
+    op.execute("""
+        UPDATE analyses a SET file_id = am.file_id
+        FROM (
+            SELECT DISTINCT ON (keep_id) keep_id, file_id
+            FROM analysis_merge WHERE file_id IS NOT NULL
+            ORDER BY keep_id, id
+        ) am
+        WHERE a.id = am.keep_id AND a.file_id IS NULL
+    """)
+    op.execute("DELETE FROM analyses a USING analysis_merge am WHERE a.id = am.id")
+
+
+def upgrade() -> None:
+    """Merge duplicate studies/analyses and add the unique constraints."""
+
+    # Parallel parse workers could each insert the same study or analysis;
+    # fold those duplicates together before the constraints go on.
+    # Nothing references analyses.id, so analysis duplicates are just dropped.
+    _merge_duplicate_studies()
+    _merge_duplicate_analyses()
+
+    with op.get_context().autocommit_block(), statement_timeout():
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY uq_studies_study_id ON studies (study_id)"
+        )
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY uq_analyses_study_analysis "
+            "ON analyses (study_pk, analysis_id)"
+        )
+
+    op.execute(
+        "ALTER TABLE studies "
+        "ADD CONSTRAINT uq_studies_study_id UNIQUE USING INDEX uq_studies_study_id"
+    )
+    op.execute(
+        "ALTER TABLE analyses "
+        "ADD CONSTRAINT uq_analyses_study_analysis UNIQUE USING INDEX uq_analyses_study_analysis"
+    )
+
+
+def downgrade() -> None:
+    """Drop the unique constraints; merged duplicates are not restored."""
+
+    op.drop_constraint('uq_analyses_study_analysis', 'analyses', type_='unique')
+    op.drop_constraint('uq_studies_study_id', 'studies', type_='unique')
@@ -0,0 +1,112 @@
+"""Move measurement uniqueness to the integer keys, drop the resolve trigger
+
+Revision ID: 019
+Revises: 018
+Create Date: 2026-10-16
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from metaloader.utils.migration import statement_timeout
+
+# revision identifiers, used by Alembic.
+revision: str = '019'
+down_revision: Union[str, None] = '018'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Trigger from migration 009, restored on downgrade for writers that only
+# send sample_uid/feature_uid
+RESOLVE_KEYS_FUNCTION = """
+    CREATE OR REPLACE FUNCTION measurements_resolve_keys() RETURNS trigger
+    LANGUAGE plpgsql
+    AS $$
+    BEGIN
+        NEW.sample_id := NULL;
+        IF NEW.sample_uid IS NOT NULL THEN
+            SELECT s.sample_id INTO NEW.sample_id
+            FROM samples s WHERE s.sample_uid = NEW.sample_uid;
+            IF NEW.sample_id IS NULL THEN
+                RAISE foreign_key_violation USING MESSAGE =
+                    format('sample_uid %L not present in samples', NEW.sample_uid);
+            END IF;
+        END IF;
+
+        NEW.feature_id := NULL;
+        IF NEW.feature_uid IS NOT NULL THEN
+            SELECT ft.feature_id INTO NEW.feature_id
+            FROM features ft WHERE ft.feature_uid = NEW.feature_uid;
+            IF NEW.feature_id IS NULL THEN
+                RAISE foreign_key_violation USING MESSAGE =
+                    format('feature_uid %L not present in features', NEW.feature_uid);
+            END IF;
+        END IF;
+
+        RETURN NEW;
+    END
+    $$
+"""
+RESOLVE_KEYS_TRIGGER = """
+    CREATE TRIGGER trg_measurements_resolve_keys
+    BEFORE INSERT OR UPDATE OF sample_uid, feature_uid ON measurements
+    FOR EACH ROW EXECUTE FUNCTION measurements_resolve_keys()
+"""
+
+
+def upgrade() -> None:
+    """Key measurement uniqueness on sample_id/feature_id instead of the uids."""
+
+    # sample_uid <-> sample_id and feature_uid <-> feature_id are 1:1, so the
+    # integer indexes accept exactly the rows the text ones did
+    with op.get_context().autocommit_block(), statement_timeout():
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY uq_measurement_sample_feature_id "
+            "ON measurements (sample_id, feature_id)"
+        )
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY uq_measurement_file_col_feature_id "
+            "ON measurements (file_id, col_index, feature_id) WHERE file_id IS NOT NULL"
+        )
+
+    op.execute(
+        "ALTER TABLE measurements ADD CONSTRAINT uq_measurement_sample_feature_id "
+        "UNIQUE USING INDEX uq_measurement_sample_feature_id"
+    )
+
+    # Writers resolve and send sample_id/feature_id themselves; the
+    # integer foreign keys still reject ids with no parent row
+    op.execute("DROP TRIGGER IF EXISTS trg_measurements_resolve_keys ON measurements")
+    op.execute("DROP FUNCTION IF EXISTS measurements_resolve_keys()")
+
+    op.drop_constraint('uq_measurement_sample_feature', 'measurements', type_='unique')
+
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS uq_measurement_file_col_feature")
+
+
+def downgrade() -> None:
+    """Restore the text-keyed unique indexes and the resolve trigger."""
+
+    with op.get_context().autocommit_block(), statement_timeout():
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY uq_measurement_sample_feature "
+            "ON measurements (sample_uid, feature_uid)"
+        )
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY uq_measurement_file_col_feature "
+            "ON measurements (file_id, col_index, feature_uid) WHERE file_id IS NOT NULL"
+        )
+
+    op.execute(
+        "ALTER TABLE measurements ADD CONSTRAINT uq_measurement_sample_feature "
+        "UNIQUE USING INDEX uq_measurement_sample_feature"
+    )
+
+    op.execute(RESOLVE_KEYS_FUNCTION)
+    op.execute(RESOLVE_KEYS_TRIGGER)
+
+    op.drop_constraint('uq_measurement_sample_feature_id', 'measurements', type_='unique')
+
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS uq_measurement_file_col_feature_id")
@@ -1,50 +1,55 @@
 """CLI application for metaloader."""
 
 import logging
+import re
+import stat
 import sys
+from dataclasses import dataclass
+from functools import cache, lru_cache
+from itertools import islice
+from operator import itemgetter
 from pathlib import Path
-from typing import Optional
+from typing import Callable, Collection, Iterable, Optional, Sequence
 from uuid import UUID
 
 import typer
-from rich.console import Console
-from rich.logging import RichHandler
+from rich.console import Console, Group
 from rich.table import Table
-from sqlalchemy.exc import OperationalError
-
-from metaloader.config import config
-from metaloader.database import get_db, test_connection, engine
-from metaloader.models import Base
-from metaloader.services.file_handler import FileHandler
-from metaloader.services.import_service import ImportService
-from metaloader.services.parse_service import ParseService
-from metaloader.services.parse_ms_service import ParseMSService
-from metaloader.services.parse_nmr_service import ParseNMRService
-from metaloader.services.derive_service import DeriveService
-from metaloader.services.ingest_dir_service import IngestDirService
-from metaloader.services.parse_dir_service import ParseDirService
-from metaloader.services.tagger_service import TaggerService
-from metaloader.services.export_service import ExportService
-from metaloader.qc import QCService, QCFilters
-from metaloader.models import File
-
-# Setup logging
-logging.basicConfig(
-    level=config.log_level,
-    format="%(message)s",
-    datefmt="[%X]",
-    handlers=[RichHandler(rich_tracebacks=True)],
-)
+from rich.text import Text
+
+from metaloader.config import MIGRATION_MODES, config
+
 logger = logging.getLogger(__name__)
 
+# Rich help/traceback rendering only pays off on a terminal
+_INTERACTIVE = sys.stdout.isatty()
+_TYPER_KW = {"rich_markup_mode": "rich" if _INTERACTIVE else None}
+
+
+def _ensure_logging() -> None:
+    """Install the Rich log handler on first use."""
+    if logging.getLogger().hasHandlers():
+        return
+    from rich.logging import RichHandler
+
+    logging.basicConfig(
+        level=config.log_level,
+        format="%(message)s",
+        datefmt="[%X]",
+        handlers=[RichHandler(rich_tracebacks=_INTERACTIVE)],
+    )
+
+
 # CLI app
-app = typer.Typer(help="Metaloader - Tool for loading metabolomics data into PostgreSQL")
-db_app = typer.Typer(help="Database management commands")
-parse_app = typer.Typer(help="Parse and extract data from files")
-qc_app = typer.Typer(help="Quality control and data validation commands")
-derive_app = typer.Typer(help="Derive computed columns from raw data")
-files_app = typer.Typer(help="File management and tagging commands")
-export_app = typer.Typer(help="Export data to various formats")
+app = typer.Typer(
+    help="Metaloader - Tool for loading metabolomics data into PostgreSQL", **_TYPER_KW
+)
+db_app = typer.Typer(help="Database management commands", **_TYPER_KW)
+parse_app = typer.Typer(help="Parse and extract data from files", **_TYPER_KW)
+qc_app = typer.Typer(help="Quality control and data validation commands", **_TYPER_KW)
+derive_app = typer.Typer(help="Derive computed columns from raw data", **_TYPER_KW)
+files_app = typer.Typer(help="File management and tagging commands", **_TYPER_KW)
+export_app = typer.Typer(help="Export data to various formats", **_TYPER_KW)
 app.add_typer(db_app, name="db")
 app.add_typer(parse_app, name="parse")
 app.add_typer(qc_app, name="qc")
@@ -52,41 +57,145 @@ app.add_typer(derive_app, name="derive")
 app.add_typer(files_app, name="files")
 app.add_typer(export_app, name="export")
 
-console = Console()
+
+@app.callback()
+def _main() -> None:
+    # Runs before any command, but not for --help or completion
+    _ensure_logging()
+
+# Piped output carries no colour, so skip Rich's per-print repr highlighting
+console = Console(highlight=_INTERACTIVE)
+
+# Database host/name shown by "db ping", without credentials
+_DB_DISPLAY = config.db_url.rsplit("@", 1)[-1]
+
+# QC status cells
+_OK = "[green]OK[/green]"
+_WARN = "[yellow]WARN[/yellow]"
+_ISSUE = "[red]ISSUE[/red]"
+_HIGH = "[red]HIGH[/red]"
+_EMPTY = "[yellow]EMPTY[/yellow]"
+
+_UUID_RE = re.compile(r"\A[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\Z")
 
 
 @db_app.command("ping")
 def db_ping():
     """Test database connection."""
+    from sqlalchemy import text
+    from sqlalchemy.exc import OperationalError
+
+    from metaloader.database import engine
+
     console.print("[bold blue]Testing database connection...[/bold blue]")
     
     try:
-        if test_connection():
+        # One connection for the ping and the revision lookup, so the
+        # command costs a single checkout and reset
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
             console.print("[bold green]✓ Database connection successful![/bold green]")
-            console.print(f"Connected to: {config.db_url.split('@')[-1]}")  # Hide credentials
-        else:
-            console.print("[bold red]✗ Database connection failed[/bold red]")
-            sys.exit(1)
+            console.print(f"Connected to: {_DB_DISPLAY}")
+            _print_schema_revision(conn)
+    except OperationalError as e:
+        logger.error(f"Database connection failed: {e}")
+        console.print("[bold red]✗ Database connection failed[/bold red]")
+        raise typer.Exit(code=1)
     except Exception as e:
-        console.print(f"[bold red]✗ Error: {e}[/bold red]")
-        sys.exit(1)
+        _print_error(e)
+        raise typer.Exit(code=1)
+
+
+# Output of `db init` in async mode
+MIGRATION_LOG = Path("alembic-upgrade.log")
+
+# alembic.ini at the project root; only present in a source or editable checkout
+PROJECT_ALEMBIC_INI = Path(__file__).resolve().parents[2] / "alembic.ini"
+
+
+@cache
+def _alembic_ini() -> Path:
+    """Locate alembic.ini.
+
+    ALEMBIC_CONFIG wins if set, then the project root (so migrations run
+    from any directory in a checkout), then the current directory (for an
+    installed package).
+    """
+    if config.alembic_config:
+        return Path(config.alembic_config)
+    if PROJECT_ALEMBIC_INI.exists():
+        return PROJECT_ALEMBIC_INI
+    return Path.cwd() / "alembic.ini"
+
+
+@cache
+def _alembic_cfg():
+    """Load alembic.ini once per process."""
+    from alembic.config import Config
+
+    return Config(str(_alembic_ini()))
+
+
+def _print_schema_revision(conn) -> None:
+    """Print the applied Alembic revision and whether it is the head."""
+    from alembic.runtime.migration import MigrationContext
+    from alembic.script import ScriptDirectory
+
+    head = ScriptDirectory.from_config(_alembic_cfg()).get_current_head()
+    current = MigrationContext.configure(conn).get_current_revision()
+
+    if current == head:
+        console.print(f"Schema revision: {current} (head)")
+    else:
+        console.print(f"[bold yellow]Schema revision: {current or 'none'} (head is {head})[/bold yellow]")
+        if MIGRATION_LOG.exists():
+            console.print(f"[dim]Migration log: {MIGRATION_LOG.absolute()}[/dim]")
 
 
 @db_app.command("init")
-def db_init():
+def db_init(
+    mode: Optional[str] = typer.Option(
+        None, "--mode",
+        help="sync (wait for migrations), async (run in background) or skip; defaults to MIGRATION_MODE"
+    ),
+):
     """Initialize database schema (create tables)."""
+    from metaloader.database import engine
+    from metaloader.models import Base
+
+    mode = (mode or config.migration_mode).lower()
+    if mode not in MIGRATION_MODES:
+        console.print(f"[bold red]✗ Error: Invalid mode '{mode}' (expected {', '.join(MIGRATION_MODES)})[/bold red]")
+        raise typer.Exit(code=1)
+
+    if mode == "skip":
+        console.print("[bold yellow]⚠ Migrations skipped (mode: skip)[/bold yellow]")
+        return
+
+    if mode == "async":
+        import subprocess
+
+        # Detached process, so the CLI returns while index builds and data
+        # migrations run; progress is logged per revision
+        with open(MIGRATION_LOG, "ab") as log_file:
+            process = subprocess.Popen(
+                [sys.executable, "-m", "alembic", "-c", str(_alembic_ini()), "upgrade", "head"],
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                start_new_session=True,
+            )
+        console.print(f"[bold green]✓ Migrations started in background (pid {process.pid})[/bold green]")
+        console.print(f"[dim]Log: {MIGRATION_LOG.absolute()} - check progress with 'metaloader db ping'[/dim]")
+        return
+
     console.print("[bold blue]Initializing database schema...[/bold blue]")
     
     try:
         # Import alembic to run migrations
         from alembic import command
-        from alembic.config import Config
-        
-        # Load alembic config
-        alembic_cfg = Config("alembic.ini")
-        
+
         # Run migrations to head
-        command.upgrade(alembic_cfg, "head")
+        command.upgrade(_alembic_cfg(), "head")
         
         console.print("[bold green]✓ Database schema initialized successfully![/bold green]")
     except ImportError:
@@ -96,10 +205,29 @@ def db_init():
             console.print("[bold green]✓ Database tables created successfully![/bold green]")
         except Exception as e:
             console.print(f"[bold red]✗ Error creating tables: {e}[/bold red]")
-            sys.exit(1)
+            raise typer.Exit(code=1)
     except Exception as e:
         console.print(f"[bold red]✗ Error running migrations: {e}[/bold red]")
-        sys.exit(1)
+        raise typer.Exit(code=1)
+
+
+@db_app.command("refresh")
+def db_refresh():
+    """Refresh the v_long_measurements materialized view.
+
+    Run once after a batch of per-file commands given --no-refresh.
+    """
+    from metaloader.database import refresh_long_measurements, session_scope
+
+    console.print("[bold blue]Refreshing v_long_measurements...[/bold blue]")
+
+    try:
+        with session_scope() as db:
+            refresh_long_measurements(db)
+        console.print("[bold green]✓ v_long_measurements refreshed[/bold green]")
+    except Exception as e:
+        _print_error(e)
+        raise typer.Exit(code=1)
 
 
 @app.command("ingest-file")
@@ -108,86 +236,92 @@ def ingest_file(
     import_id: Optional[str] = typer.Option(None, "--import-id", help="UUID of existing import"),
 ):
     """Ingest a single file into the database."""
+    from metaloader.database import session_scope
+    from metaloader.services.file_handler import FileHandler
+    from metaloader.services.import_service import ImportService
+
     console.print(f"[bold blue]Ingesting file: {file_path}[/bold blue]")
     
-    # Validate file exists
-    if not file_path.exists():
+    # Validate file exists (one stat for both checks)
+    try:
+        mode = file_path.stat().st_mode
+    except FileNotFoundError:
         console.print(f"[bold red]✗ Error: File not found: {file_path}[/bold red]")
-        sys.exit(1)
+        raise typer.Exit(code=1)
     
-    if not file_path.is_file():
+    if not stat.S_ISREG(mode):
         console.print(f"[bold red]✗ Error: Path is not a file: {file_path}[/bold red]")
-        sys.exit(1)
+        raise typer.Exit(code=1)
     
     # Get absolute path
     file_path = file_path.absolute()
     
     try:
-        # Get database session
-        db = next(get_db())
+        with session_scope() as db:
+            # Initialize services
+            import_service = ImportService(db)
+            file_handler = FileHandler(db)
         
-        # Initialize services
-        import_service = ImportService(db)
-        file_handler = FileHandler(db)
+            # Handle import_id
+            import_record = None
+            import_created = False
         
-        # Handle import_id
-        import_record = None
-        import_created = False
+            if import_id:
+                # Use existing import
+                try:
+                    import_uuid = _parse_uuid(import_id)
+                    import_record = import_service.get_import(import_uuid)
+                    if not import_record:
+                        console.print(f"[bold red]✗ Error: Import not found: {import_id}[/bold red]")
+                        raise typer.Exit(code=1)
+                except ValueError:
+                    console.print(f"[bold red]✗ Error: Invalid UUID format: {import_id}[/bold red]")
+                    raise typer.Exit(code=1)
+            else:
+                # Create new import
+                root_path = str(file_path.parent)
+                import_record = import_service.create_import(root_path=root_path, status="running")
+                import_created = True
+                console.print(f"[dim]Created import: {import_record.id}[/dim]")
         
-        if import_id:
-            # Use existing import
-            try:
-                import_uuid = UUID(import_id)
-                import_record = import_service.get_import(import_uuid)
-                if not import_record:
-                    console.print(f"[bold red]✗ Error: Import not found: {import_id}[/bold red]")
-                    sys.exit(1)
-            except ValueError:
-                console.print(f"[bold red]✗ Error: Invalid UUID format: {import_id}[/bold red]")
-                sys.exit(1)
-        else:
-            # Create new import
-            root_path = str(file_path.parent)
-            import_record = import_service.create_import(root_path=root_path, status="running")
-            import_created = True
-            console.print(f"[dim]Created import: {import_record.id}[/dim]")
+            # Process file
+            file_record, is_new = file_handler.process_file(
+                file_path, import_record.id, Path(import_record.root_path) if import_record.root_path else None
+            )
         
-        # Process file
-        file_record, is_new = file_handler.process_file(
-            file_path, import_record.id, Path(import_record.root_path) if import_record.root_path else None
-        )
+            # Update import status if we created it
+            if import_created:
+                import_service.update_status(import_record.id, "success")
         
-        # Update import status if we created it
-        if import_created:
-            import_service.update_status(import_record.id, "success")
+            # Display results
+            table = _make_kv_table("File Ingestion Results")
         
-        # Display results
-        table = Table(title="File Ingestion Results")
-        table.add_column("Property", style="cyan")
-        table.add_column("Value", style="green")
+            _add_rows(table, [
+                ("Import ID", str(import_record.id)),
+                ("File ID", str(file_record.id)),
+                ("Filename", file_record.filename),
+                ("Detected Type", file_record.detected_type),
+                ("SHA256", file_record.sha256.hex()),
+                ("Size (bytes)", str(file_record.size_bytes)),
+                ("Status", "Duplicate (existing)" if not is_new else "New"),
+            ])
         
-        table.add_row("Import ID", str(import_record.id))
-        table.add_row("File ID", str(file_record.id))
-        table.add_row("Filename", file_record.filename)
-        table.add_row("Detected Type", file_record.detected_type)
-        table.add_row("SHA256", file_record.sha256)
-        table.add_row("Size (bytes)", str(file_record.size_bytes))
-        table.add_row("Status", "Duplicate (existing)" if not is_new else "New")
-        
-        console.print(table)
+            console.print(table)
         
-        if not is_new:
-            console.print("[bold yellow]⚠ File already exists in database (duplicate detected)[/bold yellow]")
-        else:
-            console.print("[bold green]✓ File ingested successfully![/bold green]")
+            if not is_new:
+                console.print("[bold yellow]⚠ File already exists in database (duplicate detected)[/bold yellow]")
+            else:
+                console.print("[bold green]✓ File ingested successfully![/bold green]")
         
+    except typer.Exit:
+        raise
     except ValueError as e:
         console.print(f"[bold red]✗ Validation error: {e}[/bold red]")
-        sys.exit(1)
+        raise typer.Exit(code=1)
     except Exception as e:
-        console.print(f"[bold red]✗ Error: {e}[/bold red]")
+        _print_error(e)
         logger.exception("Error during file ingestion")
-        sys.exit(1)
+        raise typer.Exit(code=1)
 
 
 @app.command("import")
@@ -197,272 +331,412 @@ def import_finalize(
     notes: str = typer.Option("", "--notes", help="Notes about the import"),
 ):
     """Finalize an import with status and notes."""
+    from metaloader.database import session_scope
+    from metaloader.services.import_service import ImportService
+
     console.print(f"[bold blue]Finalizing import: {import_id}[/bold blue]")
     
     # Validate status
     if status not in ["success", "failed"]:
         console.print("[bold red]✗ Error: Status must be 'success' or 'failed'[/bold red]")
-        sys.exit(1)
+        raise typer.Exit(code=1)
     
     try:
         # Parse UUID
-        import_uuid = UUID(import_id)
+        import_uuid = _parse_uuid(import_id)
     except ValueError:
         console.print(f"[bold red]✗ Error: Invalid UUID format: {import_id}[/bold red]")
-        sys.exit(1)
+        raise typer.Exit(code=1)
     
     try:
-        # Get database session
-        db = next(get_db())
+        with session_scope() as db:
+            # Initialize service
+            import_service = ImportService(db)
         
-        # Initialize service
-        import_service = ImportService(db)
+            # Finalize import
+            import_record = import_service.finalize_import(import_uuid, status, notes)
         
-        # Finalize import
-        import_record = import_service.finalize_import(import_uuid, status, notes)
+            # Display results
+            table = _make_kv_table("Import Finalized")
         
-        # Display results
-        table = Table(title="Import Finalized")
-        table.add_column("Property", style="cyan")
-        table.add_column("Value", style="green")
-        
-        table.add_row("Import ID", str(import_record.id))
-        table.add_row("Status", import_record.status)
-        table.add_row("Root Path", import_record.root_path or "N/A")
-        table.add_row("Notes", import_record.notes or "N/A")
-        table.add_row("Created At", str(import_record.created_at))
+            _add_rows(table, [
+                ("Import ID", str(import_record.id)),
+                ("Status", import_record.status),
+                ("Root Path", import_record.root_path or "N/A"),
+                ("Notes", import_record.notes or "N/A"),
+                ("Created At", str(import_record.created_at)),
+            ])
         
-        console.print(table)
-        console.print("[bold green]✓ Import finalized successfully![/bold green]")
+            console.print(table)
+            console.print("[bold green]✓ Import finalized successfully![/bold green]")
         
     except ValueError as e:
-        console.print(f"[bold red]✗ Error: {e}[/bold red]")
-        sys.exit(1)
+        _print_error(e)
+        raise typer.Exit(code=1)
     except Exception as e:
-        console.print(f"[bold red]✗ Error: {e}[/bold red]")
+        _print_error(e)
         logger.exception("Error during import finalization")
-        sys.exit(1)
+        raise typer.Exit(code=1)
 
 
-def _is_uuid(value: str) -> bool:
-    """Check if string is a valid UUID."""
+def _refresh_long_measurements(db) -> None:
+    """Refresh v_long_measurements after a write, warning instead of failing."""
+    from metaloader.database import refresh_long_measurements
+
     try:
-        UUID(value)
-        return True
-    except ValueError:
-        return False
+        refresh_long_measurements(db)
+    except Exception as e:
+        db.rollback()
+        console.print(f"[bold yellow]⚠ Could not refresh v_long_measurements: {e}[/bold yellow]")
+        logger.debug("Materialized view refresh failed", exc_info=True)
 
 
-@parse_app.command("mwtab")
-def parse_mwtab(
-    file_ref: str = typer.Argument(..., help="File ID (UUID) or path to mwTab file"),
-    dry_run: bool = typer.Option(False, "--dry-run", help="Don't write to database, only show stats"),
-):
-    """Parse mwTab file and extract samples, features, and measurements.
+# Per-file commands refresh v_long_measurements by default; scripts looping
+# over files pass --no-refresh and run `db refresh` once at the end
+_NO_REFRESH_HELP = "Don't refresh v_long_measurements; run 'metaloader db refresh' afterwards"
 
-    FILE_REF can be:
-    - A UUID from the files table (e.g., from 'metaloader ingest-file')
-    - A direct path to an mwTab file
+
+# Shared prefix for error lines, styled once instead of parsed as markup per call
+_ERROR_PREFIX = Text("✗ Error: ", style="bold red")
+
+
+def _print_error(error: object) -> None:
+    """Print an error message after the shared prefix.
+
+    The message is added as plain text, so brackets in exception messages
+    (SQL parameters, paths) are not mistaken for Rich markup.
     """
-    console.print(f"[bold blue]Parsing mwTab: {file_ref}[/bold blue]")
+    console.print(Text.assemble(_ERROR_PREFIX, (str(error), "bold red")))
 
-    if dry_run:
-        console.print("[bold yellow]⚠ Dry run mode - not writing to database[/bold yellow]")
 
-    # Determine if file_ref is UUID or path
-    file_uuid: Optional[UUID] = None
-    file_path: Optional[Path] = None
+def _add_rows(table: Table, rows: Iterable[Sequence[str]]) -> None:
+    """Append rows (sequences of cell values) to a Rich table."""
+    add_row = table.add_row
+    for row in rows:
+        add_row(*row)
 
-    if _is_uuid(file_ref):
-        file_uuid = UUID(file_ref)
-        console.print(f"[dim]Using file_id: {file_uuid}[/dim]")
-    else:
-        file_path = Path(file_ref)
-        if not file_path.exists():
-            console.print(f"[bold red]✗ Error: File not found: {file_path}[/bold red]")
-            sys.exit(1)
-        file_path = file_path.absolute()
-        console.print(f"[dim]Using file path: {file_path}[/dim]")
 
-    try:
-        # Get database session
-        db = next(get_db())
+def _format_list(items: Collection[str], style: str, bullet: str = "", limit: int = 10) -> str:
+    """Format the first `limit` items as indented lines, noting how many were left out."""
+    lines = [f"  [{style}]{bullet}{item}[/{style}]" for item in islice(items, limit)]
+    if len(items) > limit:
+        lines.append(f"  [dim]... and {len(items) - limit} more[/dim]")
+    return "\n".join(lines)
 
-        # Initialize service
-        parse_service = ParseService(db)
 
-        # Parse file
-        stats = parse_service.parse_mwtab_file(
-            file_id=file_uuid,
-            file_path=file_path,
-            dry_run=dry_run
-        )
+def _make_progress(disable: bool = False):
+    """Create the transient progress bar shown while long-running commands work."""
+    from rich.progress import (
+        BarColumn,
+        MofNCompleteColumn,
+        Progress,
+        SpinnerColumn,
+        TextColumn,
+        TimeElapsedColumn,
+    )
 
-        # Display results
-        table = Table(title="mwTab Parse Results")
-        table.add_column("Property", style="cyan")
-        table.add_column("Value", style="green")
-
-        table.add_row("Study ID", stats.study_id or "N/A")
-        table.add_row("Analysis ID", stats.analysis_id or "N/A")
-        table.add_row("", "")
-        table.add_row("[bold]Samples[/bold]", "")
-        table.add_row("  Processed", str(stats.samples_processed))
-        table.add_row("  Created", str(stats.samples_created))
-        table.add_row("", "")
-        table.add_row("[bold]Features (Metabolites)[/bold]", "")
-        table.add_row("  Processed", str(stats.features_processed))
-        table.add_row("  Created", str(stats.features_created))
-        table.add_row("", "")
-        table.add_row("[bold]Measurements[/bold]", "")
-        table.add_row("  Processed", str(stats.measurements_processed))
-        table.add_row("  Inserted/Updated", str(stats.measurements_inserted))
-        table.add_row("", "")
-        table.add_row("Warnings", str(stats.warnings_count))
-        table.add_row("Mode", "Dry Run" if dry_run else "Production")
+    return Progress(
+        SpinnerColumn(),
+        TextColumn("[progress.description]{task.description}"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        TimeElapsedColumn(),
+        console=console,
+        transient=True,
+        disable=disable,
+    )
 
-        console.print(table)
 
-        if stats.warnings_count > 0:
-            console.print(f"[bold yellow]⚠ {stats.warnings_count} warnings during parsing[/bold yellow]")
+def _track(progress, description: str) -> Callable[..., None]:
+    """Add a task to a progress bar and return a (done, total=None) callback updating it."""
+    task = progress.add_task(description, total=None)
+    return lambda done, total=None: progress.update(task, completed=done, total=total)
 
-        if stats.measurements_processed == 0 and stats.features_processed == 0:
-            console.print("[bold yellow]⚠ No MS_METABOLITE_DATA section found (may be NMR study)[/bold yellow]")
 
-        if not dry_run:
-            console.print("[bold green]✓ File parsed and data stored successfully![/bold green]")
-        else:
-            console.print("[bold blue]✓ Dry run completed - no data was written[/bold blue]")
+def _by_count_desc(counts: dict) -> list:
+    """Return (key, count) pairs, highest count first."""
+    return sorted(counts.items(), key=itemgetter(1), reverse=True)
 
-    except ValueError as e:
-        console.print(f"[bold red]✗ Validation error: {e}[/bold red]")
-        sys.exit(1)
-    except FileNotFoundError as e:
-        console.print(f"[bold red]✗ File not found: {e}[/bold red]")
-        sys.exit(1)
-    except Exception as e:
-        console.print(f"[bold red]✗ Error: {e}[/bold red]")
-        logger.exception("Error during mwTab parsing")
-        sys.exit(1)
 
+def _make_kv_table(title: str) -> Table:
+    """Create a Property/Value results table."""
+    table = Table(title=title)
+    table.add_column("Property", style="cyan")
+    table.add_column("Value", style="green")
+    return table
 
-@parse_app.command("mwtab-ms")
-def parse_mwtab_ms(
-    file_ref: str = typer.Argument(None, help="Path to mwTab file (or use --file-id)"),
-    file_id: Optional[str] = typer.Option(None, "--file-id", help="UUID of file from database"),
-    dry_run: bool = typer.Option(False, "--dry-run", help="Don't write to database, only show stats"),
-):
-    """Parse mwTab file MS_METABOLITE_DATA section and store measurements.
 
-    This command parses LC/GC-MS metabolite data with:
-    - Column-level tracking (col_index)
-    - Replicate detection (replicate_ix)
-    - Idempotent inserts (no duplicates)
+def _make_metric_table(title: str) -> Table:
+    """Create a Metric/Value table for bulk command results."""
+    table = Table(title=title)
+    table.add_column("Metric", style="cyan", width=25)
+    table.add_column("Value", style="green", justify="right")
+    return table
 
-    Provide either a file path or --file-id to parse from database.
+
+def _make_derivation_table(title: str) -> Table:
+    """Create a Metric/Count table for derive results."""
+    table = Table(title=title, show_header=True, header_style="bold cyan")
+    table.add_column("Metric", style="cyan", width=30)
+    table.add_column("Count", style="green", justify="right")
+    return table
+
+
+@lru_cache(maxsize=128)
+def _parse_uuid(value: str) -> UUID:
+    """Parse a UUID argument (raises ValueError if malformed)."""
+    return UUID(value)
+
+
+def _is_uuid(value: str) -> bool:
+    """Check if string is a UUID in canonical 8-4-4-4-12 hex form."""
+    return _UUID_RE.match(value) is not None
+
+
+@dataclass(frozen=True)
+class _ParseSpec:
+    """What differs between the single-file parse commands."""
+
+    name: str  # e.g. "MS data", used in messages
+    title: str  # result table title
+    features_label: str  # feature kind shown in the result table
+    success_message: str
+    # Look up the file path for --file-id here (the service only takes a path)
+    resolve_path: bool = True
+
+
+_MWTAB = _ParseSpec(
+    name="mwTab",
+    title="mwTab Parse Results",
+    features_label="Metabolites",
+    success_message="File parsed and data stored successfully!",
+    resolve_path=False,
+)
+_MWTAB_MS = _ParseSpec(
+    name="MS data",
+    title="MS Metabolite Data Parse Results",
+    features_label="Metabolites",
+    success_message="MS data parsed and stored successfully!",
+)
+_MWTAB_NMR_BINNED = _ParseSpec(
+    name="NMR binned data",
+    title="NMR Binned Data Parse Results",
+    features_label="NMR Bins",
+    success_message="NMR binned data parsed and stored successfully!",
+)
+
+
+def _existing_path(file_ref: str) -> Path:
+    """Return FILE_REF as an absolute path, exiting if it does not exist."""
+    file_path = Path(file_ref)
+    if not file_path.exists():
+        console.print(f"[bold red]✗ Error: File not found: {file_path}[/bold red]")
+        raise typer.Exit(code=1)
+    return file_path.absolute()
+
+
+def _resolve_file_args(spec: _ParseSpec, file_ref: Optional[str], file_id: Optional[str]):
+    """Validate a FILE_REF / --file-id pair.
+
+    Returns:
+        Tuple of (file_uuid, file_path); exactly one is set
     """
-    # Validate inputs
     if not file_ref and not file_id:
         console.print("[bold red]✗ Error: Provide either a file path or --file-id[/bold red]")
-        sys.exit(1)
+        raise typer.Exit(code=1)
 
     if file_ref and file_id:
         console.print("[bold red]✗ Error: Provide either file path OR --file-id, not both[/bold red]")
-        sys.exit(1)
-
-    file_uuid: Optional[UUID] = None
-    file_path: Optional[Path] = None
+        raise typer.Exit(code=1)
 
     if file_id:
         try:
-            file_uuid = UUID(file_id)
+            file_uuid = _parse_uuid(file_id)
         except ValueError:
             console.print(f"[bold red]✗ Error: Invalid UUID format: {file_id}[/bold red]")
-            sys.exit(1)
-        console.print(f"[bold blue]Parsing MS data from file_id: {file_uuid}[/bold blue]")
-    else:
-        file_path = Path(file_ref)
-        if not file_path.exists():
-            console.print(f"[bold red]✗ Error: File not found: {file_path}[/bold red]")
-            sys.exit(1)
-        file_path = file_path.absolute()
-        console.print(f"[bold blue]Parsing MS data from: {file_path}[/bold blue]")
+            raise typer.Exit(code=1)
+        console.print(f"[bold blue]Parsing {spec.name} from file_id: {file_uuid}[/bold blue]")
+        return file_uuid, None
+
+    file_path = _existing_path(file_ref)
+    console.print(f"[bold blue]Parsing {spec.name} from: {file_path}[/bold blue]")
+    return None, file_path
+
+
+def _resolve_file_path(db, file_uuid: UUID) -> Path:
+    """Look up the path of a stored file, exiting if it is unknown or missing."""
+    from sqlalchemy import select
+
+    from metaloader.models import File
+
+    # Only the path column, not a full File row
+    path_abs = db.execute(select(File.path_abs).where(File.id == file_uuid)).scalar_one_or_none()
+    if path_abs is None:
+        console.print(f"[bold red]✗ Error: File not found in database: {file_uuid}[/bold red]")
+        raise typer.Exit(code=1)
+
+    file_path = Path(path_abs)
+    if not file_path.exists():
+        console.print(f"[bold red]✗ Error: File path not found: {file_path}[/bold red]")
+        raise typer.Exit(code=1)
+    return file_path
+
+
+def _run_parse(
+    spec: _ParseSpec,
+    parse: Callable,
+    file_uuid: Optional[UUID],
+    file_path: Optional[Path],
+    dry_run: bool,
+    refresh: bool = True,
+) -> None:
+    """Run a single-file parse command and display its results.
+
+    Args:
+        spec: Command description
+        parse: Called as parse(db, file_uuid, file_path), returns parse stats
+        file_uuid: File ID from the database, if given
+        file_path: Path to the file, if given
+        dry_run: Whether nothing is written
+        refresh: Whether to refresh v_long_measurements after writing
+    """
+    from metaloader.database import session_scope
 
     if dry_run:
         console.print("[bold yellow]⚠ Dry run mode - not writing to database[/bold yellow]")
 
     try:
-        # Get database session
-        db = next(get_db())
-
-        # If file_id provided, look up the file record
-        if file_uuid:
-            file_record = db.query(File).filter(File.id == file_uuid).first()
-            if not file_record:
-                console.print(f"[bold red]✗ Error: File not found in database: {file_uuid}[/bold red]")
-                sys.exit(1)
-            file_path = Path(file_record.path_abs)
-            if not file_path.exists():
-                console.print(f"[bold red]✗ Error: File path not found: {file_path}[/bold red]")
-                sys.exit(1)
-
-        # Initialize service
-        parse_service = ParseMSService(db)
-
-        # Parse file
-        stats = parse_service.parse_file(
-            file_path=file_path,
-            file_id=file_uuid,
-            dry_run=dry_run
-        )
+        with session_scope() as db:
+            # If file_id provided, look up the file record
+            if file_uuid and spec.resolve_path:
+                file_path = _resolve_file_path(db, file_uuid)
+
+            stats = parse(db, file_uuid, file_path)
+            # mwTab upserts measurements; the MS/NMR services count conflicts as skipped
+            skipped = getattr(stats, "measurements_skipped", None)
+
+            # Display results
+            table = _make_kv_table(spec.title)
+
+            _add_rows(table, [
+                ("Study ID", stats.study_id or "N/A"),
+                ("Analysis ID", stats.analysis_id or "N/A"),
+                ("", ""),
+                ("[bold]Samples[/bold]", ""),
+                ("  Processed", str(stats.samples_processed)),
+                ("  Created", str(stats.samples_created)),
+                ("", ""),
+                (f"[bold]Features ({spec.features_label})[/bold]", ""),
+                ("  Processed", str(stats.features_processed)),
+                ("  Created", str(stats.features_created)),
+                ("", ""),
+                ("[bold]Measurements[/bold]", ""),
+                ("  Processed", str(stats.measurements_processed)),
+            ])
+            if skipped is None:
+                table.add_row("  Inserted/Updated", str(stats.measurements_inserted))
+            else:
+                table.add_row("  Inserted", str(stats.measurements_inserted))
+                table.add_row("  Skipped (conflict)", str(skipped))
+            _add_rows(table, [
+                ("", ""),
+                ("Warnings", str(stats.warnings_count)),
+                ("Mode", "Dry Run" if dry_run else "Production"),
+            ])
 
-        # Display results
-        table = Table(title="MS Metabolite Data Parse Results")
-        table.add_column("Property", style="cyan")
-        table.add_column("Value", style="green")
-
-        table.add_row("Study ID", stats.study_id or "N/A")
-        table.add_row("Analysis ID", stats.analysis_id or "N/A")
-        table.add_row("", "")
-        table.add_row("[bold]Samples[/bold]", "")
-        table.add_row("  Processed", str(stats.samples_processed))
-        table.add_row("  Created", str(stats.samples_created))
-        table.add_row("", "")
-        table.add_row("[bold]Features (Metabolites)[/bold]", "")
-        table.add_row("  Processed", str(stats.features_processed))
-        table.add_row("  Created", str(stats.features_created))
-        table.add_row("", "")
-        table.add_row("[bold]Measurements[/bold]", "")
-        table.add_row("  Processed", str(stats.measurements_processed))
-        table.add_row("  Inserted", str(stats.measurements_inserted))
-        table.add_row("  Skipped (conflict)", str(stats.measurements_skipped))
-        table.add_row("", "")
-        table.add_row("Warnings", str(stats.warnings_count))
-        table.add_row("Mode", "Dry Run" if dry_run else "Production")
-
-        console.print(table)
+            console.print(table)
 
-        if stats.warnings_count > 0:
-            console.print(f"[bold yellow]⚠ {stats.warnings_count} warnings during parsing[/bold yellow]")
+            if stats.warnings_count > 0:
+                console.print(f"[bold yellow]⚠ {stats.warnings_count} warnings during parsing[/bold yellow]")
 
-        if stats.measurements_skipped > 0:
-            console.print(f"[dim]Note: {stats.measurements_skipped} measurements skipped (already exist)[/dim]")
+            if skipped:
+                console.print(f"[dim]Note: {skipped} measurements skipped (already exist)[/dim]")
+            elif skipped is None and stats.measurements_processed == 0 and stats.features_processed == 0:
+                console.print("[bold yellow]⚠ No MS_METABOLITE_DATA section found (may be NMR study)[/bold yellow]")
 
-        if not dry_run:
-            console.print("[bold green]✓ MS data parsed and stored successfully![/bold green]")
-        else:
-            console.print("[bold blue]✓ Dry run completed - no data was written[/bold blue]")
+            if not dry_run:
+                if refresh:
+                    _refresh_long_measurements(db)
+                console.print(f"[bold green]✓ {spec.success_message}[/bold green]")
+            else:
+                console.print("[bold blue]✓ Dry run completed - no data was written[/bold blue]")
 
+    except typer.Exit:
+        raise
     except ValueError as e:
         console.print(f"[bold red]✗ Validation error: {e}[/bold red]")
-        sys.exit(1)
+        raise typer.Exit(code=1)
     except FileNotFoundError as e:
         console.print(f"[bold red]✗ File not found: {e}[/bold red]")
-        sys.exit(1)
+        raise typer.Exit(code=1)
     except Exception as e:
-        console.print(f"[bold red]✗ Error: {e}[/bold red]")
-        logger.exception("Error during MS data parsing")
-        sys.exit(1)
+        _print_error(e)
+        logger.exception("Error during %s parsing", spec.name)
+        raise typer.Exit(code=1)
+
+
+@parse_app.command("mwtab")
+def parse_mwtab(
+    file_ref: str = typer.Argument(..., help="File ID (UUID) or path to mwTab file"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Don't write to database, only show stats"),
+    no_refresh: bool = typer.Option(False, "--no-refresh", help=_NO_REFRESH_HELP),
+):
+    """Parse mwTab file and extract samples, features, and measurements.
+
+    FILE_REF can be:
+    - A UUID from the files table (e.g., from 'metaloader ingest-file')
+    - A direct path to an mwTab file
+    """
+    from metaloader.services.parse_service import ParseService
+
+    console.print(f"[bold blue]Parsing mwTab: {file_ref}[/bold blue]")
+
+    # Determine if file_ref is UUID or path
+    file_uuid: Optional[UUID] = None
+    file_path: Optional[Path] = None
+
+    if _is_uuid(file_ref):
+        file_uuid = _parse_uuid(file_ref)
+        console.print(f"[dim]Using file_id: {file_uuid}[/dim]")
+    else:
+        file_path = _existing_path(file_ref)
+        console.print(f"[dim]Using file path: {file_path}[/dim]")
+
+    _run_parse(
+        _MWTAB,
+        lambda db, file_uuid, file_path: ParseService(db).parse_mwtab_file(
+            file_id=file_uuid, file_path=file_path, dry_run=dry_run
+        ),
+        file_uuid, file_path, dry_run, refresh=not no_refresh,
+    )
+
+
+@parse_app.command("mwtab-ms")
+def parse_mwtab_ms(
+    file_ref: str = typer.Argument(None, help="Path to mwTab file (or use --file-id)"),
+    file_id: Optional[str] = typer.Option(None, "--file-id", help="UUID of file from database"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Don't write to database, only show stats"),
+    no_refresh: bool = typer.Option(False, "--no-refresh", help=_NO_REFRESH_HELP),
+):
+    """Parse mwTab file MS_METABOLITE_DATA section and store measurements.
+
+    This command parses LC/GC-MS metabolite data with:
+    - Column-level tracking (col_index)
+    - Replicate detection (replicate_ix)
+    - Idempotent inserts (no duplicates)
+
+    Provide either a file path or --file-id to parse from database.
+    """
+    from metaloader.services.parse_ms_service import ParseMSService
+
+    file_uuid, file_path = _resolve_file_args(_MWTAB_MS, file_ref, file_id)
+    _run_parse(
+        _MWTAB_MS,
+        lambda db, file_uuid, file_path: ParseMSService(db).parse_file(
+            file_path=file_path, file_id=file_uuid, dry_run=dry_run
+        ),
+        file_uuid, file_path, dry_run, refresh=not no_refresh,
+    )
 
 
 @parse_app.command("mwtab-nmr-binned")
@@ -470,6 +744,7 @@ def parse_mwtab_nmr_binned(
     file_ref: str = typer.Argument(None, help="Path to mwTab file (or use --file-id)"),
     file_id: Optional[str] = typer.Option(None, "--file-id", help="UUID of file from database"),
     dry_run: bool = typer.Option(False, "--dry-run", help="Don't write to database, only show stats"),
+    no_refresh: bool = typer.Option(False, "--no-refresh", help=_NO_REFRESH_HELP),
 ):
     """Parse mwTab file NMR_BINNED_DATA section and store measurements.
 
@@ -481,108 +756,83 @@ def parse_mwtab_nmr_binned(
 
     Provide either a file path or --file-id to parse from database.
     """
-    # Validate inputs
-    if not file_ref and not file_id:
-        console.print("[bold red]✗ Error: Provide either a file path or --file-id[/bold red]")
-        sys.exit(1)
+    from metaloader.services.parse_nmr_service import ParseNMRService
 
-    if file_ref and file_id:
-        console.print("[bold red]✗ Error: Provide either file path OR --file-id, not both[/bold red]")
-        sys.exit(1)
+    file_uuid, file_path = _resolve_file_args(_MWTAB_NMR_BINNED, file_ref, file_id)
+    _run_parse(
+        _MWTAB_NMR_BINNED,
+        lambda db, file_uuid, file_path: ParseNMRService(db).parse_file(
+            file_path=file_path, file_id=file_uuid, dry_run=dry_run
+        ),
+        file_uuid, file_path, dry_run, refresh=not no_refresh,
+    )
 
-    file_uuid: Optional[UUID] = None
-    file_path: Optional[Path] = None
 
-    if file_id:
+@parse_app.command("mwtab-all")
+def parse_mwtab_all(
+    import_id: Optional[str] = typer.Option(None, "--import-id", help="Only parse files from this import"),
+    max_files: Optional[int] = typer.Option(None, "--max-files", help="Maximum number of files to parse"),
+    concurrency: int = typer.Option(
+        1, "--concurrency", "-j", min=1,
+        help="Number of worker processes"
+    ),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Don't write to database, only show what would be parsed"),
+):
+    """Parse all pending mwTab files in parallel.
+
+    Picks up files with detected_type='mwtab' and parse_status='pending' and
+    parses them in a pool of worker processes, each with its own database
+    session. Every file is committed on its own and its parse_status is set
+    to 'success' or 'failed'.
+    """
+    from metaloader.database import session_scope
+    from metaloader.services.parse_dir_service import ParseDirService
+
+    console.print("[bold blue]Parsing pending mwTab files[/bold blue]")
+
+    import_uuid: Optional[UUID] = None
+    if import_id:
         try:
-            file_uuid = UUID(file_id)
+            import_uuid = _parse_uuid(import_id)
         except ValueError:
-            console.print(f"[bold red]✗ Error: Invalid UUID format: {file_id}[/bold red]")
-            sys.exit(1)
-        console.print(f"[bold blue]Parsing NMR binned data from file_id: {file_uuid}[/bold blue]")
-    else:
-        file_path = Path(file_ref)
-        if not file_path.exists():
-            console.print(f"[bold red]✗ Error: File not found: {file_path}[/bold red]")
-            sys.exit(1)
-        file_path = file_path.absolute()
-        console.print(f"[bold blue]Parsing NMR binned data from: {file_path}[/bold blue]")
+            console.print(f"[bold red]✗ Error: Invalid UUID format: {import_id}[/bold red]")
+            raise typer.Exit(code=1)
+        console.print(f"[dim]Import: {import_uuid}[/dim]")
+
+    if max_files:
+        console.print(f"[dim]Max files: {max_files}[/dim]")
 
     if dry_run:
-        console.print("[bold yellow]⚠ Dry run mode - not writing to database[/bold yellow]")
+        console.print("[bold yellow]Dry run mode - no data will be written[/bold yellow]")
+    else:
+        console.print(f"[dim]Workers: {concurrency}[/dim]")
 
     try:
-        # Get database session
-        db = next(get_db())
-
-        # If file_id provided, look up the file record
-        if file_uuid:
-            file_record = db.query(File).filter(File.id == file_uuid).first()
-            if not file_record:
-                console.print(f"[bold red]✗ Error: File not found in database: {file_uuid}[/bold red]")
-                sys.exit(1)
-            file_path = Path(file_record.path_abs)
-            if not file_path.exists():
-                console.print(f"[bold red]✗ Error: File path not found: {file_path}[/bold red]")
-                sys.exit(1)
-
-        # Initialize service
-        parse_service = ParseNMRService(db)
-
-        # Parse file
-        stats = parse_service.parse_file(
-            file_path=file_path,
-            file_id=file_uuid,
-            dry_run=dry_run
-        )
+        with session_scope() as db:
+            parse_service = ParseDirService(db)
 
-        # Display results
-        table = Table(title="NMR Binned Data Parse Results")
-        table.add_column("Property", style="cyan")
-        table.add_column("Value", style="green")
-
-        table.add_row("Study ID", stats.study_id or "N/A")
-        table.add_row("Analysis ID", stats.analysis_id or "N/A")
-        table.add_row("", "")
-        table.add_row("[bold]Samples[/bold]", "")
-        table.add_row("  Processed", str(stats.samples_processed))
-        table.add_row("  Created", str(stats.samples_created))
-        table.add_row("", "")
-        table.add_row("[bold]Features (NMR Bins)[/bold]", "")
-        table.add_row("  Processed", str(stats.features_processed))
-        table.add_row("  Created", str(stats.features_created))
-        table.add_row("", "")
-        table.add_row("[bold]Measurements[/bold]", "")
-        table.add_row("  Processed", str(stats.measurements_processed))
-        table.add_row("  Inserted", str(stats.measurements_inserted))
-        table.add_row("  Skipped (conflict)", str(stats.measurements_skipped))
-        table.add_row("", "")
-        table.add_row("Warnings", str(stats.warnings_count))
-        table.add_row("Mode", "Dry Run" if dry_run else "Production")
+            with _make_progress(disable=dry_run) as progress:
+                stats = parse_service.parse_pending_parallel(
+                    detected_type="mwtab",
+                    import_id=import_uuid,
+                    max_files=max_files,
+                    concurrency=concurrency,
+                    dry_run=dry_run,
+                    progress_callback=_track(progress, "Parsing"),
+                )
 
-        console.print(table)
-
-        if stats.warnings_count > 0:
-            console.print(f"[bold yellow]⚠ {stats.warnings_count} warnings during parsing[/bold yellow]")
+            if not dry_run and stats.files_success:
+                _refresh_long_measurements(db)
 
-        if stats.measurements_skipped > 0:
-            console.print(f"[dim]Note: {stats.measurements_skipped} measurements skipped (already exist)[/dim]")
-
-        if not dry_run:
-            console.print("[bold green]✓ NMR binned data parsed and stored successfully![/bold green]")
-        else:
-            console.print("[bold blue]✓ Dry run completed - no data was written[/bold blue]")
+            _display_parse_dir_results(stats, dry_run)
 
     except ValueError as e:
-        console.print(f"[bold red]✗ Validation error: {e}[/bold red]")
-        sys.exit(1)
-    except FileNotFoundError as e:
-        console.print(f"[bold red]✗ File not found: {e}[/bold red]")
-        sys.exit(1)
+        _print_error(e)
+        raise typer.Exit(code=1)
     except Exception as e:
-        console.print(f"[bold red]✗ Error: {e}[/bold red]")
-        logger.exception("Error during NMR binned data parsing")
-        sys.exit(1)
+        _print_error(e)
+        logger.exception("Error during parallel mwTab parsing")
+        raise typer.Exit(code=1)
 
 
 @qc_app.command("summary")
@@ -600,6 +850,9 @@ def qc_summary(
     - Unit distribution
     - Sample statistics
     """
+    from metaloader.database import session_scope
+    from metaloader.qc import QCFilters, QCService
+
     console.print("[bold blue]Running QC Summary...[/bold blue]")
 
     # Show applied filters
@@ -609,191 +862,144 @@ def qc_summary(
         console.print(f"[dim]Filter: analysis_id = {analysis_id}[/dim]")
 
     try:
-        # Get database session
-        db = next(get_db())
-
-        # Initialize service
-        qc_service = QCService(db)
-
-        # Build filters
-        filters = QCFilters(study_id=study_id, analysis_id=analysis_id)
-
-        # Run QC
-        results = qc_service.run_summary(filters)
-
-        # === Main metrics table ===
-        main_table = Table(title="QC Summary - Measurements", show_header=True, header_style="bold cyan")
-        main_table.add_column("Metric", style="cyan", width=35)
-        main_table.add_column("Value", style="green", justify="right")
-        main_table.add_column("Status", justify="center")
-
-        # Total measurements
-        main_table.add_row(
-            "Total Measurements",
-            f"{results.total_measurements:,}",
-            "[green]OK[/green]" if results.total_measurements > 0 else "[yellow]EMPTY[/yellow]"
-        )
-
-        # Non-null values
-        main_table.add_row(
-            "Non-NULL Values",
-            f"{results.non_null_values:,}",
-            ""
-        )
-
-        # Null values
-        null_status = "[green]OK[/green]"
-        if results.null_percent > 50:
-            null_status = "[red]HIGH[/red]"
-        elif results.null_percent > 20:
-            null_status = "[yellow]WARN[/yellow]"
-
-        main_table.add_row(
-            "NULL Values",
-            f"{results.null_count:,} ({results.null_percent:.2f}%)",
-            null_status
-        )
-
-        main_table.add_row("", "", "")  # Separator
-
-        # Duplicates
-        dup_status = "[green]OK[/green]" if results.duplicate_pairs_count == 0 else "[red]ISSUE[/red]"
-        main_table.add_row(
-            "Duplicate (sample, feature) pairs",
-            f"{results.duplicate_pairs_count:,}",
-            dup_status
-        )
-
-        main_table.add_row("", "", "")  # Separator
-
-        # Special values
-        main_table.add_row(
-            "NaN Values",
-            f"{results.nan_count:,}",
-            "[green]OK[/green]" if results.nan_count == 0 else "[yellow]WARN[/yellow]"
-        )
-        main_table.add_row(
-            "+Infinity Values",
-            f"{results.pos_inf_count:,}",
-            "[green]OK[/green]" if results.pos_inf_count == 0 else "[yellow]WARN[/yellow]"
-        )
-        main_table.add_row(
-            "-Infinity Values",
-            f"{results.neg_inf_count:,}",
-            "[green]OK[/green]" if results.neg_inf_count == 0 else "[yellow]WARN[/yellow]"
-        )
-
-        main_table.add_row("", "", "")  # Separator
-
-        # Negative values
-        neg_status = "[green]OK[/green]"
-        if results.total_measurements > 0:
-            neg_pct = (results.negative_values_count / results.total_measurements) * 100
-            if neg_pct > 10:
-                neg_status = "[yellow]WARN[/yellow]"
-        main_table.add_row(
-            "Negative Values",
-            f"{results.negative_values_count:,}",
-            neg_status
-        )
-
-        main_table.add_row("", "", "")  # Separator
-
-        # Orphans
-        main_table.add_row(
-            "Orphan Samples (no FK match)",
-            f"{results.orphan_sample_count:,}",
-            "[green]OK[/green]" if results.orphan_sample_count == 0 else "[red]ISSUE[/red]"
-        )
-        main_table.add_row(
-            "Orphan Features (no FK match)",
-            f"{results.orphan_feature_count:,}",
-            "[green]OK[/green]" if results.orphan_feature_count == 0 else "[red]ISSUE[/red]"
-        )
-
-        console.print(main_table)
-        console.print()
-
-        # === Sample stats table ===
-        sample_table = Table(title="Sample Statistics", show_header=True, header_style="bold cyan")
-        sample_table.add_column("Metric", style="cyan", width=35)
-        sample_table.add_column("Value", style="green", justify="right")
-        sample_table.add_column("Status", justify="center")
-
-        sample_table.add_row(
-            "Total Samples" + (f" (study: {study_id})" if study_id else ""),
-            f"{results.samples_total:,}",
-            ""
-        )
-
-        no_factors_status = "[green]OK[/green]"
-        if results.samples_total > 0:
-            no_factors_pct = (results.samples_no_factors / results.samples_total) * 100
-            if no_factors_pct > 50:
-                no_factors_status = "[yellow]WARN[/yellow]"
-
-        sample_table.add_row(
-            "Samples without factors_raw",
-            f"{results.samples_no_factors:,}",
-            no_factors_status
-        )
-
-        console.print(sample_table)
-        console.print()
-
-        # === Top units table ===
-        if results.top_units:
-            units_table = Table(title="Top 10 Units", show_header=True, header_style="bold cyan")
-            units_table.add_column("#", style="dim", width=4)
-            units_table.add_column("Unit", style="cyan")
-            units_table.add_column("Count", style="green", justify="right")
-
-            for i, (unit, count) in enumerate(results.top_units, 1):
-                unit_display = f"[dim]{unit}[/dim]" if unit == "<NULL>" else unit
-                units_table.add_row(str(i), unit_display, f"{count:,}")
-
-            console.print(units_table)
-            console.print()
-
-        # === Top NULL features table ===
-        if results.top_null_features:
-            null_features_table = Table(
-                title="Top 10 Features with NULL Values",
-                show_header=True,
-                header_style="bold cyan"
-            )
-            null_features_table.add_column("#", style="dim", width=4)
-            null_features_table.add_column("Feature UID", style="cyan")
-            null_features_table.add_column("NULL Count", style="yellow", justify="right")
-
-            for i, (feature_uid, count) in enumerate(results.top_null_features, 1):
-                # Truncate long feature UIDs
-                display_uid = feature_uid if len(feature_uid) <= 60 else f"{feature_uid[:57]}..."
-                null_features_table.add_row(str(i), display_uid, f"{count:,}")
-
-            console.print(null_features_table)
-            console.print()
-
-        # Final status
-        issues = []
-        if results.duplicate_pairs_count > 0:
-            issues.append(f"{results.duplicate_pairs_count} duplicate pairs")
-        if results.orphan_sample_count > 0:
-            issues.append(f"{results.orphan_sample_count} orphan samples")
-        if results.orphan_feature_count > 0:
-            issues.append(f"{results.orphan_feature_count} orphan features")
-        if results.null_percent > 50:
-            issues.append(f"high NULL rate ({results.null_percent:.1f}%)")
-
-        if issues:
-            console.print(f"[bold yellow]⚠ Issues found: {', '.join(issues)}[/bold yellow]")
-        else:
-            console.print("[bold green]✓ QC Summary completed - no critical issues found[/bold green]")
+        with session_scope() as db:
+            # Initialize service
+            qc_service = QCService(db)
+
+            # Build filters
+            filters = QCFilters(study_id=study_id, analysis_id=analysis_id)
+
+            # Run QC
+            results = qc_service.run_summary(filters)
+
+            # Derived percentages, computed once
+            total = results.total_measurements
+            null_pct = results.null_percent
+            neg_pct = results.negative_values_count / total * 100 if total else 0.0
+            samples_total = results.samples_total
+            no_factors_pct = results.samples_no_factors / samples_total * 100 if samples_total else 0.0
+
+            # === Main metrics table ===
+            main_table = Table(title="QC Summary - Measurements", show_header=True, header_style="bold cyan")
+            main_table.add_column("Metric", style="cyan", width=35)
+            main_table.add_column("Value", style="green", justify="right")
+            main_table.add_column("Status", justify="center")
+
+            # Status thresholds
+            if null_pct > 50:
+                null_status = _HIGH
+            elif null_pct > 20:
+                null_status = _WARN
+            else:
+                null_status = _OK
+            neg_status = _WARN if neg_pct > 10 else _OK
+
+            # Metric groups are split by section lines rather than blank rows
+            sections = [
+                [
+                    ("Total Measurements", f"{total:,}", _OK if total > 0 else _EMPTY),
+                    ("Non-NULL Values", f"{results.non_null_values:,}", ""),
+                    ("NULL Values", f"{results.null_count:,} ({null_pct:.2f}%)", null_status),
+                ],
+                [
+                    ("Duplicate (sample, feature) pairs", f"{results.duplicate_pairs_count:,}",
+                     _OK if results.duplicate_pairs_count == 0 else _ISSUE),
+                ],
+                [
+                    ("NaN Values", f"{results.nan_count:,}", _OK if results.nan_count == 0 else _WARN),
+                    ("+Infinity Values", f"{results.pos_inf_count:,}", _OK if results.pos_inf_count == 0 else _WARN),
+                    ("-Infinity Values", f"{results.neg_inf_count:,}", _OK if results.neg_inf_count == 0 else _WARN),
+                ],
+                [
+                    ("Negative Values", f"{results.negative_values_count:,}", neg_status),
+                ],
+                [
+                    ("Orphan Samples (no FK match)", f"{results.orphan_sample_count:,}",
+                     _OK if results.orphan_sample_count == 0 else _ISSUE),
+                    ("Orphan Features (no FK match)", f"{results.orphan_feature_count:,}",
+                     _OK if results.orphan_feature_count == 0 else _ISSUE),
+                ],
+            ]
+            for i, rows in enumerate(sections):
+                if i:
+                    main_table.add_section()
+                _add_rows(main_table, rows)
+
+            # Everything is printed at once at the end
+            output = [main_table, ""]
+
+            # === Sample stats table ===
+            sample_table = Table(title="Sample Statistics", show_header=True, header_style="bold cyan")
+            sample_table.add_column("Metric", style="cyan", width=35)
+            sample_table.add_column("Value", style="green", justify="right")
+            sample_table.add_column("Status", justify="center")
+
+            no_factors_status = _WARN if no_factors_pct > 50 else _OK
+
+            _add_rows(sample_table, [
+                ("Total Samples" + (f" (study: {study_id})" if study_id else ""),
+                 f"{samples_total:,}", ""),
+                ("Samples without factors_raw", f"{results.samples_no_factors:,}", no_factors_status),
+            ])
+
+            output += [sample_table, ""]
+
+            # === Top units table ===
+            if results.top_units:
+                units_table = Table(title="Top 10 Units", show_header=True, header_style="bold cyan")
+                units_table.add_column("#", style="dim", width=4)
+                units_table.add_column("Unit", style="cyan")
+                units_table.add_column("Count", style="green", justify="right")
+
+                _add_rows(units_table, (
+                    (str(i), f"[dim]{unit}[/dim]" if unit == "<NULL>" else unit, f"{count:,}")
+                    for i, (unit, count) in enumerate(results.top_units, 1)
+                ))
+
+                output += [units_table, ""]
+
+            # === Top NULL features table ===
+            if results.top_null_features:
+                null_features_table = Table(
+                    title="Top 10 Features with NULL Values",
+                    show_header=True,
+                    header_style="bold cyan"
+                )
+                null_features_table.add_column("#", style="dim", width=4)
+                # Fixed widths, so Rich does not measure every cell; long
+                # feature UIDs are truncated to the column width
+                null_features_table.add_column("Feature UID", style="cyan", width=60)
+                null_features_table.add_column("NULL Count", style="yellow", justify="right", width=12)
+
+                _add_rows(null_features_table, (
+                    (str(i), feature_uid if len(feature_uid) <= 60 else f"{feature_uid[:57]}...", f"{count:,}")
+                    for i, (feature_uid, count) in enumerate(results.top_null_features, 1)
+                ))
+
+                output += [null_features_table, ""]
+
+            # Final status
+            issues = []
+            if results.duplicate_pairs_count > 0:
+                issues.append(f"{results.duplicate_pairs_count} duplicate pairs")
+            if results.orphan_sample_count > 0:
+                issues.append(f"{results.orphan_sample_count} orphan samples")
+            if results.orphan_feature_count > 0:
+                issues.append(f"{results.orphan_feature_count} orphan features")
+            if null_pct > 50:
+                issues.append(f"high NULL rate ({null_pct:.1f}%)")
+
+            if issues:
+                output.append(f"[bold yellow]⚠ Issues found: {', '.join(issues)}[/bold yellow]")
+            else:
+                output.append("[bold green]✓ QC Summary completed - no critical issues found[/bold green]")
+
+            console.print(Group(*output))
 
     except Exception as e:
         console.print(f"[bold red]✗ Error running QC: {e}[/bold red]")
         logger.exception("Error during QC summary")
-        sys.exit(1)
+        raise typer.Exit(code=1)
 
 
 @derive_app.command("categories")
@@ -802,6 +1008,7 @@ def derive_categories(
     file_id: Optional[str] = typer.Option(None, "--file-id", help="UUID of specific file to process"),
     dry_run: bool = typer.Option(False, "--dry-run", help="Don't write to database, only show what would change"),
     limit: Optional[int] = typer.Option(None, "--limit", help="Limit number of records to process"),
+    no_refresh: bool = typer.Option(False, "--no-refresh", help=_NO_REFRESH_HELP),
 ):
     """Derive category columns from raw data.
 
@@ -812,6 +1019,9 @@ def derive_categories(
 
     The operation is idempotent - running multiple times won't duplicate data.
     """
+    from metaloader.database import session_scope
+    from metaloader.services.derive_service import DeriveService
+
     console.print("[bold blue]Deriving category columns...[/bold blue]")
 
     # Show applied filters
@@ -828,91 +1038,85 @@ def derive_categories(
     file_uuid: Optional[UUID] = None
     if file_id:
         try:
-            file_uuid = UUID(file_id)
+            file_uuid = _parse_uuid(file_id)
         except ValueError:
             console.print(f"[bold red]✗ Error: Invalid UUID format: {file_id}[/bold red]")
-            sys.exit(1)
+            raise typer.Exit(code=1)
 
     try:
-        # Get database session
-        db = next(get_db())
-
-        # Initialize service
-        derive_service = DeriveService(db)
-
-        # Run derivation
-        stats = derive_service.derive_all(
-            study_id=study_id,
-            file_id=file_uuid,
-            dry_run=dry_run,
-            limit=limit
-        )
-
-        # Display results
-        console.print()
-
-        # === Device stats table ===
-        device_table = Table(title="Device Derivation (files)", show_header=True, header_style="bold cyan")
-        device_table.add_column("Metric", style="cyan", width=30)
-        device_table.add_column("Count", style="green", justify="right")
-
-        device_table.add_row("Files processed", f"{stats.files_processed:,}")
-        device_table.add_row("Device set", f"{stats.files_device_set:,}")
-        device_table.add_row("Already had device", f"{stats.files_device_already_set:,}")
-        device_table.add_row("Could not determine", f"{stats.files_device_unknown:,}")
-
-        console.print(device_table)
-        console.print()
-
-        # === Exposure stats table ===
-        exposure_table = Table(title="Exposure Derivation (samples)", show_header=True, header_style="bold cyan")
-        exposure_table.add_column("Metric", style="cyan", width=30)
-        exposure_table.add_column("Count", style="green", justify="right")
-
-        exposure_table.add_row("Samples processed", f"{stats.samples_processed:,}")
-        exposure_table.add_row("Exposure set", f"{stats.samples_exposure_set:,}")
-        exposure_table.add_row("Already had exposure", f"{stats.samples_exposure_already_set:,}")
-        exposure_table.add_row("Could not determine", f"{stats.samples_exposure_unknown:,}")
-        if stats.samples_exposure_conflict > 0:
-            exposure_table.add_row("[yellow]Conflicts (warning)[/yellow]", f"[yellow]{stats.samples_exposure_conflict:,}[/yellow]")
+        with session_scope() as db:
+            # Initialize service
+            derive_service = DeriveService(db)
 
-        console.print(exposure_table)
-        console.print()
-
-        # === Matrix stats table ===
-        matrix_table = Table(title="Sample Matrix Derivation (samples)", show_header=True, header_style="bold cyan")
-        matrix_table.add_column("Metric", style="cyan", width=30)
-        matrix_table.add_column("Count", style="green", justify="right")
+            # Run derivation
+            stats = derive_service.derive_all(
+                study_id=study_id,
+                file_id=file_uuid,
+                dry_run=dry_run,
+                limit=limit
+            )
 
-        matrix_table.add_row("Matrix set", f"{stats.samples_matrix_set:,}")
-        matrix_table.add_row("Already had matrix", f"{stats.samples_matrix_already_set:,}")
-        matrix_table.add_row("Could not determine", f"{stats.samples_matrix_unknown:,}")
-        if stats.samples_matrix_conflict > 0:
-            matrix_table.add_row("[yellow]Conflicts (warning)[/yellow]", f"[yellow]{stats.samples_matrix_conflict:,}[/yellow]")
+            # Display results
+            console.print(_derive_results_group(stats))
 
-        console.print(matrix_table)
-        console.print()
-
-        # Show warnings if any
-        if stats.warnings:
-            console.print(f"[bold yellow]⚠ {len(stats.warnings)} warnings:[/bold yellow]")
-            for warning in stats.warnings[:10]:  # Show first 10
-                console.print(f"  [yellow]• {warning}[/yellow]")
-            if len(stats.warnings) > 10:
-                console.print(f"  [dim]... and {len(stats.warnings) - 10} more[/dim]")
-            console.print()
-
-        # Final status
-        if dry_run:
-            console.print("[bold blue]✓ Dry run completed - no data was written[/bold blue]")
-        else:
-            total_set = stats.files_device_set + stats.samples_exposure_set + stats.samples_matrix_set
-            console.print(f"[bold green]✓ Category derivation completed - {total_set:,} values set[/bold green]")
+            # Final status
+            if dry_run:
+                console.print("[bold blue]✓ Dry run completed - no data was written[/bold blue]")
+            else:
+                total_set = stats.files_device_set + stats.samples_exposure_set + stats.samples_matrix_set
+                if total_set and not no_refresh:
+                    _refresh_long_measurements(db)
+                console.print(f"[bold green]✓ Category derivation completed - {total_set:,} values set[/bold green]")
 
     except Exception as e:
         console.print(f"[bold red]✗ Error during derivation: {e}[/bold red]")
         logger.exception("Error during category derivation")
-        sys.exit(1)
+        raise typer.Exit(code=1)
+
+
+def _derive_results_group(stats) -> Group:
+    """Build the category derivation tables as a single renderable."""
+    # === Device stats table ===
+    device_table = _make_derivation_table("Device Derivation (files)")
+    _add_rows(device_table, (
+        ("Files processed", f"{stats.files_processed:,}"),
+        ("Device set", f"{stats.files_device_set:,}"),
+        ("Already had device", f"{stats.files_device_already_set:,}"),
+        ("Could not determine", f"{stats.files_device_unknown:,}"),
+    ))
+
+    # === Exposure stats table ===
+    exposure_table = _make_derivation_table("Exposure Derivation (samples)")
+    _add_rows(exposure_table, (
+        ("Samples processed", f"{stats.samples_processed:,}"),
+        ("Exposure set", f"{stats.samples_exposure_set:,}"),
+        ("Already had exposure", f"{stats.samples_exposure_already_set:,}"),
+        ("Could not determine", f"{stats.samples_exposure_unknown:,}"),
+    ))
+    if stats.samples_exposure_conflict > 0:
+        exposure_table.add_row("[yellow]Conflicts (warning)[/yellow]", f"[yellow]{stats.samples_exposure_conflict:,}[/yellow]")
+
+    # === Matrix stats table ===
+    matrix_table = _make_derivation_table("Sample Matrix Derivation (samples)")
+    _add_rows(matrix_table, (
+        ("Matrix set", f"{stats.samples_matrix_set:,}"),
+        ("Already had matrix", f"{stats.samples_matrix_already_set:,}"),
+        ("Could not determine", f"{stats.samples_matrix_unknown:,}"),
+    ))
+    if stats.samples_matrix_conflict > 0:
+        matrix_table.add_row("[yellow]Conflicts (warning)[/yellow]", f"[yellow]{stats.samples_matrix_conflict:,}[/yellow]")
+
+    output = ["", device_table, "", exposure_table, "", matrix_table, ""]
+
+    # Show warnings if any
+    if stats.warnings:
+        output += [
+            f"[bold yellow]⚠ {len(stats.warnings)} warnings:[/bold yellow]",
+            _format_list(stats.warnings, "yellow", bullet="• "),
+            "",
+        ]
+
+    return Group(*output)
 
 
 @app.command("ingest-dir")
@@ -925,6 +1129,10 @@ def ingest_dir(
     ),
     max_files: Optional[int] = typer.Option(None, "--max-files", help="Maximum number of files to process"),
     dry_run: bool = typer.Option(False, "--dry-run", help="Don't write to database, only show what would be ingested"),
+    workers: Optional[int] = typer.Option(
+        None, "--workers", "-j", min=1,
+        help="Number of threads scanning and hashing files (default: 4 per CPU, at most 32)"
+    ),
 ):
     """Ingest all files from a directory recursively.
 
@@ -933,16 +1141,21 @@ def ingest_dir(
 
     Default extensions: .txt, .htm, .html, .csv, .tsv, .xlsx, .xlsm, .zip, .pdf
     """
+    from metaloader.database import session_scope
+    from metaloader.services.ingest_dir_service import IngestDirService
+
     console.print(f"[bold blue]Ingesting directory: {directory}[/bold blue]")
 
-    # Validate directory
-    if not directory.exists():
+    # Validate directory (one stat for both checks)
+    try:
+        mode = directory.stat().st_mode
+    except FileNotFoundError:
         console.print(f"[bold red]✗ Error: Directory not found: {directory}[/bold red]")
-        sys.exit(1)
+        raise typer.Exit(code=1)
 
-    if not directory.is_dir():
+    if not stat.S_ISDIR(mode):
         console.print(f"[bold red]✗ Error: Path is not a directory: {directory}[/bold red]")
-        sys.exit(1)
+        raise typer.Exit(code=1)
 
     directory = directory.absolute()
 
@@ -959,85 +1172,81 @@ def ingest_dir(
         console.print("[bold yellow]Dry run mode - no data will be written[/bold yellow]")
 
     try:
-        # Get database session
-        db = next(get_db())
-
-        # Initialize service
-        ingest_service = IngestDirService(db)
-
-        # Run ingestion
-        stats = ingest_service.ingest_directory(
-            directory=directory,
-            import_notes=import_notes,
-            include_extensions=extensions,
-            max_files=max_files,
-            dry_run=dry_run,
-        )
-
-        # Display results
-        console.print()
-
-        # Main stats table
-        table = Table(title="Directory Ingestion Results")
-        table.add_column("Metric", style="cyan", width=25)
-        table.add_column("Value", style="green", justify="right")
-
-        if stats.import_id:
-            table.add_row("Import ID", str(stats.import_id))
-        table.add_row("Root Path", stats.root_path)
-        table.add_row("", "")
-        table.add_row("Files found", f"{stats.files_found:,}")
-        table.add_row("Files processed", f"{stats.files_processed:,}")
-        table.add_row("  New", f"{stats.files_new:,}")
-        table.add_row("  Duplicate", f"{stats.files_duplicate:,}")
-        table.add_row("  Skipped", f"{stats.files_skipped:,}")
-        table.add_row("  Errors", f"{stats.files_error:,}")
-
-        console.print(table)
-        console.print()
-
-        # Type distribution
-        if stats.by_type:
-            type_table = Table(title="Files by Detected Type")
-            type_table.add_column("Type", style="cyan")
-            type_table.add_column("Count", style="green", justify="right")
-            for dtype, count in sorted(stats.by_type.items(), key=lambda x: -x[1]):
-                type_table.add_row(dtype, f"{count:,}")
-            console.print(type_table)
-            console.print()
-
-        # Extension distribution
-        if stats.by_extension:
-            ext_table = Table(title="Files by Extension")
-            ext_table.add_column("Extension", style="cyan")
-            ext_table.add_column("Count", style="green", justify="right")
-            for ext, count in sorted(stats.by_extension.items(), key=lambda x: -x[1]):
-                ext_table.add_row(ext, f"{count:,}")
-            console.print(ext_table)
-            console.print()
-
-        # Show errors if any
-        if stats.errors:
-            console.print(f"[bold yellow]Errors ({len(stats.errors)}):[/bold yellow]")
-            for error in stats.errors[:10]:
-                console.print(f"  [yellow]{error}[/yellow]")
-            if len(stats.errors) > 10:
-                console.print(f"  [dim]... and {len(stats.errors) - 10} more[/dim]")
-            console.print()
-
-        # Final status
-        if dry_run:
-            console.print("[bold blue]Dry run completed - no data was written[/bold blue]")
-        else:
-            console.print(f"[bold green]Directory ingestion completed - {stats.files_new:,} new files ingested[/bold green]")
+        with session_scope() as db:
+            # Initialize service
+            ingest_service = IngestDirService(db)
+
+            # Run ingestion
+            with _make_progress(disable=dry_run) as progress:
+                stats = ingest_service.ingest_directory(
+                    directory=directory,
+                    import_notes=import_notes,
+                    include_extensions=extensions,
+                    max_files=max_files,
+                    dry_run=dry_run,
+                    workers=workers,
+                    progress_callback=_track(progress, "Ingesting"),
+                )
+
+            # Main stats table
+            table = _make_metric_table("Directory Ingestion Results")
+
+            if stats.import_id:
+                table.add_row("Import ID", str(stats.import_id))
+            _add_rows(table, [
+                ("Root Path", stats.root_path),
+                ("", ""),
+                ("Files found", f"{stats.files_found:,}"),
+                ("Files processed", f"{stats.files_processed:,}"),
+                ("  New", f"{stats.files_new:,}"),
+                ("  Duplicate", f"{stats.files_duplicate:,}"),
+                ("  Skipped", f"{stats.files_skipped:,}"),
+                ("  Errors", f"{stats.files_error:,}"),
+            ])
+
+            # Everything is printed at once at the end
+            output = ["", table, ""]
+
+            # Type distribution
+            if stats.by_type:
+                type_table = Table(title="Files by Detected Type")
+                type_table.add_column("Type", style="cyan")
+                type_table.add_column("Count", style="green", justify="right")
+                _add_rows(type_table, (
+                    (dtype, f"{count:,}") for dtype, count in _by_count_desc(stats.by_type)
+                ))
+                output += [type_table, ""]
+
+            # Extension distribution
+            if stats.by_extension:
+                ext_table = Table(title="Files by Extension")
+                ext_table.add_column("Extension", style="cyan")
+                ext_table.add_column("Count", style="green", justify="right")
+                _add_rows(ext_table, (
+                    (ext, f"{count:,}") for ext, count in _by_count_desc(stats.by_extension)
+                ))
+                output += [ext_table, ""]
+
+            # Show errors if any
+            if stats.errors:
+                output.append(f"[bold yellow]Errors ({len(stats.errors)}):[/bold yellow]")
+                output += [_format_list(stats.errors, "yellow"), ""]
+
+            # Final status
+            if dry_run:
+                output.append("[bold blue]Dry run completed - no data was written[/bold blue]")
+            else:
+                output.append(f"[bold green]Directory ingestion completed - {stats.files_new:,} new files ingested[/bold green]")
+
+            console.print(Group(*output))
 
     except ValueError as e:
-        console.print(f"[bold red]✗ Error: {e}[/bold red]")
-        sys.exit(1)
+        _print_error(e)
+        raise typer.Exit(code=1)
     except Exception as e:
-        console.print(f"[bold red]✗ Error: {e}[/bold red]")
+        _print_error(e)
         logger.exception("Error during directory ingestion")
-        sys.exit(1)
+        raise typer.Exit(code=1)
 
 
 @app.command("parse-dir")
@@ -1054,22 +1263,31 @@ def parse_dir(
     fail_fast: bool = typer.Option(False, "--fail-fast", help="Stop on first error"),
     max_files: Optional[int] = typer.Option(None, "--max-files", help="Maximum number of files to parse"),
     dry_run: bool = typer.Option(False, "--dry-run", help="Don't write to database, only show what would be parsed"),
+    concurrency: int = typer.Option(
+        1, "--concurrency", "-j", min=1,
+        help="Number of worker processes parsing files"
+    ),
 ):
     """Parse all supported files in a directory recursively.
 
     Scans the directory for parsable files and extracts their data.
     Supported types: mwtab, mwtab_ms, mwtab_nmr_binned
     """
+    from metaloader.database import session_scope
+    from metaloader.services.parse_dir_service import ParseDirService
+
     console.print(f"[bold blue]Parsing directory: {directory}[/bold blue]")
 
-    # Validate directory
-    if not directory.exists():
+    # Validate directory (one stat for both checks)
+    try:
+        mode = directory.stat().st_mode
+    except FileNotFoundError:
         console.print(f"[bold red]✗ Error: Directory not found: {directory}[/bold red]")
-        sys.exit(1)
+        raise typer.Exit(code=1)
 
-    if not directory.is_dir():
+    if not stat.S_ISDIR(mode):
         console.print(f"[bold red]✗ Error: Path is not a directory: {directory}[/bold red]")
-        sys.exit(1)
+        raise typer.Exit(code=1)
 
     directory = directory.absolute()
 
@@ -1091,39 +1309,46 @@ def parse_dir(
     if fail_fast:
         console.print("[dim]Fail fast mode enabled[/dim]")
 
+    if concurrency > 1:
+        console.print(f"[dim]Workers: {concurrency}[/dim]")
+
     if dry_run:
         console.print("[bold yellow]Dry run mode - no data will be written[/bold yellow]")
 
     try:
-        # Get database session
-        db = next(get_db())
-
-        # Initialize service
-        parse_service = ParseDirService(db)
-
-        # Run parsing
-        stats = parse_service.parse_directory(
-            directory=directory,
-            only_types=only_types_set,
-            skip_types=skip_types_set,
-            fail_fast=fail_fast,
-            max_files=max_files,
-            dry_run=dry_run,
-        )
-
-        # Display results
-        _display_parse_dir_results(stats, dry_run)
+        with session_scope() as db:
+            # Initialize service
+            parse_service = ParseDirService(db)
+
+            # Run parsing
+            with _make_progress(disable=dry_run) as progress:
+                stats = parse_service.parse_directory(
+                    directory=directory,
+                    only_types=only_types_set,
+                    skip_types=skip_types_set,
+                    fail_fast=fail_fast,
+                    max_files=max_files,
+                    dry_run=dry_run,
+                    concurrency=concurrency,
+                    progress_callback=_track(progress, "Parsing"),
+                )
+
+            if not dry_run and stats.files_success:
+                _refresh_long_measurements(db)
+
+            # Display results
+            _display_parse_dir_results(stats, dry_run)
 
     except ValueError as e:
-        console.print(f"[bold red]✗ Error: {e}[/bold red]")
-        sys.exit(1)
+        _print_error(e)
+        raise typer.Exit(code=1)
     except RuntimeError as e:
         console.print(f"[bold red]✗ Error (fail-fast): {e}[/bold red]")
-        sys.exit(1)
+        raise typer.Exit(code=1)
     except Exception as e:
-        console.print(f"[bold red]✗ Error: {e}[/bold red]")
+        _print_error(e)
         logger.exception("Error during directory parsing")
-        sys.exit(1)
+        raise typer.Exit(code=1)
 
 
 @app.command("parse-import")
@@ -1140,20 +1365,27 @@ def parse_import(
     fail_fast: bool = typer.Option(False, "--fail-fast", help="Stop on first error"),
     max_files: Optional[int] = typer.Option(None, "--max-files", help="Maximum number of files to parse"),
     dry_run: bool = typer.Option(False, "--dry-run", help="Don't write to database, only show what would be parsed"),
+    concurrency: int = typer.Option(
+        1, "--concurrency", "-j", min=1,
+        help="Number of worker processes parsing files"
+    ),
 ):
     """Parse all pending files from an import.
 
     Parses files with parse_status='pending' or 'failed' from the specified import.
     Updates parse_status to 'success' or 'failed' after processing.
     """
+    from metaloader.database import session_scope
+    from metaloader.services.parse_dir_service import ParseDirService
+
     console.print(f"[bold blue]Parsing import: {import_id}[/bold blue]")
 
     # Validate UUID
     try:
-        import_uuid = UUID(import_id)
+        import_uuid = _parse_uuid(import_id)
     except ValueError:
         console.print(f"[bold red]✗ Error: Invalid UUID format: {import_id}[/bold red]")
-        sys.exit(1)
+        raise typer.Exit(code=1)
 
     # Parse type filters
     only_types_set = None
@@ -1173,87 +1405,90 @@ def parse_import(
     if fail_fast:
         console.print("[dim]Fail fast mode enabled[/dim]")
 
+    if concurrency > 1:
+        console.print(f"[dim]Workers: {concurrency}[/dim]")
+
     if dry_run:
         console.print("[bold yellow]Dry run mode - no data will be written[/bold yellow]")
 
     try:
-        # Get database session
-        db = next(get_db())
-
-        # Initialize service
-        parse_service = ParseDirService(db)
-
-        # Run parsing
-        stats = parse_service.parse_import(
-            import_id=import_uuid,
-            only_types=only_types_set,
-            skip_types=skip_types_set,
-            fail_fast=fail_fast,
-            max_files=max_files,
-            dry_run=dry_run,
-        )
-
-        # Display results
-        _display_parse_dir_results(stats, dry_run)
+        with session_scope() as db:
+            # Initialize service
+            parse_service = ParseDirService(db)
+
+            # Run parsing
+            with _make_progress(disable=dry_run) as progress:
+                stats = parse_service.parse_import(
+                    import_id=import_uuid,
+                    only_types=only_types_set,
+                    skip_types=skip_types_set,
+                    fail_fast=fail_fast,
+                    max_files=max_files,
+                    dry_run=dry_run,
+                    concurrency=concurrency,
+                    progress_callback=_track(progress, "Parsing"),
+                )
+
+            if not dry_run and stats.files_success:
+                _refresh_long_measurements(db)
+
+            # Display results
+            _display_parse_dir_results(stats, dry_run)
 
     except ValueError as e:
-        console.print(f"[bold red]✗ Error: {e}[/bold red]")
-        sys.exit(1)
+        _print_error(e)
+        raise typer.Exit(code=1)
     except RuntimeError as e:
         console.print(f"[bold red]✗ Error (fail-fast): {e}[/bold red]")
-        sys.exit(1)
+        raise typer.Exit(code=1)
     except Exception as e:
-        console.print(f"[bold red]✗ Error: {e}[/bold red]")
+        _print_error(e)
         logger.exception("Error during import parsing")
-        sys.exit(1)
+        raise typer.Exit(code=1)
 
 
 def _display_parse_dir_results(stats, dry_run: bool):
     """Display bulk parsing results."""
-    console.print()
-
     # Main stats table
-    table = Table(title="Bulk Parse Results")
-    table.add_column("Metric", style="cyan", width=25)
-    table.add_column("Value", style="green", justify="right")
-
-    table.add_row("Files total", f"{stats.files_total:,}")
-    table.add_row("Files parsed", f"{stats.files_parsed:,}")
-    table.add_row("  Success", f"{stats.files_success:,}")
-    table.add_row("  Failed", f"{stats.files_failed:,}")
-    table.add_row("  Skipped", f"{stats.files_skipped:,}")
-    table.add_row("", "")
-    table.add_row("Samples created", f"{stats.samples_created:,}")
-    table.add_row("Features created", f"{stats.features_created:,}")
-    table.add_row("Measurements inserted", f"{stats.measurements_inserted:,}")
-
-    console.print(table)
-    console.print()
+    table = _make_metric_table("Bulk Parse Results")
+    _add_rows(table, (
+        ("Files total", f"{stats.files_total:,}"),
+        ("Files parsed", f"{stats.files_parsed:,}"),
+        ("  Success", f"{stats.files_success:,}"),
+        ("  Failed", f"{stats.files_failed:,}"),
+        ("  Skipped", f"{stats.files_skipped:,}"),
+        ("", ""),
+        ("Samples created", f"{stats.samples_created:,}"),
+        ("Features created", f"{stats.features_created:,}"),
+        ("Measurements inserted", f"{stats.measurements_inserted:,}"),
+    ))
+    output = ["", table, ""]
 
     # Type distribution
     if stats.by_type:
         type_table = Table(title="Parsed by Type")
         type_table.add_column("Type", style="cyan")
         type_table.add_column("Count", style="green", justify="right")
-        for dtype, count in sorted(stats.by_type.items(), key=lambda x: -x[1]):
-            type_table.add_row(dtype, f"{count:,}")
-        console.print(type_table)
-        console.print()
+        _add_rows(type_table, (
+            (dtype, f"{count:,}") for dtype, count in _by_count_desc(stats.by_type)
+        ))
+        output += [type_table, ""]
 
     # Show errors if any
     if stats.errors:
-        console.print(f"[bold yellow]Errors ({len(stats.errors)}):[/bold yellow]")
-        for error in stats.errors[:10]:
-            console.print(f"  [yellow]{error}[/yellow]")
-        if len(stats.errors) > 10:
-            console.print(f"  [dim]... and {len(stats.errors) - 10} more[/dim]")
-        console.print()
+        output += [
+            f"[bold yellow]Errors ({len(stats.errors)}):[/bold yellow]",
+            _format_list(stats.errors, "yellow"),
+            "",
+        ]
 
     # Final status
     if dry_run:
-        console.print("[bold blue]Dry run completed - no data was written[/bold blue]")
+        output.append("[bold blue]Dry run completed - no data was written[/bold blue]")
     else:
-        console.print(f"[bold green]Bulk parsing completed - {stats.files_success:,} files parsed successfully[/bold green]")
+        output.append(f"[bold green]Bulk parsing completed - {stats.files_success:,} files parsed successfully[/bold green]")
+
+    console.print(Group(*output))
 
 
 # =============================================================================
@@ -1267,6 +1502,7 @@ def files_tag(
     all_files: bool = typer.Option(False, "--all", help="Tag all files in database"),
     overwrite: bool = typer.Option(False, "--overwrite", help="Overwrite existing tag values"),
     dry_run: bool = typer.Option(False, "--dry-run", help="Don't write to database, only show what would change"),
+    no_refresh: bool = typer.Option(False, "--no-refresh", help=_NO_REFRESH_HELP),
 ):
     """Tag files with inferred category values.
 
@@ -1283,16 +1519,20 @@ def files_tag(
         metaloader files tag --import-id abc123
         metaloader files tag --file-id xyz789 --overwrite
     """
+    from metaloader.database import session_scope
+    from metaloader.services.tagger_service import TaggerService
+
     console.print("[bold blue]Tagging files with category values[/bold blue]")
 
-    # Validate inputs
-    if not any([import_id, file_id, all_files]):
+    # Validate inputs: exactly one of the three selectors
+    selected = bool(import_id) + bool(file_id) + all_files
+    if not selected:
         console.print("[bold red]✗ Error: Must specify --import-id, --file-id, or --all[/bold red]")
-        sys.exit(1)
+        raise typer.Exit(code=1)
 
-    if sum([bool(import_id), bool(file_id), all_files]) > 1:
+    if selected > 1:
         console.print("[bold red]✗ Error: Specify only one of --import-id, --file-id, or --all[/bold red]")
-        sys.exit(1)
+        raise typer.Exit(code=1)
 
     # Parse UUIDs
     import_uuid: Optional[UUID] = None
@@ -1300,18 +1540,18 @@ def files_tag(
 
     if import_id:
         try:
-            import_uuid = UUID(import_id)
+            import_uuid = _parse_uuid(import_id)
         except ValueError:
             console.print(f"[bold red]✗ Error: Invalid UUID format: {import_id}[/bold red]")
-            sys.exit(1)
+            raise typer.Exit(code=1)
         console.print(f"[dim]Tagging files from import: {import_uuid}[/dim]")
 
     if file_id:
         try:
-            file_uuid = UUID(file_id)
+            file_uuid = _parse_uuid(file_id)
         except ValueError:
             console.print(f"[bold red]✗ Error: Invalid UUID format: {file_id}[/bold red]")
-            sys.exit(1)
+            raise typer.Exit(code=1)
         console.print(f"[dim]Tagging file: {file_uuid}[/dim]")
 
     if all_files:
@@ -1324,62 +1564,60 @@ def files_tag(
         console.print("[bold yellow]⚠ Dry run mode: no data will be written[/bold yellow]")
 
     try:
-        # Get database session
-        db = next(get_db())
-
-        # Initialize service
-        tagger_service = TaggerService(db)
+        with session_scope() as db:
+            # Initialize service
+            tagger_service = TaggerService(db)
 
-        # Run tagging
-        stats = tagger_service.tag_files(
-            import_id=import_uuid,
-            file_id=file_uuid,
-            tag_all=all_files,
-            overwrite=overwrite,
-            dry_run=dry_run,
-        )
-
-        # Display results
-        console.print()
-        table = Table(title="Tagging Results")
-        table.add_column("Metric", style="cyan", width=25)
-        table.add_column("Value", style="green", justify="right")
-
-        table.add_row("Files processed", f"{stats.files_processed:,}")
-        table.add_row("Files updated", f"{stats.files_updated:,}")
-        table.add_row("Files skipped", f"{stats.files_skipped:,}")
-        table.add_row("", "")
-        table.add_row("[bold]Tags set:[/bold]", "")
-        table.add_row("  Device", f"{stats.device_set:,}")
-        table.add_row("  Exposure", f"{stats.exposure_set:,}")
-        table.add_row("  Sample type", f"{stats.sample_type_set:,}")
-        table.add_row("  Platform", f"{stats.platform_set:,}")
-
-        console.print(table)
-        console.print()
+            # Run tagging
+            stats = tagger_service.tag_files(
+                import_id=import_uuid,
+                file_id=file_uuid,
+                tag_all=all_files,
+                overwrite=overwrite,
+                dry_run=dry_run,
+            )
 
-        # Show warnings if any
-        if stats.warnings:
-            console.print(f"[bold yellow]Warnings ({len(stats.warnings)}):[/bold yellow]")
-            for warning in stats.warnings[:10]:
-                console.print(f"  [yellow]{warning}[/yellow]")
-            if len(stats.warnings) > 10:
-                console.print(f"  [dim]... and {len(stats.warnings) - 10} more[/dim]")
-            console.print()
-
-        # Final status
-        if dry_run:
-            console.print("[bold blue]Dry run completed - no data was written[/bold blue]")
-        else:
-            console.print(f"[bold green]✓ Tagging complete: {stats.files_updated:,} files updated[/bold green]")
+            # Display results
+            table = _make_metric_table("Tagging Results")
+            _add_rows(table, (
+                ("Files processed", f"{stats.files_processed:,}"),
+                ("Files updated", f"{stats.files_updated:,}"),
+                ("Files skipped", f"{stats.files_skipped:,}"),
+                ("", ""),
+                ("[bold]Tags set:[/bold]", ""),
+                ("  Device", f"{stats.device_set:,}"),
+                ("  Exposure", f"{stats.exposure_set:,}"),
+                ("  Sample type", f"{stats.sample_type_set:,}"),
+                ("  Platform", f"{stats.platform_set:,}"),
+            ))
+            output = ["", table, ""]
+
+            # Show warnings if any
+            if stats.warnings:
+                output += [
+                    f"[bold yellow]Warnings ({len(stats.warnings)}):[/bold yellow]",
+                    _format_list(stats.warnings, "yellow"),
+                    "",
+                ]
+
+            console.print(Group(*output))
+
+            # Final status
+            if dry_run:
+                console.print("[bold blue]Dry run completed - no data was written[/bold blue]")
+            else:
+                if stats.device_set and not no_refresh:
+                    # files.device is exposed through v_long_measurements
+                    _refresh_long_measurements(db)
+                console.print(f"[bold green]✓ Tagging complete: {stats.files_updated:,} files updated[/bold green]")
 
     except ValueError as e:
-        console.print(f"[bold red]✗ Error: {e}[/bold red]")
-        sys.exit(1)
+        _print_error(e)
+        raise typer.Exit(code=1)
     except Exception as e:
-        console.print(f"[bold red]✗ Error: {e}[/bold red]")
+        _print_error(e)
         logger.exception("Error during file tagging")
-        sys.exit(1)
+        raise typer.Exit(code=1)
 
 
 # =============================================================================
@@ -1396,6 +1634,10 @@ def export_parquet(
     chunk_size: int = typer.Option(200000, "--chunk-size", help="Number of rows per chunk"),
     preview: bool = typer.Option(False, "--preview", help="Preview first 10 rows instead of exporting"),
     count_only: bool = typer.Option(False, "--count", help="Only count rows, don't export"),
+    export_engine: str = typer.Option(
+        "arrow", "--engine",
+        help="Writer: arrow (stream rows through Python) or duckdb (needs the duckdb package)"
+    ),
 ):
     """Export measurement data to Parquet format.
 
@@ -1417,27 +1659,39 @@ def export_parquet(
         metaloader export parquet --out data.parquet --import-id abc123
         metaloader export parquet --out nmr.parquet --feature-type nmr_bin
         metaloader export parquet --out data.parquet --preview
+        metaloader export parquet --out data.parquet --engine duckdb
     """
+    from metaloader.database import engine
+    from metaloader.services.export_service import EXPORT_ENGINES, ExportService
+
     console.print("[bold blue]Exporting measurement data to Parquet[/bold blue]")
 
+    export_engine = export_engine.lower()
+    if export_engine not in EXPORT_ENGINES:
+        console.print(
+            f"[bold red]✗ Error: Invalid engine '{export_engine}' "
+            f"(expected {', '.join(EXPORT_ENGINES)})[/bold red]"
+        )
+        raise typer.Exit(code=1)
+
     # Parse UUIDs
     file_uuid: Optional[UUID] = None
     import_uuid: Optional[UUID] = None
 
     if file_id:
         try:
-            file_uuid = UUID(file_id)
+            file_uuid = _parse_uuid(file_id)
         except ValueError:
             console.print(f"[bold red]✗ Error: Invalid UUID format for --file-id: {file_id}[/bold red]")
-            sys.exit(1)
+            raise typer.Exit(code=1)
         console.print(f"[dim]Filtering by file: {file_uuid}[/dim]")
 
     if import_id:
         try:
-            import_uuid = UUID(import_id)
+            import_uuid = _parse_uuid(import_id)
         except ValueError:
             console.print(f"[bold red]✗ Error: Invalid UUID format for --import-id: {import_id}[/bold red]")
-            sys.exit(1)
+            raise typer.Exit(code=1)
         console.print(f"[dim]Filtering by import: {import_uuid}[/dim]")
 
     if study_id:
@@ -1493,7 +1747,7 @@ def export_parquet(
         console.print(f"[dim]Output: {out}[/dim]")
         console.print(f"[dim]Chunk size: {chunk_size:,}[/dim]")
 
-        stats = export_service.export_parquet(
+        export_args = dict(
             output_path=out,
             file_id=file_uuid,
             import_id=import_uuid,
@@ -1502,11 +1756,18 @@ def export_parquet(
             chunk_size=chunk_size,
         )
 
+        if export_engine == "duckdb":
+            # A single COPY statement; there is nothing to report until it ends
+            stats = export_service.export_parquet_duckdb(**export_args)
+        else:
+            with _make_progress() as progress:
+                stats = export_service.export_parquet(
+                    **export_args, progress_callback=_track(progress, "Exporting rows")
+                )
+
         # Display results
         console.print()
-        table = Table(title="Export Results")
-        table.add_column("Property", style="cyan")
-        table.add_column("Value", style="green")
+        table = _make_kv_table("Export Results")
 
         table.add_row("Output file", stats.output_path)
         table.add_row("Total rows", f"{stats.total_rows:,}")
@@ -1521,9 +1782,9 @@ def export_parquet(
             console.print(f"[bold green]✓ Export complete: {stats.total_rows:,} rows written to {out}[/bold green]")
 
     except Exception as e:
-        console.print(f"[bold red]✗ Error: {e}[/bold red]")
+        _print_error(e)
         logger.exception("Error during Parquet export")
-        sys.exit(1)
+        raise typer.Exit(code=1)
 
 
 if __name__ == "__main__":
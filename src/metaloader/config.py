@@ -9,6 +9,9 @@ from dotenv import load_dotenv
 # Load .env file if it exists
 load_dotenv()
 
+# How `db init` applies Alembic migrations
+MIGRATION_MODES = ("sync", "async", "skip")
+
 
 class Config:
     """Application configuration."""
@@ -16,6 +19,20 @@ class Config:
     def __init__(self):
         self.database_url: str = os.getenv("DATABASE_URL", "")
         self.log_level: str = os.getenv("LOG_LEVEL", "INFO")
+        self.db_pool_size: int = int(os.getenv("DB_POOL_SIZE", "1"))
+        self.db_pool_pre_ping: bool = os.getenv("DB_POOL_PRE_PING", "false").lower() in (
+            "1", "true", "yes"
+        )
+        self.alembic_config: str = os.getenv("ALEMBIC_CONFIG", "")
+        self.migration_mode: str = os.getenv("MIGRATION_MODE", "sync").lower()
+        self.migration_lock_timeout: str = os.getenv("MIGRATION_LOCK_TIMEOUT", "5s")
+        self.migration_statement_timeout: str = os.getenv("MIGRATION_STATEMENT_TIMEOUT", "30min")
+        self.migration_long_statement_timeout: str = os.getenv(
+            "MIGRATION_LONG_STATEMENT_TIMEOUT", "2h"
+        )
+        self.migration_idle_in_transaction_timeout: str = os.getenv(
+            "MIGRATION_IDLE_IN_TRANSACTION_TIMEOUT", "5min"
+        )
 
         if not self.database_url:
             raise ValueError(
@@ -23,6 +40,12 @@ class Config:
                 "Please set it in your environment or create a .env file."
             )
 
+        if self.migration_mode not in MIGRATION_MODES:
+            raise ValueError(
+                f"MIGRATION_MODE must be one of {', '.join(MIGRATION_MODES)}, "
+                f"got '{self.migration_mode}'"
+            )
+
     @property
     def db_url(self) -> str:
         """Get database URL."""
@@ -1,18 +1,34 @@
 """Database connection and session management."""
 
 import logging
-from typing import Generator
+from contextlib import contextmanager
+from typing import Generator, Iterator
 
 from sqlalchemy import create_engine, text
 from sqlalchemy.orm import declarative_base, sessionmaker, Session
 from sqlalchemy.exc import OperationalError
 
 from metaloader.config import config
+from metaloader.utils.bulk import DEFAULT_BATCH_SIZE
 
 logger = logging.getLogger(__name__)
 
-# SQLAlchemy setup
-engine = create_engine(config.db_url, echo=False, pool_pre_ping=True)
+# SQLAlchemy setup: one pooled engine per process; recycle connections
+# before server-side idle timeouts can close them. CLI processes are
+# short-lived and use one session at a time, so by default a single pooled
+# connection is kept and not pinged on checkout.
+# psycopg2 runs executemany UPDATEs (e.g. ORM flushes of many changed rows)
+# one round trip per row unless batch mode is on; multi-row INSERTs go in
+# pages as large as the bulk helpers' batches.
+engine = create_engine(
+    config.db_url,
+    echo=False,
+    pool_pre_ping=config.db_pool_pre_ping,
+    pool_size=config.db_pool_size,
+    pool_recycle=3600,
+    executemany_mode="values_plus_batch",
+    insertmanyvalues_page_size=DEFAULT_BATCH_SIZE,
+)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
@@ -26,6 +42,25 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+@contextmanager
+def session_scope() -> Iterator[Session]:
+    """Provide a session for one unit of work.
+
+    Commits on success, rolls back on any exception (including
+    ``typer.Exit`` from CLI error paths) and always closes. Objects stay
+    loaded after commit, so results can be displayed without reloading.
+    """
+    db = SessionLocal(expire_on_commit=False)
+    try:
+        yield db
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
 def test_connection() -> bool:
     """Test database connection.
     
@@ -40,3 +75,16 @@ def test_connection() -> bool:
     except OperationalError as e:
         logger.error(f"Database connection failed: {e}")
         return False
+
+
+def refresh_long_measurements(db: Session) -> None:
+    """Refresh the v_long_measurements materialized view.
+
+    Runs REFRESH ... CONCURRENTLY so readers of the view are not blocked,
+    then commits.
+
+    Args:
+        db: Database session
+    """
+    db.execute(text("REFRESH MATERIALIZED VIEW CONCURRENTLY v_long_measurements"))
+    db.commit()
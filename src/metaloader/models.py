@@ -1,26 +1,28 @@
 """SQLAlchemy models for database tables."""
 
-import uuid
 from datetime import datetime, timezone
 from typing import Optional
 
 from sqlalchemy import (
     Column,
-    String,
     Text,
     BigInteger,
     Integer,
     SmallInteger,
     Float,
+    LargeBinary,
     ForeignKey,
+    Identity,
     UniqueConstraint,
     Index,
     CheckConstraint,
+    text,
 )
 from sqlalchemy.dialects.postgresql import UUID, TIMESTAMP
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, selectinload
 
 from metaloader.database import Base
+from metaloader.utils.ids import uuid7
 
 
 def utc_now():
@@ -33,7 +35,7 @@ class Import(Base):
 
     __tablename__ = "imports"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     created_at = Column(TIMESTAMP(timezone=True), default=utc_now, nullable=False)
     root_path = Column(Text, nullable=True)
     status = Column(Text, nullable=False, default="running")
@@ -54,14 +56,14 @@ class File(Base):
 
     __tablename__ = "files"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     import_id = Column(UUID(as_uuid=True), ForeignKey("imports.id", ondelete="CASCADE"), nullable=False)
     path_rel = Column(Text, nullable=True)
     path_abs = Column(Text, nullable=False)
     filename = Column(Text, nullable=False)
     ext = Column(Text, nullable=False)
     size_bytes = Column(BigInteger, nullable=False)
-    sha256 = Column(String(64), nullable=False)
+    sha256 = Column(LargeBinary(32), nullable=False)  # raw SHA256 digest
     detected_type = Column(Text, nullable=False)
     device = Column(Text, nullable=True)  # LCMS, GCMS, NMR, MS, NULL
     exposure = Column(Text, nullable=True)  # OB, CON, NULL
@@ -77,13 +79,13 @@ class File(Base):
 
     __table_args__ = (
         UniqueConstraint("sha256", "size_bytes", name="uq_file_sha256_size"),
-        Index("idx_file_sha256", "sha256"),
-        Index("idx_files_device", "device"),
-        Index("idx_files_exposure", "exposure"),
-        Index("idx_files_sample_type", "sample_type"),
-        Index("idx_files_platform", "platform"),
-        Index("idx_files_detected_type", "detected_type"),
-        Index("idx_files_parse_status", "parse_status"),
+        Index("idx_files_import_created", "import_id", "created_at"),
+        Index("idx_files_type_platform_exposure", "detected_type", "platform", "exposure"),
+        # Parse queue: only pending/failed files are indexed
+        Index(
+            "idx_files_parse_queue", "parse_status", "detected_type", "created_at",
+            postgresql_where=text("parse_status IN ('pending', 'failed')")
+        ),
         CheckConstraint(
             "parse_status IN ('pending', 'success', 'failed', 'skipped')",
             name="ck_files_parse_status"
@@ -96,7 +98,7 @@ class Study(Base):
 
     __tablename__ = "studies"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     study_id = Column(Text, nullable=True)
     created_at = Column(TIMESTAMP(timezone=True), default=utc_now, nullable=False)
 
@@ -104,13 +106,17 @@ class Study(Base):
     analyses = relationship("Analysis", back_populates="study")
     samples = relationship("Sample", back_populates="study")
 
+    __table_args__ = (
+        UniqueConstraint("study_id", name="uq_studies_study_id"),
+    )
+
 
 class Analysis(Base):
     """Analyses table."""
 
     __tablename__ = "analyses"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     study_pk = Column(UUID(as_uuid=True), ForeignKey("studies.id"), nullable=True)
     analysis_id = Column(Text, nullable=True)
     file_id = Column(UUID(as_uuid=True), ForeignKey("files.id", ondelete="SET NULL"), nullable=True)
@@ -122,7 +128,7 @@ class Analysis(Base):
     file = relationship("File")
 
     __table_args__ = (
-        Index("idx_analyses_device", "device"),
+        UniqueConstraint("study_pk", "analysis_id", name="uq_analyses_study_analysis"),
     )
 
 
@@ -131,10 +137,12 @@ class Sample(Base):
 
     __tablename__ = "samples"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     study_pk = Column(UUID(as_uuid=True), ForeignKey("studies.id"), nullable=True)
     sample_label = Column(Text, nullable=True)
     sample_uid = Column(Text, unique=True, nullable=True)
+    # Integer surrogate key referenced by measurements.sample_id
+    sample_id = Column(BigInteger, Identity(), nullable=False)
     factors_raw = Column(Text, nullable=True)
     exposure = Column(Text, nullable=True)  # OB, CON, NULL
     sample_matrix = Column(Text, nullable=True)  # Serum, Urine, Feces, CSF, NULL
@@ -146,8 +154,7 @@ class Sample(Base):
     factors = relationship("SampleFactor", back_populates="sample", cascade="all, delete-orphan")
 
     __table_args__ = (
-        Index("idx_samples_exposure", "exposure"),
-        Index("idx_samples_sample_matrix", "sample_matrix"),
+        UniqueConstraint("sample_id", name="uq_samples_sample_id"),
     )
 
 
@@ -156,8 +163,10 @@ class Feature(Base):
 
     __tablename__ = "features"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
     feature_uid = Column(Text, unique=True, nullable=True)
+    # Integer surrogate key referenced by measurements.feature_id
+    feature_id = Column(BigInteger, Identity(), nullable=False)
     feature_type = Column(Text, nullable=True)
     name_raw = Column(Text, nullable=True)
     refmet_name = Column(Text, nullable=True)
@@ -168,6 +177,7 @@ class Feature(Base):
     measurements = relationship("Measurement", back_populates="feature")
 
     __table_args__ = (
+        UniqueConstraint("feature_id", name="uq_features_feature_id"),
         Index("idx_feature_analysis_id", "analysis_id"),
     )
 
@@ -177,9 +187,20 @@ class Measurement(Base):
 
     __tablename__ = "measurements"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    sample_uid = Column(Text, ForeignKey("samples.sample_uid"), nullable=True)
-    feature_uid = Column(Text, ForeignKey("features.feature_uid"), nullable=True)
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid7)
+    # Natural keys, kept for lookups; writers resolve and send sample_id/feature_id
+    sample_uid = Column(Text, nullable=True)
+    feature_uid = Column(Text, nullable=True)
+    sample_id = Column(
+        BigInteger,
+        ForeignKey("samples.sample_id", name="fk_measurements_sample_id"),
+        nullable=True,
+    )
+    feature_id = Column(
+        BigInteger,
+        ForeignKey("features.feature_id", name="fk_measurements_feature_id"),
+        nullable=True,
+    )
     value = Column(Float, nullable=True)
     unit = Column(Text, nullable=True)
     file_id = Column(UUID(as_uuid=True), ForeignKey("files.id", ondelete="CASCADE"), nullable=True)
@@ -194,11 +215,14 @@ class Measurement(Base):
 
     __table_args__ = (
         # Legacy constraint for backward compatibility (when file_id is NULL)
-        UniqueConstraint("sample_uid", "feature_uid", name="uq_measurement_sample_feature"),
-        Index("idx_measurement_sample", "sample_uid"),
-        Index("idx_measurement_feature", "feature_uid"),
-        Index("idx_measurement_file_id", "file_id"),
-        # Note: uq_measurement_file_col_feature is a partial unique index created in migration
+        UniqueConstraint("sample_id", "feature_id", name="uq_measurement_sample_feature_id"),
+        Index("ix_meas_sample_id_inc", "sample_id", postgresql_include=["value", "unit"]),
+        Index("idx_measurement_feature_id", "feature_id"),
+        # MS data: unique per file column; also serves file_id lookups
+        Index(
+            "uq_measurement_file_col_feature_id", "file_id", "col_index", "feature_id",
+            unique=True, postgresql_where=text("file_id IS NOT NULL")
+        ),
     )
 
 
@@ -220,3 +244,14 @@ class SampleFactor(Base):
         UniqueConstraint("sample_uid", "factor_key", name="uq_sample_factor"),
         Index("idx_sample_factors_sample_uid", "sample_uid"),
     )
+
+
+# Eager-loading options for common traversals, e.g.
+# ``session.query(Import).options(*LOAD_IMPORT_FILES)``. Each collection
+# comes in one extra SELECT ... WHERE fk IN (...) instead of one query per
+# parent row. selectinload is used over joinedload so parent rows are not
+# repeated per child. Measurements are left out on purpose: a single study
+# can have millions, so query them directly instead.
+LOAD_IMPORT_FILES = (selectinload(Import.files),)
+LOAD_STUDY_FULL = (selectinload(Study.analyses), selectinload(Study.samples))
+LOAD_SAMPLE_FACTORS = (selectinload(Sample.factors),)
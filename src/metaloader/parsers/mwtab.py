@@ -1,13 +1,44 @@
 """Parser for mwTab format (Metabolomics Workbench)."""
 
 import logging
+import math
+import mmap
 import re
+import string
+import sys
+from array import array
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Inline STUDY_ID/ANALYSIS_ID on the #METABOLOMICS WORKBENCH header line
+_STUDY_ID_RE = re.compile(r'STUDY_ID:(\S+)')
+_ANALYSIS_ID_RE = re.compile(r'ANALYSIS_ID:(\S+)')
+
+# Label and feature name normalization; ASCII labels go through the
+# translate table, which maps each character outside [A-Za-z0-9._-] to '_'
+_LABEL_ALLOWED = frozenset(string.ascii_letters + string.digits + '._-')
+_LABEL_TRANS = str.maketrans({chr(c): '_' for c in range(128) if chr(c) not in _LABEL_ALLOWED})
+_LABEL_INVALID_RE = re.compile(r'[^A-Za-z0-9._-]')
+_UNDERSCORES_RE = re.compile(r'_+')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Missing-value markers and thousands/space separators in numeric cells
+_NA_VALUES = frozenset(('NA', 'N/A', 'NULL', '-', '.'))
+_NUMBER_CLEAN = str.maketrans('', '', ', ')
+
+# Longer factor values are rarely shared between samples, so not interned
+_INTERN_MAX_LEN = 64
+
+# Text whose presence after MS_METABOLITE_DATA_END could still change the
+# parse result: a new data or factors section, or study/analysis IDs
+_TAIL_KEYWORDS = (b'MS_METABOLITE_DATA', b'SUBJECT_SAMPLE_FACTORS', b'STUDY_ID:', b'ANALYSIS_ID:')
+
+# Read size for line-ending detection and for splitting CR-only files
+_READ_CHUNK = 1 << 20
+
 
 @dataclass
 class MwTabMetadata:
@@ -28,9 +59,15 @@ class SampleFactorData:
 
 @dataclass
 class MetaboliteRow:
-    """Single metabolite row from MS_METABOLITE_DATA."""
+    """Single metabolite row from MS_METABOLITE_DATA.
+
+    values holds one float per entry of MwTabParseResult.sample_columns, in
+    the same order. missing flags the empty/NA cells (their value is NaN),
+    so they stay distinct from literal NaN values in the file.
+    """
     metabolite_name: str
-    values: Dict[str, Optional[float]]  # sample_label -> value
+    values: array  # array('d'), aligned with sample_columns
+    missing: bytearray  # 1 where the cell had no value
 
 
 @dataclass
@@ -54,6 +91,10 @@ class MwTabParser:
         r'^compound$',
         r'^name$',
     ]
+    _METABOLITE_COL_RE = re.compile('|'.join(METABOLITE_COL_PATTERNS))
+
+    # Prefixes of every keyword line; any other line is section data
+    KEYWORD_PREFIXES = ('#', 'STUDY_ID:', 'ANALYSIS_ID:', 'MS_METABOLITE_DATA')
 
     def __init__(self, file_path: Path):
         """Initialize parser with file path.
@@ -75,68 +116,86 @@ class MwTabParser:
         metabolites: List[MetaboliteRow] = []
         sample_columns: List[str] = []
 
-        with open(self.file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        with open(self.file_path, 'rb', buffering=_READ_CHUNK) as f:
+            # Binary line iteration only splits on LF; files with bare CR
+            # line endings (classic Mac) are split separately
+            head = f.read(_READ_CHUNK)
+            f.seek(0)
+            cr_only = b'\r' in head and b'\n' not in head
+            lines = self._iter_cr_lines(f) if cr_only else f
+
             in_subject_sample_factors = False
             in_ms_metabolite_data = False
             metabolite_headers: List[str] = []
             metabolite_name_col_idx: int = 0
+            value_columns: List[Tuple[int, str]] = []
 
-            for line in f:
-                line = line.rstrip('\n\r')
+            for raw_line in lines:
+                line = raw_line.decode('utf-8', 'ignore').rstrip('\n\r')
 
                 # Skip empty lines
-                if not line.strip():
-                    continue
-
-                # Check first line for inline STUDY_ID and ANALYSIS_ID
-                if line.startswith('#METABOLOMICS WORKBENCH'):
-                    self._extract_inline_metadata(line, metadata)
-                    continue
-
-                # Extract STUDY_ID (standalone line format)
-                if line.startswith('STUDY_ID:') and not metadata.study_id:
-                    metadata.study_id = line.split(':', 1)[1].strip()
-                    logger.debug(f"Found STUDY_ID: {metadata.study_id}")
-                    continue
-
-                # Extract ANALYSIS_ID (standalone line format)
-                if line.startswith('ANALYSIS_ID:') and not metadata.analysis_id:
-                    metadata.analysis_id = line.split(':', 1)[1].strip()
-                    logger.debug(f"Found ANALYSIS_ID: {metadata.analysis_id}")
-                    continue
-
-                # Detect units
-                if line.startswith('MS_METABOLITE_DATA:UNITS'):
-                    units = line.split('\t')[-1].strip() if '\t' in line else line.split(':', 1)[-1].strip()
-                    if units:
-                        metadata.units = units
-                        logger.debug(f"Found units: {metadata.units}")
-                    continue
-
-                # Section detection
-                if line.startswith('#SUBJECT_SAMPLE_FACTORS'):
-                    in_subject_sample_factors = True
-                    in_ms_metabolite_data = False
-                    logger.debug("Entering SUBJECT_SAMPLE_FACTORS section")
-                    continue
-
-                if line.startswith('MS_METABOLITE_DATA_START'):
-                    in_subject_sample_factors = False
-                    in_ms_metabolite_data = True
-                    metabolite_headers = []
-                    logger.debug("Entering MS_METABOLITE_DATA section")
+                if not line or line.isspace():
                     continue
 
-                if line.startswith('MS_METABOLITE_DATA_END'):
-                    in_ms_metabolite_data = False
-                    logger.debug("Exiting MS_METABOLITE_DATA section")
-                    continue
-
-                # New section starts
-                if line.startswith('#'):
-                    in_subject_sample_factors = False
-                    in_ms_metabolite_data = False
-                    continue
+                # Data lines (the bulk of the file) skip the keyword checks
+                if line.startswith(self.KEYWORD_PREFIXES):
+                    # Check first line for inline STUDY_ID and ANALYSIS_ID
+                    if line.startswith('#METABOLOMICS WORKBENCH'):
+                        self._extract_inline_metadata(line, metadata)
+                        continue
+
+                    # Extract STUDY_ID (standalone line format)
+                    if line.startswith('STUDY_ID:') and not metadata.study_id:
+                        metadata.study_id = line.split(':', 1)[1].strip()
+                        logger.debug(f"Found STUDY_ID: {metadata.study_id}")
+                        continue
+
+                    # Extract ANALYSIS_ID (standalone line format)
+                    if line.startswith('ANALYSIS_ID:') and not metadata.analysis_id:
+                        metadata.analysis_id = line.split(':', 1)[1].strip()
+                        logger.debug(f"Found ANALYSIS_ID: {metadata.analysis_id}")
+                        continue
+
+                    # Detect units
+                    if line.startswith('MS_METABOLITE_DATA:UNITS'):
+                        if '\t' in line:
+                            units = line.rsplit('\t', 1)[-1].strip()
+                        else:
+                            units = line.split(':', 1)[-1].strip()
+                        if units:
+                            metadata.units = units
+                            logger.debug(f"Found units: {metadata.units}")
+                        continue
+
+                    # Section detection
+                    if line.startswith('#SUBJECT_SAMPLE_FACTORS'):
+                        in_subject_sample_factors = True
+                        in_ms_metabolite_data = False
+                        logger.debug("Entering SUBJECT_SAMPLE_FACTORS section")
+                        continue
+
+                    if line.startswith('MS_METABOLITE_DATA_START'):
+                        in_subject_sample_factors = False
+                        in_ms_metabolite_data = True
+                        metabolite_headers = []
+                        logger.debug("Entering MS_METABOLITE_DATA section")
+                        continue
+
+                    if line.startswith('MS_METABOLITE_DATA_END'):
+                        in_ms_metabolite_data = False
+                        logger.debug("Exiting MS_METABOLITE_DATA section")
+                        # The rest is usually the METABOLITES annotation block.
+                        # CR-only files are read ahead of the current line, so
+                        # the file position cannot be used for them.
+                        if not cr_only and not self._rest_has_keywords(f):
+                            break
+                        continue
+
+                    # New section starts
+                    if line.startswith('#'):
+                        in_subject_sample_factors = False
+                        in_ms_metabolite_data = False
+                        continue
 
                 # Parse SUBJECT_SAMPLE_FACTORS data
                 if in_subject_sample_factors and line.startswith('SUBJECT_SAMPLE_FACTORS'):
@@ -148,16 +207,21 @@ class MwTabParser:
                 # Parse MS_METABOLITE_DATA
                 if in_ms_metabolite_data:
                     if not metabolite_headers:
-                        # First line is header
-                        metabolite_headers = line.split('\t')
+                        # First line is header; labels are interned to share
+                        # the SUBJECT_SAMPLE_FACTORS label objects
+                        metabolite_headers = [sys.intern(h) for h in line.split('\t')]
                         metabolite_name_col_idx = self._find_metabolite_column(metabolite_headers)
                         # Sample columns are all columns except the metabolite name column
-                        sample_columns = [h for i, h in enumerate(metabolite_headers) if i != metabolite_name_col_idx]
+                        value_columns = [
+                            (i, h) for i, h in enumerate(metabolite_headers)
+                            if i != metabolite_name_col_idx
+                        ]
+                        sample_columns = [h for _, h in value_columns]
                         logger.debug(f"Found {len(sample_columns)} sample columns in metabolite data")
                     else:
                         # Data row
                         metabolite_row = self._parse_metabolite_row(
-                            line, metabolite_headers, metabolite_name_col_idx
+                            line, value_columns, metabolite_name_col_idx
                         )
                         if metabolite_row:
                             metabolites.append(metabolite_row)
@@ -176,14 +240,35 @@ class MwTabParser:
             warnings=self.warnings
         )
 
+    @staticmethod
+    def _iter_cr_lines(f: BinaryIO) -> Iterator[bytes]:
+        """Yield the lines of a file with bare CR line endings."""
+        pending = b''
+        while chunk := f.read(_READ_CHUNK):
+            *complete, pending = (pending + chunk).split(b'\r')
+            yield from complete
+        if pending:
+            yield pending
+
+    @staticmethod
+    def _rest_has_keywords(f: BinaryIO) -> bool:
+        """Check whether the unread part of a file has lines parse() uses.
+
+        The file is memory-mapped and searched in C, so trailing sections
+        need not be iterated line by line.
+        """
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            position = f.tell()
+            return any(mm.find(keyword, position) != -1 for keyword in _TAIL_KEYWORDS)
+
     def _extract_inline_metadata(self, line: str, metadata: MwTabMetadata) -> None:
         """Extract STUDY_ID and ANALYSIS_ID from first line."""
-        study_match = re.search(r'STUDY_ID:(\S+)', line)
+        study_match = _STUDY_ID_RE.search(line)
         if study_match:
             metadata.study_id = study_match.group(1)
             logger.debug(f"Found STUDY_ID (inline): {metadata.study_id}")
 
-        analysis_match = re.search(r'ANALYSIS_ID:(\S+)', line)
+        analysis_match = _ANALYSIS_ID_RE.search(line)
         if analysis_match:
             metadata.analysis_id = analysis_match.group(1)
             logger.debug(f"Found ANALYSIS_ID (inline): {metadata.analysis_id}")
@@ -196,8 +281,8 @@ class MwTabParser:
             self.warnings.append(f"Invalid SUBJECT_SAMPLE_FACTORS line (too few fields): {line[:100]}")
             return None
 
-        subject = parts[1].strip()
-        sample_label = parts[2].strip()
+        subject = sys.intern(parts[1].strip())
+        sample_label = sys.intern(parts[2].strip())
         factors_str = parts[3].strip()
 
         if not sample_label:
@@ -217,20 +302,24 @@ class MwTabParser:
         """Find the column index containing metabolite names."""
         # Try exact matches first
         for i, header in enumerate(headers):
-            header_lower = header.lower().strip()
-            for pattern in self.METABOLITE_COL_PATTERNS:
-                if re.match(pattern, header_lower):
-                    logger.debug(f"Found metabolite column '{header}' at index {i}")
-                    return i
+            if self._METABOLITE_COL_RE.match(header.lower().strip()):
+                logger.debug(f"Found metabolite column '{header}' at index {i}")
+                return i
 
         # Default to first column
         logger.debug("Using first column as metabolite name column")
         return 0
 
     def _parse_metabolite_row(
-        self, line: str, headers: List[str], metabolite_col_idx: int
+        self, line: str, value_columns: List[Tuple[int, str]], metabolite_col_idx: int
     ) -> Optional[MetaboliteRow]:
-        """Parse a single metabolite data row."""
+        """Parse a single metabolite data row.
+
+        Args:
+            line: Tab-separated data line
+            value_columns: (column index, sample label) of each value column
+            metabolite_col_idx: Index of the metabolite name column
+        """
         parts = line.split('\t')
 
         if len(parts) < 2:
@@ -245,40 +334,49 @@ class MwTabParser:
         if not metabolite_name:
             return None
 
-        # Parse values
-        values: Dict[str, Optional[float]] = {}
-        for i, header in enumerate(headers):
-            if i == metabolite_col_idx:
-                continue
-
-            if i >= len(parts):
-                values[header] = None
+        # Parse values; most cells are plain numbers, which float() takes
+        # directly (it ignores surrounding whitespace)
+        values = array('d', [math.nan]) * len(value_columns)
+        missing = bytearray(len(value_columns))
+        n_parts = len(parts)
+        for position, (i, _) in enumerate(value_columns):
+            if i >= n_parts:
+                missing[position] = 1
                 continue
 
-            raw_value = parts[i].strip()
-            parsed_value = self._parse_value(raw_value)
-            values[header] = parsed_value
+            raw_value = parts[i]
+            try:
+                values[position] = float(raw_value)
+            except ValueError:
+                value = self._parse_value(raw_value.strip())
+                if value is None:
+                    missing[position] = 1
+                else:
+                    values[position] = value
 
         return MetaboliteRow(
             metabolite_name=metabolite_name,
-            values=values
+            values=values,
+            missing=missing
         )
 
     def _parse_value(self, raw_value: str) -> Optional[float]:
         """Parse a value string to float, handling NA and empty values."""
-        if not raw_value or raw_value.upper() in ('NA', 'N/A', 'NULL', '-', '.', ''):
+        # Plain numbers are by far the most common, so try them first
+        try:
+            return float(raw_value)
+        except ValueError:
+            pass
+
+        if not raw_value or raw_value.upper() in _NA_VALUES:
             return None
 
+        # Try removing common separators
         try:
-            return float(raw_value)
+            return float(raw_value.translate(_NUMBER_CLEAN))
         except ValueError:
-            # Try removing common separators
-            cleaned = raw_value.replace(',', '').replace(' ', '')
-            try:
-                return float(cleaned)
-            except ValueError:
-                self.warnings.append(f"Could not parse value: {raw_value}")
-                return None
+            self.warnings.append(f"Could not parse value: {raw_value}")
+            return None
 
     def parse_factors_string(self, factors_str: str) -> Dict[str, str]:
         """Parse factors string into key-value pairs."""
@@ -305,7 +403,10 @@ class MwTabParser:
             if not key:
                 continue
 
-            factors[key] = value
+            # Keys and most values repeat on every sample; share one string each
+            if len(value) < _INTERN_MAX_LEN:
+                value = sys.intern(value)
+            factors[sys.intern(key)] = value
 
         return factors
 
@@ -313,11 +414,13 @@ class MwTabParser:
     def normalize_sample_label(sample_label: str) -> str:
         """Normalize sample label for creating stable sample_uid."""
         normalized = sample_label.strip()
-        normalized = normalized.replace(' ', '_')
-        normalized = re.sub(r'[^A-Za-z0-9._-]', '_', normalized)
-        normalized = re.sub(r'_+', '_', normalized)
-        normalized = normalized.strip('_')
-        return normalized
+        if normalized.isascii():
+            normalized = normalized.translate(_LABEL_TRANS)
+        else:
+            normalized = _LABEL_INVALID_RE.sub('_', normalized)
+        if '__' in normalized:
+            normalized = _UNDERSCORES_RE.sub('_', normalized)
+        return normalized.strip('_')
 
     @staticmethod
     def normalize_feature_name(name_raw: str) -> str:
@@ -329,7 +432,7 @@ class MwTabParser:
         - lowercase
         """
         normalized = name_raw.strip()
-        normalized = re.sub(r'\s+', ' ', normalized)
+        normalized = _WHITESPACE_RE.sub(' ', normalized)
         normalized = normalized.lower()
         return normalized
 
@@ -10,6 +10,19 @@ from collections import defaultdict
 
 logger = logging.getLogger(__name__)
 
+# Inline STUDY_ID/ANALYSIS_ID on the #METABOLOMICS WORKBENCH header line
+_STUDY_ID_RE = re.compile(r'STUDY_ID:(\S+)')
+_ANALYSIS_ID_RE = re.compile(r'ANALYSIS_ID:(\S+)')
+
+# Feature name normalization
+_WHITESPACE_RE = re.compile(r'\s+')
+_FEATURE_INVALID_RE = re.compile(r'[^a-z0-9._\-,()` ]')
+_UNDERSCORES_RE = re.compile(r'_+')
+
+# Missing-value markers and thousands/space separators in numeric cells
+_NA_VALUES = frozenset(('NA', 'N/A', 'NULL', '-', '.'))
+_NUMBER_CLEAN = str.maketrans('', '', ', ')
+
 
 @dataclass
 class MSMetadata:
@@ -86,11 +99,11 @@ class MwTabMSParser:
 
                 # Extract metadata from first line
                 if line.startswith('#METABOLOMICS WORKBENCH'):
-                    study_match = re.search(r'STUDY_ID:(\S+)', line)
+                    study_match = _STUDY_ID_RE.search(line)
                     if study_match:
                         metadata.study_id = study_match.group(1)
 
-                    analysis_match = re.search(r'ANALYSIS_ID:(\S+)', line)
+                    analysis_match = _ANALYSIS_ID_RE.search(line)
                     if analysis_match:
                         metadata.analysis_id = analysis_match.group(1)
                     continue
@@ -300,18 +313,21 @@ class MwTabMSParser:
 
     def _parse_value(self, raw_value: str) -> Optional[float]:
         """Parse value string to float."""
-        if not raw_value or raw_value.upper() in ('NA', 'N/A', 'NULL', '-', '.', ''):
+        # Plain numbers are by far the most common, so try them first
+        try:
+            return float(raw_value)
+        except ValueError:
+            pass
+
+        if not raw_value or raw_value.upper() in _NA_VALUES:
             return None
 
+        # Try removing common separators
         try:
-            return float(raw_value)
+            return float(raw_value.translate(_NUMBER_CLEAN))
         except ValueError:
-            cleaned = raw_value.replace(',', '').replace(' ', '')
-            try:
-                return float(cleaned)
-            except ValueError:
-                self.warnings.append(f"Could not parse value: {raw_value}")
-                return None
+            self.warnings.append(f"Could not parse value: {raw_value}")
+            return None
 
     @staticmethod
     def _create_sample_uid(study_id: str, sample_label: str) -> str:
@@ -332,7 +348,7 @@ class MwTabMSParser:
         """
         # Normalize name
         normalized = name_raw.strip().lower()
-        normalized = re.sub(r'\s+', ' ', normalized)
+        normalized = _WHITESPACE_RE.sub(' ', normalized)
 
         # If name is too long (>100 chars), use hash
         if len(normalized) > 100:
@@ -341,8 +357,8 @@ class MwTabMSParser:
             return f"{analysis_id}:met:{name_hash}"
 
         # Replace problematic characters
-        normalized = re.sub(r'[^a-z0-9._\-,()` ]', '_', normalized)
-        normalized = re.sub(r'_+', '_', normalized)
+        normalized = _FEATURE_INVALID_RE.sub('_', normalized)
+        normalized = _UNDERSCORES_RE.sub('_', normalized)
         normalized = normalized.strip('_')
 
         return f"{analysis_id}:met:{normalized}"
@@ -10,6 +10,14 @@ from collections import defaultdict
 
 logger = logging.getLogger(__name__)
 
+# Inline STUDY_ID/ANALYSIS_ID on the #METABOLOMICS WORKBENCH header line
+_STUDY_ID_RE = re.compile(r'STUDY_ID:(\S+)')
+_ANALYSIS_ID_RE = re.compile(r'ANALYSIS_ID:(\S+)')
+
+# Missing-value markers and thousands/space separators in numeric cells
+_NA_VALUES = frozenset(('NA', 'N/A', 'NULL', '-', '.'))
+_NUMBER_CLEAN = str.maketrans('', '', ', ')
+
 
 @dataclass
 class NMRMetadata:
@@ -84,11 +92,11 @@ class MwTabNMRParser:
 
                 # Extract metadata from first line
                 if line.startswith('#METABOLOMICS WORKBENCH'):
-                    study_match = re.search(r'STUDY_ID:(\S+)', line)
+                    study_match = _STUDY_ID_RE.search(line)
                     if study_match:
                         metadata.study_id = study_match.group(1)
 
-                    analysis_match = re.search(r'ANALYSIS_ID:(\S+)', line)
+                    analysis_match = _ANALYSIS_ID_RE.search(line)
                     if analysis_match:
                         metadata.analysis_id = analysis_match.group(1)
                     continue
@@ -292,18 +300,21 @@ class MwTabNMRParser:
 
     def _parse_value(self, raw_value: str) -> Optional[float]:
         """Parse value string to float."""
-        if not raw_value or raw_value.upper() in ('NA', 'N/A', 'NULL', '-', '.', ''):
+        # Plain numbers are by far the most common, so try them first
+        try:
+            return float(raw_value)
+        except ValueError:
+            pass
+
+        if not raw_value or raw_value.upper() in _NA_VALUES:
             return None
 
+        # Try removing common separators
         try:
-            return float(raw_value)
+            return float(raw_value.translate(_NUMBER_CLEAN))
         except ValueError:
-            cleaned = raw_value.replace(',', '').replace(' ', '')
-            try:
-                return float(cleaned)
-            except ValueError:
-                self.warnings.append(f"Could not parse value: {raw_value}")
-                return None
+            self.warnings.append(f"Could not parse value: {raw_value}")
+            return None
 
     @staticmethod
     def _create_sample_uid(study_id: str, analysis_id: str, sample_label: str) -> str:
@@ -17,7 +17,7 @@ class QCFilters:
     analysis_id: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class QCResults:
     """Results from QC summary."""
     # Basic counts
@@ -75,8 +75,8 @@ class QCService:
         if filters.study_id:
             # Filter by study: measurements -> samples -> study
             conditions.append("""
-                m.sample_uid IN (
-                    SELECT s.sample_uid FROM samples s
+                m.sample_id IN (
+                    SELECT s.sample_id FROM samples s
                     JOIN studies st ON s.study_pk = st.id
                     WHERE st.study_id = :study_id
                 )
@@ -145,29 +145,21 @@ class QCService:
 
         logger.debug(f"Running QC with filters: {filters}")
 
-        # 1. Basic counts
-        results.total_measurements, results.non_null_values = self._get_basic_counts(
-            where_clause, params
-        )
+        # 1-5. Counts, duplicates, special/negative values and orphans,
+        # all from one statement
+        counts = self._get_measurement_counts(where_clause, params)
+        results.total_measurements = counts["total"]
+        results.non_null_values = counts["non_null"]
         results.null_count = results.total_measurements - results.non_null_values
         if results.total_measurements > 0:
             results.null_percent = (results.null_count / results.total_measurements) * 100
-
-        # 2. Duplicate pairs
-        results.duplicate_pairs_count = self._get_duplicate_count(where_clause, params)
-
-        # 3. Special float values (NaN, Inf)
-        results.nan_count, results.pos_inf_count, results.neg_inf_count = (
-            self._get_special_values_count(where_clause, params)
-        )
-
-        # 4. Negative values
-        results.negative_values_count = self._get_negative_count(where_clause, params)
-
-        # 5. Orphan measurements
-        results.orphan_sample_count, results.orphan_feature_count = (
-            self._get_orphan_counts(where_clause, params)
-        )
+        results.duplicate_pairs_count = counts["duplicate_pairs"]
+        results.nan_count = counts["nan_count"]
+        results.pos_inf_count = counts["pos_inf_count"]
+        results.neg_inf_count = counts["neg_inf_count"]
+        results.negative_values_count = counts["negative_count"]
+        results.orphan_sample_count = counts["orphan_samples"]
+        results.orphan_feature_count = counts["orphan_features"]
 
         # 6. Top units
         results.top_units = self._get_top_units(where_clause, params)
@@ -183,106 +175,50 @@ class QCService:
 
         return results
 
-    def _get_basic_counts(
-        self, where_clause: str, params: Dict[str, Any]
-    ) -> Tuple[int, int]:
-        """Get total and non-null measurement counts."""
-        query = text(f"""
-            SELECT
-                COUNT(*) as total,
-                COUNT(m.value) as non_null
-            FROM measurements m
-            {where_clause}
-        """)
-
-        result = self.db.execute(query, params).fetchone()
-        return result[0] or 0, result[1] or 0
-
-    def _get_duplicate_count(
-        self, where_clause: str, params: Dict[str, Any]
-    ) -> int:
-        """Get count of duplicate (sample_uid, feature_uid) pairs."""
-        # First, we need to adapt the where clause for the subquery
-        # We're looking for pairs that appear more than once
-        query = text(f"""
-            SELECT COUNT(*) FROM (
-                SELECT m.sample_uid, m.feature_uid
-                FROM measurements m
-                {where_clause}
-                GROUP BY m.sample_uid, m.feature_uid
-                HAVING COUNT(*) > 1
-            ) as duplicates
-        """)
-
-        result = self.db.execute(query, params).fetchone()
-        return result[0] or 0
-
-    def _get_special_values_count(
+    def _get_measurement_counts(
         self, where_clause: str, params: Dict[str, Any]
-    ) -> Tuple[int, int, int]:
-        """Get counts of NaN, +Inf, -Inf values.
-
-        PostgreSQL float8 supports these special IEEE 754 values.
+    ) -> Dict[str, int]:
+        """Get all scalar measurement counts in one round-trip.
+
+        The filter-aggregates share a single scan of measurements; duplicate
+        (sample_id, feature_id) pairs need their own GROUP BY and run as a
+        scalar subquery of the same statement. PostgreSQL float8 supports the
+        special IEEE 754 values counted here; -Infinity is not counted as a
+        negative value.
         """
         query = text(f"""
             SELECT
-                COUNT(*) FILTER (WHERE m.value = 'NaN'::float8) as nan_count,
-                COUNT(*) FILTER (WHERE m.value = 'Infinity'::float8) as pos_inf_count,
-                COUNT(*) FILTER (WHERE m.value = '-Infinity'::float8) as neg_inf_count
-            FROM measurements m
-            {where_clause}
-        """)
-
-        result = self.db.execute(query, params).fetchone()
-        return result[0] or 0, result[1] or 0, result[2] or 0
-
-    def _get_negative_count(
-        self, where_clause: str, params: Dict[str, Any]
-    ) -> int:
-        """Get count of negative values."""
-        # Exclude special values
-        extra_condition = "m.value < 0 AND m.value != '-Infinity'::float8"
-
-        if where_clause:
-            full_where = f"{where_clause} AND {extra_condition}"
-        else:
-            full_where = f"WHERE {extra_condition}"
-
-        query = text(f"""
-            SELECT COUNT(*)
+                COUNT(*) AS total,
+                COUNT(m.value) AS non_null,
+                COUNT(*) FILTER (WHERE m.value = 'NaN'::float8) AS nan_count,
+                COUNT(*) FILTER (WHERE m.value = 'Infinity'::float8) AS pos_inf_count,
+                COUNT(*) FILTER (WHERE m.value = '-Infinity'::float8) AS neg_inf_count,
+                COUNT(*) FILTER (
+                    WHERE m.value < 0 AND m.value != '-Infinity'::float8
+                ) AS negative_count,
+                -- writers send sample_id/feature_id along with the uids,
+                -- so a NULL id next to a uid marks an orphan
+                COUNT(DISTINCT m.sample_uid) FILTER (
+                    WHERE m.sample_uid IS NOT NULL AND m.sample_id IS NULL
+                ) AS orphan_samples,
+                COUNT(DISTINCT m.feature_uid) FILTER (
+                    WHERE m.feature_uid IS NOT NULL AND m.feature_id IS NULL
+                ) AS orphan_features,
+                (
+                    SELECT COUNT(*) FROM (
+                        SELECT m.sample_id, m.feature_id
+                        FROM measurements m
+                        {where_clause}
+                        GROUP BY m.sample_id, m.feature_id
+                        HAVING COUNT(*) > 1
+                    ) AS duplicates
+                ) AS duplicate_pairs
             FROM measurements m
-            {full_where}
-        """)
-
-        result = self.db.execute(query, params).fetchone()
-        return result[0] or 0
-
-    def _get_orphan_counts(
-        self, where_clause: str, params: Dict[str, Any]
-    ) -> Tuple[int, int]:
-        """Get counts of orphan measurements (missing FK references)."""
-        # Orphan samples (sample_uid not in samples table)
-        query_sample = text(f"""
-            SELECT COUNT(DISTINCT m.sample_uid)
-            FROM measurements m
-            LEFT JOIN samples s ON m.sample_uid = s.sample_uid
-            {where_clause}
-            {"AND" if where_clause else "WHERE"} s.sample_uid IS NULL
-        """)
-
-        # Orphan features (feature_uid not in features table)
-        query_feature = text(f"""
-            SELECT COUNT(DISTINCT m.feature_uid)
-            FROM measurements m
-            LEFT JOIN features f ON m.feature_uid = f.feature_uid
             {where_clause}
-            {"AND" if where_clause else "WHERE"} f.feature_uid IS NULL
         """)
 
-        orphan_samples = self.db.execute(query_sample, params).fetchone()[0] or 0
-        orphan_features = self.db.execute(query_feature, params).fetchone()[0] or 0
-
-        return orphan_samples, orphan_features
+        row = self.db.execute(query, params).mappings().one()
+        return {key: value or 0 for key, value in row.items()}
 
     def _get_top_units(
         self, where_clause: str, params: Dict[str, Any], limit: int = 10
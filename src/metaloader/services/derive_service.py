@@ -2,21 +2,24 @@
 
 import logging
 import re
+from collections import deque
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Optional, Set, Tuple
+from typing import Deque, Dict, Optional, Set, Tuple
 from uuid import UUID
 
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 
-from metaloader.models import File, Sample, SampleFactor, Measurement, Analysis
+from metaloader.models import LOAD_SAMPLE_FACTORS, Analysis, File, Measurement, Sample
 
 logger = logging.getLogger(__name__)
 
 # Maximum bytes to scan for device detection heuristics
 MAX_SCAN_BYTES = 32 * 1024  # 32KB
 
+# Most recent warning messages kept in stats; the conflict counts stay exact
+MAX_WARNINGS = 1000
+
 
 @dataclass
 class DeriveStats:
@@ -41,7 +44,7 @@ class DeriveStats:
     samples_matrix_conflict: int = 0
 
     # Warnings
-    warnings: List[str] = field(default_factory=list)
+    warnings: Deque[str] = field(default_factory=lambda: deque(maxlen=MAX_WARNINGS))
 
 
 class DeriveService:
@@ -71,6 +74,11 @@ class DeriveService:
         r'\b13C[-_\s]?NMR\b',
     ]
 
+    # Each pattern list compiled once as a single alternation
+    _GCMS_RE = re.compile('|'.join(GCMS_PATTERNS), re.IGNORECASE)
+    _LCMS_RE = re.compile('|'.join(LCMS_PATTERNS), re.IGNORECASE)
+    _NMR_RE = re.compile('|'.join(NMR_PATTERNS), re.IGNORECASE)
+
     # Exposure detection keys (case-insensitive)
     EXPOSURE_KEYS = frozenset([
         'group', 'cohort', 'exposure', 'casecontrol', 'case_control',
@@ -217,7 +225,7 @@ class DeriveService:
         # 2. Check file path/name for hints
         path_text = f"{file.path_abs or ''} {file.filename or ''}".lower()
 
-        if any(re.search(p, path_text, re.IGNORECASE) for p in self.NMR_PATTERNS):
+        if self._NMR_RE.search(path_text):
             return 'NMR'
 
         # 3. For mwtab files, scan content for device hints
@@ -227,9 +235,9 @@ class DeriveService:
                 return device
 
         # 4. Check path for LC/GC hints
-        if any(re.search(p, path_text, re.IGNORECASE) for p in self.GCMS_PATTERNS):
+        if self._GCMS_RE.search(path_text):
             return 'GCMS'
-        if any(re.search(p, path_text, re.IGNORECASE) for p in self.LCMS_PATTERNS):
+        if self._LCMS_RE.search(path_text):
             return 'LCMS'
 
         # 5. If it's an MS file but can't determine type
@@ -252,15 +260,15 @@ class DeriveService:
                 content = f.read(MAX_SCAN_BYTES).lower()
 
             # Check for NMR
-            if any(re.search(p, content, re.IGNORECASE) for p in self.NMR_PATTERNS):
+            if self._NMR_RE.search(content):
                 return 'NMR'
 
             # Check for GCMS
-            if any(re.search(p, content, re.IGNORECASE) for p in self.GCMS_PATTERNS):
+            if self._GCMS_RE.search(content):
                 return 'GCMS'
 
             # Check for LCMS
-            if any(re.search(p, content, re.IGNORECASE) for p in self.LCMS_PATTERNS):
+            if self._LCMS_RE.search(content):
                 return 'LCMS'
 
             # If MS_METABOLITE_DATA present but no specific type
@@ -298,8 +306,8 @@ class DeriveService:
         """Derive exposure column for samples."""
         logger.info("Deriving exposure for samples...")
 
-        # Build query
-        query = self.db.query(Sample)
+        # Build query; factors for every sample come in one extra SELECT
+        query = self.db.query(Sample).options(*LOAD_SAMPLE_FACTORS)
         if study_id:
             query = query.filter(Sample.sample_uid.like(f"{study_id}:%"))
         if limit:
@@ -316,7 +324,7 @@ class DeriveService:
                 continue
 
             # Get factors for this sample
-            factors = self._get_sample_factors(sample.sample_uid)
+            factors = self._get_sample_factors(sample)
 
             # Also parse factors_raw if present
             if sample.factors_raw:
@@ -344,17 +352,9 @@ class DeriveService:
             f"{stats.samples_exposure_unknown} unknown, {stats.samples_exposure_conflict} conflicts"
         )
 
-    def _get_sample_factors(self, sample_uid: str) -> Dict[str, str]:
+    def _get_sample_factors(self, sample: Sample) -> Dict[str, str]:
         """Get all factors for a sample as a dict."""
-        factors = {}
-        rows = (
-            self.db.query(SampleFactor)
-            .filter(SampleFactor.sample_uid == sample_uid)
-            .all()
-        )
-        for row in rows:
-            factors[row.factor_key.lower()] = row.factor_value
-        return factors
+        return {row.factor_key.lower(): row.factor_value for row in sample.factors}
 
     def _parse_factors_raw(self, factors_raw: str) -> Dict[str, str]:
         """Parse factors_raw string into dict."""
@@ -451,8 +451,8 @@ class DeriveService:
         """Derive sample_matrix column for samples."""
         logger.info("Deriving sample_matrix for samples...")
 
-        # Build query
-        query = self.db.query(Sample)
+        # Build query; factors for every sample come in one extra SELECT
+        query = self.db.query(Sample).options(*LOAD_SAMPLE_FACTORS)
         if study_id:
             query = query.filter(Sample.sample_uid.like(f"{study_id}:%"))
         if limit:
@@ -467,7 +467,7 @@ class DeriveService:
                 continue
 
             # Get factors for this sample
-            factors = self._get_sample_factors(sample.sample_uid)
+            factors = self._get_sample_factors(sample)
 
             # Also parse factors_raw if present
             if sample.factors_raw:
@@ -483,7 +483,7 @@ class DeriveService:
 
             # Fallback to file path if no matrix found
             if not matrix and not conflict:
-                matrix = self._derive_matrix_from_files(sample.sample_uid)
+                matrix = self._derive_matrix_from_files(sample)
 
             if matrix:
                 if not dry_run:
@@ -537,13 +537,13 @@ class DeriveService:
 
         return None, False
 
-    def _derive_matrix_from_files(self, sample_uid: str) -> Optional[str]:
+    def _derive_matrix_from_files(self, sample: Sample) -> Optional[str]:
         """Derive matrix from associated file paths."""
         # Get distinct file paths for this sample
         file_paths = (
             self.db.query(File.path_abs)
             .join(Measurement, Measurement.file_id == File.id)
-            .filter(Measurement.sample_uid == sample_uid)
+            .filter(Measurement.sample_id == sample.sample_id)
             .distinct()
             .all()
         )
@@ -565,7 +565,7 @@ class DeriveService:
 
         if len(found_matrices) > 1:
             logger.warning(
-                f"Matrix conflict from files for {sample_uid}: {found_matrices}"
+                f"Matrix conflict from files for {sample.sample_uid}: {found_matrices}"
             )
             return None
 
@@ -577,33 +577,33 @@ class DeriveService:
 
 # Helper functions for testing/CLI usage
 
+_DERIVE_NMR_RE = re.compile(r'\bnmr\b|\bnuclear\s+magnetic', re.IGNORECASE)
+_DERIVE_GCMS_RE = re.compile(
+    r'\bgc[-_\s]?ms\b|\bgcms\b|\bgas\s+chromatograph'
+    r'|\bgc[/]ms\b|\bgc\s+mass\s*spec|\bgc[-_\s]?tof',
+    re.IGNORECASE,
+)
+_DERIVE_LCMS_RE = re.compile(
+    r'\blc[-_\s]?ms\b|\blcms\b|\bliquid\s+chromatograph'
+    r'|\bhplc|\buhplc\b|\buplc\b|\blc[/]ms|\blc[-_\s]?tof',
+    re.IGNORECASE,
+)
+
 def derive_device(value: str) -> Optional[str]:
     """Standalone function to test device derivation logic."""
     value_lower = value.lower()
 
     # NMR patterns (check first - highest priority)
-    nmr_patterns = [r'\bnmr\b', r'\bnuclear\s+magnetic']
-    for p in nmr_patterns:
-        if re.search(p, value_lower, re.IGNORECASE):
-            return 'NMR'
+    if _DERIVE_NMR_RE.search(value_lower):
+        return 'NMR'
 
     # GCMS patterns (check before generic MS)
-    gcms_patterns = [
-        r'\bgc[-_\s]?ms\b', r'\bgcms\b', r'\bgas\s+chromatograph',
-        r'\bgc[/]ms\b', r'\bgc\s+mass\s*spec', r'\bgc[-_\s]?tof'
-    ]
-    for p in gcms_patterns:
-        if re.search(p, value_lower, re.IGNORECASE):
-            return 'GCMS'
+    if _DERIVE_GCMS_RE.search(value_lower):
+        return 'GCMS'
 
     # LCMS patterns (check before generic MS)
-    lcms_patterns = [
-        r'\blc[-_\s]?ms\b', r'\blcms\b', r'\bliquid\s+chromatograph',
-        r'\bhplc', r'\buhplc\b', r'\buplc\b', r'\blc[/]ms', r'\blc[-_\s]?tof'
-    ]
-    for p in lcms_patterns:
-        if re.search(p, value_lower, re.IGNORECASE):
-            return 'LCMS'
+    if _DERIVE_LCMS_RE.search(value_lower):
+        return 'LCMS'
 
     # Generic MS (last resort)
     if 'ms' in value_lower or 'mass spec' in value_lower:
@@ -3,7 +3,7 @@
 import logging
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Iterator, Optional
+from typing import Callable, Iterator, List, Optional
 from uuid import UUID
 
 import pandas as pd
@@ -17,6 +17,14 @@ logger = logging.getLogger(__name__)
 # Default chunk size for streaming export
 DEFAULT_CHUNK_SIZE = 200_000
 
+# Engines that can write the Parquet file
+EXPORT_ENGINES = ("arrow", "duckdb")
+
+
+def _sql_literal(value: str) -> str:
+    """Quote a string as a SQL literal."""
+    return "'" + value.replace("'", "''") + "'"
+
 
 @dataclass
 class ExportStats:
@@ -67,8 +75,8 @@ class ExportService:
 
         FROM measurements m
         LEFT JOIN files f ON m.file_id = f.id
-        LEFT JOIN samples s ON m.sample_uid = s.sample_uid
-        LEFT JOIN features ft ON m.feature_uid = ft.feature_uid
+        LEFT JOIN samples s ON m.sample_id = s.sample_id
+        LEFT JOIN features ft ON m.feature_id = ft.feature_id
         LEFT JOIN studies st ON s.study_pk = st.id
         LEFT JOIN analyses a ON ft.analysis_id = a.analysis_id AND a.study_pk = st.id
         WHERE 1=1
@@ -87,6 +95,7 @@ class ExportService:
         feature_type: Optional[str] = None,
         study_id: Optional[str] = None,
         chunk_size: int = DEFAULT_CHUNK_SIZE,
+        progress_callback: Optional[Callable[[int], None]] = None,
     ) -> ExportStats:
         """Export measurement data to Parquet file.
 
@@ -100,6 +109,7 @@ class ExportService:
             feature_type: Filter by feature type (e.g., 'metabolite', 'nmr_bin')
             study_id: Filter by study ID
             chunk_size: Number of rows per chunk
+            progress_callback: Called with the number of rows written after each chunk
 
         Returns:
             ExportStats with export statistics
@@ -142,18 +152,18 @@ class ExportService:
         writer = None
 
         try:
-            for chunk_df in self._stream_chunks(query, chunk_size):
+            for columns in self._stream_chunks(query, chunk_size):
                 chunk_num = stats.total_chunks + 1
-                rows_in_chunk = len(chunk_df)
+                rows_in_chunk = len(columns[0])
 
                 logger.info(f"Processing chunk {chunk_num}: {rows_in_chunk:,} rows")
 
-                # Convert to PyArrow table with consistent schema
-                table = pa.Table.from_pandas(
-                    chunk_df, 
-                    schema=export_schema,
-                    preserve_index=False
-                )
+                # Build the Arrow batch column by column with the fixed schema
+                arrays = [
+                    pa.array(values, type=column.type)
+                    for values, column in zip(columns, export_schema)
+                ]
+                batch = pa.RecordBatch.from_arrays(arrays, schema=export_schema)
 
                 # Initialize writer with first chunk
                 if writer is None:
@@ -165,10 +175,12 @@ class ExportService:
                     )
 
                 # Write chunk
-                writer.write_table(table)
+                writer.write_batch(batch)
 
                 stats.total_rows += rows_in_chunk
                 stats.total_chunks += 1
+                if progress_callback:
+                    progress_callback(stats.total_rows)
 
         finally:
             if writer is not None:
@@ -185,6 +197,75 @@ class ExportService:
 
         return stats
 
+    def export_parquet_duckdb(
+        self,
+        output_path: Path,
+        file_id: Optional[UUID] = None,
+        import_id: Optional[UUID] = None,
+        feature_type: Optional[str] = None,
+        study_id: Optional[str] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+    ) -> ExportStats:
+        """Export measurement data to Parquet file with DuckDB.
+
+        DuckDB runs the export query in PostgreSQL through its postgres
+        extension and writes the Parquet file itself, so no rows pass
+        through Python. Columns match export_parquet. Requires the optional
+        duckdb package.
+
+        Args:
+            output_path: Path for output Parquet file
+            file_id: Filter by specific file
+            import_id: Filter by import
+            feature_type: Filter by feature type (e.g., 'metabolite', 'nmr_bin')
+            study_id: Filter by study ID
+            chunk_size: Number of rows per row group
+
+        Returns:
+            ExportStats with export statistics
+        """
+        import duckdb
+
+        stats = ExportStats(output_path=str(output_path))
+
+        filters = self._build_filters(file_id, import_id, feature_type, study_id)
+        query = self.EXPORT_QUERY.format(filters=filters)
+        dsn = self.engine.url.set(drivername="postgresql").render_as_string(hide_password=False)
+
+        logger.info(f"Starting DuckDB export to {output_path}")
+
+        con = duckdb.connect()
+        try:
+            con.execute("INSTALL postgres")
+            con.execute("LOAD postgres")
+            con.execute(f"ATTACH {_sql_literal(dsn)} AS pg (TYPE POSTGRES, READ_ONLY)")
+            # Same column types as the Arrow export schema
+            con.execute(f"""
+                COPY (
+                    SELECT * REPLACE (
+                        CAST(col_index AS DOUBLE) AS col_index,
+                        CAST(replicate_ix AS DOUBLE) AS replicate_ix,
+                        CAST(created_at AS VARCHAR) AS created_at
+                    )
+                    FROM postgres_query('pg', {_sql_literal(query)})
+                ) TO {_sql_literal(str(output_path))}
+                (FORMAT PARQUET, COMPRESSION ZSTD, ROW_GROUP_SIZE {int(chunk_size)})
+            """)
+        finally:
+            con.close()
+
+        metadata = pq.ParquetFile(output_path).metadata
+        stats.total_rows = metadata.num_rows
+        stats.total_chunks = metadata.num_row_groups
+        stats.file_size_bytes = output_path.stat().st_size
+
+        logger.info(
+            f"Export complete: {stats.total_rows:,} rows in {stats.total_chunks} row groups, "
+            f"file size: {stats.file_size_bytes / (1024*1024):.2f} MB"
+        )
+
+        return stats
+
     def _build_filters(
         self,
         file_id: Optional[UUID],
@@ -227,29 +308,32 @@ class ExportService:
         self,
         query: str,
         chunk_size: int
-    ) -> Iterator[pd.DataFrame]:
+    ) -> Iterator[List[list]]:
         """Stream query results in chunks.
 
+        Rows come from a server-side cursor, so only one chunk is held in
+        memory at a time.
+
         Args:
             query: SQL query to execute
             chunk_size: Number of rows per chunk
 
         Yields:
-            DataFrames with chunk_size rows each
+            Column value lists (in query column order) of up to chunk_size rows
         """
         with self.engine.connect() as conn:
-            # Use pandas chunked reading
-            for chunk_df in pd.read_sql_query(
-                text(query),
-                conn,
-                chunksize=chunk_size,
-            ):
-                # Convert UUID columns to strings (already done in SQL)
-                # Convert timestamps to string for better Parquet compatibility
-                if 'created_at' in chunk_df.columns:
-                    chunk_df['created_at'] = chunk_df['created_at'].astype(str)
-
-                yield chunk_df
+            result = conn.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(
+                text(query)
+            )
+            created_at = list(result.keys()).index("created_at")
+
+            for rows in result.partitions(chunk_size):
+                columns = [list(values) for values in zip(*rows)]
+                # Timestamps as strings for better Parquet compatibility
+                columns[created_at] = [
+                    None if value is None else str(value) for value in columns[created_at]
+                ]
+                yield columns
 
     def get_export_preview(
         self,
@@ -301,8 +385,8 @@ class ExportService:
             SELECT COUNT(*) as cnt
             FROM measurements m
             LEFT JOIN files f ON m.file_id = f.id
-            LEFT JOIN samples s ON m.sample_uid = s.sample_uid
-            LEFT JOIN features ft ON m.feature_uid = ft.feature_uid
+            LEFT JOIN samples s ON m.sample_id = s.sample_id
+            LEFT JOIN features ft ON m.feature_id = ft.feature_id
             LEFT JOIN studies st ON s.study_pk = st.id
             LEFT JOIN analyses a ON ft.analysis_id = a.analysis_id AND a.study_pk = st.id
             WHERE 1=1
@@ -1,15 +1,18 @@
 """File handling service for processing and storing file records."""
 
 import logging
+import stat
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Dict, List, Optional, Set, Tuple
 from uuid import UUID
 
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
 from metaloader.models import File
-from metaloader.utils.hashing import calculate_sha256
+from metaloader.utils.hashing import calculate_sha256_digest
 from metaloader.utils.type_detector import detect_file_type, validate_file_extension
 
 logger = logging.getLogger(__name__)
@@ -20,12 +23,28 @@ class FileHandler:
 
     def __init__(self, db: Session):
         self.db = db
+        # (sha256, size_bytes) of stored files, once preload_known_files() ran
+        self._known_files: Optional[Set[Tuple[bytes, int]]] = None
 
-    def check_duplicate(self, sha256: str, size_bytes: int) -> Optional[File]:
+    def preload_known_files(self) -> int:
+        """Load the (sha256, size) keys of all stored files in one query.
+
+        Afterwards is_known and process_file answer from memory for files
+        whose key is not among them. Keys of files added later by other
+        processes are caught by the unique constraint on insert.
+
+        Returns:
+            Number of keys loaded
+        """
+        rows = self.db.execute(select(File.sha256, File.size_bytes))
+        self._known_files = {(sha256, size_bytes) for sha256, size_bytes in rows}
+        return len(self._known_files)
+
+    def check_duplicate(self, sha256: bytes, size_bytes: int) -> Optional[File]:
         """Check if file already exists in database by sha256 and size.
         
         Args:
-            sha256: SHA256 hash of the file
+            sha256: SHA256 digest of the file (32 raw bytes)
             size_bytes: File size in bytes
             
         Returns:
@@ -37,27 +56,43 @@ class FileHandler:
             .first()
         )
 
-    def process_file(
-        self, file_path: Path, import_id: UUID, root_path: Optional[Path] = None
-    ) -> Tuple[File, bool]:
-        """Process a file and create database record.
-        
+    def is_known(self, sha256: bytes, size_bytes: int) -> bool:
+        """Check if a file with this digest and size is already stored.
+
+        Answered from the preloaded keys when available, otherwise by query.
+        """
+        if self._known_files is not None:
+            return (sha256, size_bytes) in self._known_files
+        return self.check_duplicate(sha256, size_bytes) is not None
+
+    def describe_file(
+        self,
+        file_path: Path,
+        import_id: UUID,
+        root_path: Optional[Path] = None,
+        sha256: Optional[bytes] = None,
+    ) -> Dict[str, Any]:
+        """Validate a file and compute its files-table values.
+
         Args:
             file_path: Absolute path to the file
             import_id: UUID of the import this file belongs to
             root_path: Optional root path for calculating relative path
-            
+            sha256: Precomputed SHA256 digest (calculated here if omitted)
+
         Returns:
-            Tuple of (File record, is_new) where is_new is False if file was duplicate
-            
+            Column values for a new File row
+
         Raises:
             FileNotFoundError: If file does not exist
             ValueError: If file extension is not allowed
         """
-        if not file_path.exists():
-            raise FileNotFoundError(f"File not found: {file_path}")
+        try:
+            st = file_path.stat()
+        except FileNotFoundError:
+            raise FileNotFoundError(f"File not found: {file_path}") from None
 
-        if not file_path.is_file():
+        if not stat.S_ISREG(st.st_mode):
             raise ValueError(f"Path is not a file: {file_path}")
 
         # Validate extension
@@ -68,18 +103,8 @@ class FileHandler:
             )
 
         # Calculate file properties
-        size_bytes = file_path.stat().st_size
-        sha256 = calculate_sha256(file_path)
-        detected_type = detect_file_type(file_path)
-
-        # Check for duplicates
-        existing_file = self.check_duplicate(sha256, size_bytes)
-        if existing_file:
-            logger.info(
-                f"File already exists in database: {file_path.name} "
-                f"(existing file_id: {existing_file.id})"
-            )
-            return existing_file, False
+        if sha256 is None:
+            sha256 = calculate_sha256_digest(file_path, read_ahead=True)
 
         # Calculate relative path if root_path provided
         path_rel = None
@@ -90,25 +115,95 @@ class FileHandler:
                 # File is not relative to root_path
                 path_rel = None
 
-        # Create new file record
-        file_record = File(
-            import_id=import_id,
-            path_rel=path_rel,
-            path_abs=str(file_path.absolute()),
-            filename=file_path.name,
-            ext=file_path.suffix.lower(),
-            size_bytes=size_bytes,
-            sha256=sha256,
-            detected_type=detected_type,
+        return {
+            "import_id": import_id,
+            "path_rel": path_rel,
+            "path_abs": str(file_path.absolute()),
+            "filename": file_path.name,
+            "ext": file_path.suffix.lower(),
+            "size_bytes": st.st_size,
+            "sha256": sha256,
+            "detected_type": detect_file_type(file_path),
+        }
+
+    def insert_files(self, rows: List[Dict[str, Any]]) -> Set[Tuple[bytes, int]]:
+        """Insert new file rows in one statement and commit.
+
+        Rows whose (sha256, size) is already stored, e.g. by a concurrent
+        ingest, are skipped.
+
+        Args:
+            rows: Column values as returned by describe_file
+
+        Returns:
+            (sha256, size_bytes) keys of the rows actually inserted
+        """
+        if not rows:
+            return set()
+
+        stmt = (
+            insert(File)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=["sha256", "size_bytes"])
+            .returning(File.sha256, File.size_bytes)
         )
+        inserted = {(sha256, size_bytes) for sha256, size_bytes in self.db.execute(stmt)}
+        self.db.commit()
+
+        if self._known_files is not None:
+            self._known_files.update(inserted)
+        return inserted
+
+    def process_file(
+        self,
+        file_path: Path,
+        import_id: UUID,
+        root_path: Optional[Path] = None,
+        sha256: Optional[bytes] = None,
+    ) -> Tuple[File, bool]:
+        """Process a file and create database record.
+        
+        Args:
+            file_path: Absolute path to the file
+            import_id: UUID of the import this file belongs to
+            root_path: Optional root path for calculating relative path
+            sha256: Precomputed SHA256 digest (calculated here if omitted)
+            
+        Returns:
+            Tuple of (File record, is_new) where is_new is False if file was duplicate
+            
+        Raises:
+            FileNotFoundError: If file does not exist
+            ValueError: If file extension is not allowed
+        """
+        values = self.describe_file(file_path, import_id, root_path, sha256)
+        sha256 = values["sha256"]
+        size_bytes = values["size_bytes"]
+
+        # Check for duplicates (only a possible hit needs the database)
+        known = self._known_files
+        if known is None or (sha256, size_bytes) in known:
+            existing_file = self.check_duplicate(sha256, size_bytes)
+        else:
+            existing_file = None
+        if existing_file:
+            logger.info(
+                f"File already exists in database: {file_path.name} "
+                f"(existing file_id: {existing_file.id})"
+            )
+            return existing_file, False
+
+        # Create new file record
+        file_record = File(**values)
 
         try:
             self.db.add(file_record)
             self.db.commit()
-            self.db.refresh(file_record)
+            if known is not None:
+                known.add((sha256, size_bytes))
             logger.info(
                 f"Successfully processed file: {file_path.name} "
-                f"(file_id: {file_record.id}, type: {detected_type})"
+                f"(file_id: {file_record.id}, type: {file_record.detected_type})"
             )
             return file_record, True
         except IntegrityError as e:
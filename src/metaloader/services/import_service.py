@@ -32,7 +32,6 @@ class ImportService:
         import_record = Import(root_path=root_path, status=status)
         self.db.add(import_record)
         self.db.commit()
-        self.db.refresh(import_record)
         logger.info(f"Created import record: {import_record.id}")
         return import_record
 
@@ -45,7 +44,7 @@ class ImportService:
         Returns:
             Import record if found, None otherwise
         """
-        return self.db.query(Import).filter(Import.id == import_id).first()
+        return self.db.get(Import, import_id)
 
     def update_status(
         self, import_id: UUID, status: str, notes: Optional[str] = None
@@ -78,7 +77,6 @@ class ImportService:
             import_record.notes = notes
 
         self.db.commit()
-        self.db.refresh(import_record)
         logger.info(f"Updated import {import_id} status to: {status}")
         return import_record
 
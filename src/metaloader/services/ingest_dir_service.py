@@ -1,9 +1,13 @@
 """Service for bulk directory ingestion."""
 
+import heapq
 import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Optional, Set
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
 from uuid import UUID
 
 from sqlalchemy.orm import Session
@@ -11,10 +15,18 @@ from sqlalchemy.orm import Session
 from metaloader.models import Import, File
 from metaloader.services.file_handler import FileHandler
 from metaloader.services.import_service import ImportService
+from metaloader.utils.hashing import HASH_WORKERS, calculate_sha256_digest
+from metaloader.utils.scan import scan_files
 from metaloader.utils.type_detector import validate_file_extension
 
 logger = logging.getLogger(__name__)
 
+# New files per INSERT statement (and commit)
+FILE_INSERT_BATCH_SIZE = 1000
+
+# Most recent error messages kept in stats; older ones are only logged
+MAX_ERRORS = 1000
+
 
 @dataclass
 class IngestDirStats:
@@ -27,11 +39,19 @@ class IngestDirStats:
     files_duplicate: int = 0
     files_skipped: int = 0
     files_error: int = 0
-    errors: List[str] = field(default_factory=list)
+    errors: Deque[str] = field(default_factory=lambda: deque(maxlen=MAX_ERRORS))
     by_type: dict = field(default_factory=dict)  # detected_type -> count
     by_extension: dict = field(default_factory=dict)  # extension -> count
 
 
+def _hash_file(file_path: Path) -> Tuple[Optional[bytes], Optional[Exception]]:
+    """Hash a file in a worker thread, returning the error instead of raising."""
+    try:
+        return calculate_sha256_digest(file_path), None
+    except Exception as e:
+        return None, e
+
+
 class IngestDirService:
     """Service for ingesting files from a directory recursively."""
 
@@ -50,15 +70,24 @@ class IngestDirService:
         include_extensions: Optional[Set[str]] = None,
         max_files: Optional[int] = None,
         dry_run: bool = False,
+        workers: Optional[int] = None,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
     ) -> IngestDirStats:
         """Ingest all files from a directory recursively.
 
+        The directory is scanned and files are hashed in pools of threads
+        (directory listing and hashlib release the GIL), while database
+        writes stay on this service's session in file order.
+
         Args:
             directory: Root directory to scan
             import_notes: Optional notes for the import record
             include_extensions: Set of extensions to include (default: all allowed)
             max_files: Maximum number of files to process
             dry_run: If True, don't write to database
+            workers: Number of scanning and hashing threads (default: ThreadPoolExecutor
+                default for scanning, HASH_WORKERS for hashing)
+            progress_callback: Called as (files_done, files_total) after each file
 
         Returns:
             IngestDirStats with operation statistics
@@ -80,7 +109,7 @@ class IngestDirService:
         extensions = {ext.lower() if ext.startswith('.') else f'.{ext}'.lower() for ext in extensions}
 
         # Collect files recursively
-        files_to_process = self._collect_files(directory, extensions, max_files, stats)
+        files_to_process = self._collect_files(directory, extensions, max_files, stats, workers)
         stats.files_found = len(files_to_process)
 
         if dry_run:
@@ -95,33 +124,55 @@ class IngestDirService:
         stats.import_id = import_record.id
         logger.info(f"Created import record: {import_record.id}")
 
-        # Process files
-        for file_path in files_to_process:
-            try:
-                file_record, is_new = self.file_handler.process_file(
-                    file_path, import_record.id, directory
-                )
-                stats.files_processed += 1
-
-                if is_new:
-                    stats.files_new += 1
-                else:
-                    stats.files_duplicate += 1
-
-                # Track by type and extension
-                detected_type = file_record.detected_type
-                ext = file_record.ext
-                stats.by_type[detected_type] = stats.by_type.get(detected_type, 0) + 1
-                stats.by_extension[ext] = stats.by_extension.get(ext, 0) + 1
-
-            except ValueError as e:
-                stats.files_skipped += 1
-                logger.warning(f"Skipped file {file_path}: {e}")
-            except Exception as e:
-                stats.files_error += 1
-                error_msg = f"Error processing {file_path}: {e}"
-                stats.errors.append(error_msg)
-                logger.error(error_msg)
+        # One query for all stored file keys instead of one lookup per file
+        known = self.file_handler.preload_known_files()
+        logger.debug(f"Loaded {known} known file keys")
+
+        # Process files; hashes are computed ahead of the database writes,
+        # and new files are inserted in batches
+        pending: Dict[Tuple[bytes, int], dict] = {}
+        with ThreadPoolExecutor(max_workers=workers or HASH_WORKERS) as executor:
+            digests = executor.map(_hash_file, files_to_process)
+            for done, (file_path, (sha256, hash_error)) in enumerate(
+                zip(files_to_process, digests), start=1
+            ):
+                try:
+                    if hash_error is not None:
+                        raise hash_error
+                    values = self.file_handler.describe_file(
+                        file_path, import_record.id, directory, sha256=sha256
+                    )
+                    stats.files_processed += 1
+
+                    key = (values["sha256"], values["size_bytes"])
+                    if key in pending or self.file_handler.is_known(*key):
+                        stats.files_duplicate += 1
+                        logger.info(f"File already exists in database: {file_path.name}")
+                    else:
+                        pending[key] = values
+                        if len(pending) >= FILE_INSERT_BATCH_SIZE:
+                            self._insert_pending(pending, stats)
+                            pending = {}
+
+                    # Track by type and extension
+                    detected_type = values["detected_type"]
+                    ext = values["ext"]
+                    stats.by_type[detected_type] = stats.by_type.get(detected_type, 0) + 1
+                    stats.by_extension[ext] = stats.by_extension.get(ext, 0) + 1
+
+                except ValueError as e:
+                    stats.files_skipped += 1
+                    logger.warning(f"Skipped file {file_path}: {e}")
+                except Exception as e:
+                    stats.files_error += 1
+                    error_msg = f"Error processing {file_path}: {e}"
+                    stats.errors.append(error_msg)
+                    logger.error(error_msg)
+
+                if progress_callback:
+                    progress_callback(done, stats.files_found)
+
+        self._insert_pending(pending, stats)
 
         # Finalize import
         if stats.files_error > 0:
@@ -139,12 +190,36 @@ class IngestDirService:
 
         return stats
 
+    def _insert_pending(
+        self,
+        pending: Dict[Tuple[bytes, int], dict],
+        stats: IngestDirStats,
+    ) -> None:
+        """Insert a batch of new files, counting rows lost to concurrent ingests as duplicates."""
+        if not pending:
+            return
+
+        try:
+            inserted = self.file_handler.insert_files(list(pending.values()))
+        except Exception as e:
+            self.db.rollback()
+            stats.files_error += len(pending)
+            error_msg = f"Error inserting {len(pending)} files: {e}"
+            stats.errors.append(error_msg)
+            logger.error(error_msg)
+            return
+
+        stats.files_new += len(inserted)
+        stats.files_duplicate += len(pending) - len(inserted)
+        logger.info(f"Inserted {len(inserted)} new files")
+
     def _collect_files(
         self,
         directory: Path,
         extensions: Set[str],
         max_files: Optional[int],
-        stats: IngestDirStats
+        stats: IngestDirStats,
+        workers: Optional[int] = None,
     ) -> List[Path]:
         """Collect files from directory recursively.
 
@@ -153,29 +228,28 @@ class IngestDirService:
             extensions: Set of allowed extensions
             max_files: Maximum number of files to collect
             stats: Stats object to update with skip counts
+            workers: Number of scanning threads
 
         Returns:
             List of file paths to process
         """
         files = []
 
-        for file_path in directory.rglob("*"):
-            if not file_path.is_file():
-                continue
-
+        for entry in scan_files(directory, workers):
             # Check extension
-            ext = file_path.suffix.lower()
+            ext = os.path.splitext(entry.name)[1].lower()
             if ext not in extensions:
                 stats.files_skipped += 1
                 continue
 
-            files.append(file_path)
+            files.append(Path(entry.path))
 
-            if max_files and len(files) >= max_files:
-                logger.info(f"Reached max_files limit: {max_files}")
-                break
+        # The scan yields files in no particular order; sort before applying
+        # max_files so the same subset is picked on every run
+        if max_files and len(files) > max_files:
+            logger.info(f"Reached max_files limit: {max_files}")
+            return heapq.nsmallest(max_files, files)
 
-        # Sort files for deterministic processing
         files.sort()
         return files
 
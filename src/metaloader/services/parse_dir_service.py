@@ -1,14 +1,18 @@
 """Service for bulk parsing of files."""
 
 import logging
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Callable, Dict, List, Optional, Set
+from typing import Callable, Deque, Dict, List, Optional, Set
 from uuid import UUID
 
 from sqlalchemy.orm import Session
 
+from metaloader.database import engine, session_scope
 from metaloader.models import File
 from metaloader.services.parse_service import ParseService, ParseStats
 from metaloader.services.parse_ms_service import ParseMSService, ParseMSStats
@@ -17,6 +21,9 @@ from metaloader.utils.type_detector import detect_file_type
 
 logger = logging.getLogger(__name__)
 
+# Most recent error messages kept in stats; older ones are only logged
+MAX_ERRORS = 1000
+
 
 @dataclass
 class ParseDirStats:
@@ -29,9 +36,23 @@ class ParseDirStats:
     samples_created: int = 0
     features_created: int = 0
     measurements_inserted: int = 0
-    errors: List[str] = field(default_factory=list)
+    errors: Deque[str] = field(default_factory=lambda: deque(maxlen=MAX_ERRORS))
     by_type: Dict[str, int] = field(default_factory=dict)  # detected_type -> count parsed
 
+    def merge(self, other: "ParseDirStats") -> None:
+        """Add the counts and errors of another result into this one."""
+        self.files_total += other.files_total
+        self.files_parsed += other.files_parsed
+        self.files_success += other.files_success
+        self.files_failed += other.files_failed
+        self.files_skipped += other.files_skipped
+        self.samples_created += other.samples_created
+        self.features_created += other.features_created
+        self.measurements_inserted += other.measurements_inserted
+        self.errors.extend(other.errors)
+        for detected_type, count in other.by_type.items():
+            self.by_type[detected_type] = self.by_type.get(detected_type, 0) + count
+
 
 # Mapping of detected_type to parser type
 PARSABLE_TYPES = {
@@ -58,9 +79,14 @@ class ParseDirService:
         fail_fast: bool = False,
         max_files: Optional[int] = None,
         dry_run: bool = False,
+        concurrency: int = 1,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
     ) -> ParseDirStats:
         """Parse all supported files in a directory.
 
+        With concurrency above 1, files are parsed in a pool of worker
+        processes, each with its own session.
+
         Args:
             directory: Directory to scan for parsable files
             only_types: Only parse these detected_types (e.g., {"mwtab"})
@@ -68,6 +94,8 @@ class ParseDirService:
             fail_fast: Stop on first error
             max_files: Maximum number of files to parse
             dry_run: If True, don't write to database
+            concurrency: Number of worker processes (1 parses in this process)
+            progress_callback: Called as (files_done, files_total) after each file
 
         Returns:
             ParseDirStats with operation statistics
@@ -119,8 +147,14 @@ class ParseDirService:
                 stats.by_type[dt] = stats.by_type.get(dt, 0) + 1
             return stats
 
+        if concurrency > 1 and len(files_to_parse) > 1:
+            self._run_parallel(
+                _parse_dir_file, files_to_parse, concurrency, stats, fail_fast, progress_callback
+            )
+            return stats
+
         # Parse each file
-        for file_path, detected_type in files_to_parse:
+        for done, (file_path, detected_type) in enumerate(files_to_parse, start=1):
             try:
                 parse_stats = self._parse_file(file_path, detected_type)
                 stats.files_parsed += 1
@@ -141,6 +175,9 @@ class ParseDirService:
                 if fail_fast:
                     raise RuntimeError(error_msg) from e
 
+            if progress_callback:
+                progress_callback(done, stats.files_total)
+
         return stats
 
     def parse_import(
@@ -151,9 +188,14 @@ class ParseDirService:
         fail_fast: bool = False,
         max_files: Optional[int] = None,
         dry_run: bool = False,
+        concurrency: int = 1,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
     ) -> ParseDirStats:
         """Parse all pending files from an import.
 
+        With concurrency above 1, files are parsed in a pool of worker
+        processes, each with its own session.
+
         Args:
             import_id: UUID of the import to process
             only_types: Only parse these detected_types
@@ -161,6 +203,8 @@ class ParseDirService:
             fail_fast: Stop on first error
             max_files: Maximum number of files to parse
             dry_run: If True, don't write to database
+            concurrency: Number of worker processes (1 parses in this process)
+            progress_callback: Called as (files_done, files_total) after each file
 
         Returns:
             ParseDirStats with operation statistics
@@ -171,7 +215,7 @@ class ParseDirService:
         from metaloader.models import Import
 
         # Verify import exists
-        import_record = self.db.query(Import).filter(Import.id == import_id).first()
+        import_record = self.db.get(Import, import_id)
         if not import_record:
             raise ValueError(f"Import not found: {import_id}")
 
@@ -209,14 +253,31 @@ class ParseDirService:
                     stats.files_skipped += 1
             return stats
 
+        if concurrency > 1 and len(files) > 1:
+            file_ids = []
+            for file_record in files:
+                if file_record.detected_type in PARSABLE_TYPES:
+                    file_ids.append((file_record.id,))
+                else:
+                    self._update_file_status(file_record, "skipped", "Unsupported file type")
+                    stats.files_skipped += 1
+            # Release the connection before forking workers
+            self.db.commit()
+            self._run_parallel(
+                _parse_pending_file, file_ids, concurrency, stats, fail_fast, progress_callback
+            )
+            return stats
+
         # Parse each file
-        for file_record in files:
+        for done, file_record in enumerate(files, start=1):
             detected_type = file_record.detected_type
 
             # Check if type is parsable
             if detected_type not in PARSABLE_TYPES:
                 self._update_file_status(file_record, "skipped", "Unsupported file type")
                 stats.files_skipped += 1
+                if progress_callback:
+                    progress_callback(done, stats.files_total)
                 continue
 
             try:
@@ -248,8 +309,120 @@ class ParseDirService:
                 if fail_fast:
                     raise RuntimeError(full_error) from e
 
+            if progress_callback:
+                progress_callback(done, stats.files_total)
+
         return stats
 
+    def parse_pending_parallel(
+        self,
+        detected_type: str = "mwtab",
+        import_id: Optional[UUID] = None,
+        max_files: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        dry_run: bool = False,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> ParseDirStats:
+        """Parse all pending files of one type using a pool of worker processes.
+
+        Each worker opens its own session and commits per file, so a failed
+        file never rolls back the others.
+
+        Args:
+            detected_type: detected_type of files to parse
+            import_id: Only parse files from this import
+            max_files: Maximum number of files to parse
+            concurrency: Number of worker processes (default: CPU count)
+            dry_run: If True, only count the pending files
+            progress_callback: Called as (files_done, files_total) after each file
+
+        Returns:
+            ParseDirStats with operation statistics
+
+        Raises:
+            ValueError: If detected_type is not parsable
+        """
+        if detected_type not in PARSABLE_TYPES:
+            raise ValueError(f"Unsupported file type: {detected_type}")
+
+        query = (
+            self.db.query(File.id)
+            .filter(File.detected_type == detected_type)
+            .filter(File.parse_status == 'pending')
+        )
+        if import_id:
+            query = query.filter(File.import_id == import_id)
+
+        query = query.order_by(File.created_at)
+        if max_files:
+            query = query.limit(max_files)
+
+        file_ids = [row.id for row in query]
+        # Release the connection before forking workers
+        self.db.commit()
+
+        stats = ParseDirStats(files_total=len(file_ids))
+
+        if dry_run:
+            logger.info(f"Dry run: would parse {stats.files_total} {detected_type} files")
+            if file_ids:
+                stats.by_type[detected_type] = len(file_ids)
+            return stats
+
+        if not file_ids:
+            return stats
+
+        self._run_parallel(
+            _parse_pending_file,
+            [(file_id,) for file_id in file_ids],
+            concurrency or os.cpu_count() or 1,
+            stats,
+            progress_callback=progress_callback,
+        )
+        return stats
+
+    def _run_parallel(
+        self,
+        worker: Callable[..., ParseDirStats],
+        jobs: List[tuple],
+        concurrency: int,
+        stats: ParseDirStats,
+        fail_fast: bool = False,
+        progress_callback: Optional[Callable[[int, int], None]] = None,
+    ) -> None:
+        """Run worker(*job) for each job in a process pool, merging results into stats.
+
+        Workers write through their own sessions. Files of one study share
+        its study, analysis and sample rows; those writes are INSERT ... ON
+        CONFLICT against unique keys, so concurrent workers converge on one
+        row instead of duplicating it or failing.
+
+        Args:
+            worker: Module-level function returning ParseDirStats for one file
+            jobs: Argument tuples, one per file
+            concurrency: Maximum number of worker processes
+            stats: Stats to merge each result into
+            fail_fast: Cancel the remaining files and raise on the first failure
+            progress_callback: Called as (files_done, files_total) after each file
+
+        Raises:
+            RuntimeError: On the first failed file, if fail_fast is set
+        """
+        if not jobs:
+            return
+
+        workers = min(concurrency, len(jobs))
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_parse_worker) as executor:
+            futures = [executor.submit(worker, *job) for job in jobs]
+            for done, future in enumerate(as_completed(futures), start=1):
+                result = future.result()
+                stats.merge(result)
+                if progress_callback:
+                    progress_callback(done, len(jobs))
+                if fail_fast and result.files_failed:
+                    executor.shutdown(cancel_futures=True)
+                    raise RuntimeError(result.errors[0])
+
     def _parse_file(self, file_path: Path, detected_type: str):
         """Parse a file by its detected type (no file_id).
 
@@ -297,3 +470,89 @@ class ParseDirService:
         file_record.parse_error = error
         file_record.parsed_at = datetime.now(timezone.utc)
         self.db.commit()
+
+
+def _init_parse_worker() -> None:
+    """Drop pooled connections inherited from the parent process."""
+    engine.dispose(close=False)
+
+
+def _parse_pending_file(file_id: UUID) -> ParseDirStats:
+    """Parse one file inside a worker process.
+
+    Args:
+        file_id: UUID of the file to parse
+
+    Returns:
+        ParseDirStats for this file only
+    """
+    stats = ParseDirStats()
+
+    with session_scope() as db:
+        service = ParseDirService(db)
+        file_record = db.get(File, file_id)
+        if file_record is None:
+            stats.files_skipped += 1
+            return stats
+
+        detected_type = file_record.detected_type
+        try:
+            file_path = Path(file_record.path_abs)
+            if not file_path.exists():
+                raise FileNotFoundError(f"File not found: {file_path}")
+
+            parse_stats = service._parse_file_with_id(file_path, detected_type, file_record.id)
+            service._update_file_status(file_record, "success")
+
+            stats.files_parsed += 1
+            stats.files_success += 1
+            stats.by_type[detected_type] = 1
+            stats.samples_created += getattr(parse_stats, 'samples_created', 0)
+            stats.features_created += getattr(parse_stats, 'features_created', 0)
+            stats.measurements_inserted += getattr(parse_stats, 'measurements_inserted', 0)
+
+        except Exception as e:
+            db.rollback()
+            error_msg = str(e)
+            service._update_file_status(file_record, "failed", error_msg)
+
+            stats.files_failed += 1
+            full_error = f"Error parsing {file_record.filename}: {error_msg}"
+            stats.errors.append(full_error)
+            logger.error(full_error)
+
+    return stats
+
+
+def _parse_dir_file(file_path: Path, detected_type: str) -> ParseDirStats:
+    """Parse one file from a directory inside a worker process.
+
+    Args:
+        file_path: Path to the file
+        detected_type: detected_type of the file
+
+    Returns:
+        ParseDirStats for this file only
+    """
+    stats = ParseDirStats()
+
+    with session_scope() as db:
+        service = ParseDirService(db)
+        try:
+            parse_stats = service._parse_file(file_path, detected_type)
+
+            stats.files_parsed += 1
+            stats.files_success += 1
+            stats.by_type[detected_type] = 1
+            stats.samples_created += getattr(parse_stats, 'samples_created', 0)
+            stats.features_created += getattr(parse_stats, 'features_created', 0)
+            stats.measurements_inserted += getattr(parse_stats, 'measurements_inserted', 0)
+
+        except Exception as e:
+            db.rollback()
+            stats.files_failed += 1
+            error_msg = f"Error parsing {file_path}: {e}"
+            stats.errors.append(error_msg)
+            logger.error(error_msg)
+
+    return stats
@@ -8,16 +8,27 @@ from uuid import UUID
 
 from sqlalchemy.orm import Session
 from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy import text
+from sqlalchemy import func, text, update
 
-from metaloader.models import File, Study, Analysis, Sample, Feature, Measurement
+from metaloader.models import File, Study, Analysis, Sample, Feature
 from metaloader.parsers.mwtab_ms import MwTabMSParser, MSMetadata, SampleFactorInfo
+from metaloader.utils.bulk import DEFAULT_BATCH_SIZE, copy_insert_ignore, lookup_ids
 
 logger = logging.getLogger(__name__)
 
 # Batch size for bulk inserts (keep small to avoid PostgreSQL lock exhaustion)
 BATCH_SIZE = 1000
 
+# Measurements are COPYed, so they go in larger batches
+MEASUREMENT_BATCH_SIZE = DEFAULT_BATCH_SIZE
+
+# Measurement row layout, in COPY column order. Rows carry the integer keys
+# the unique constraints are on; the uids are kept for natural-key lookups.
+MEASUREMENT_COLUMNS = (
+    "sample_id", "feature_id",
+    "sample_uid", "feature_uid", "value", "unit", "file_id", "col_index", "replicate_ix",
+)
+
 
 @dataclass
 class ParseMSStats:
@@ -136,7 +147,8 @@ class ParseMSService:
         analysis = self._upsert_analysis(metadata.analysis_id, study.id, file_id)
 
         # 3. Upsert samples
-        for sample_uid, sample_info in ms_samples.items():
+        # Sorted, so concurrent workers lock shared samples in the same order
+        for sample_uid, sample_info in sorted(ms_samples.items()):
             is_new = self._upsert_sample(
                 sample_uid=sample_uid,
                 sample_label=sample_info.sample_label,
@@ -148,6 +160,11 @@ class ParseMSService:
 
         # Flush samples before measurements (FK constraint)
         self.db.flush()
+        sample_ids = lookup_ids(
+            self.db.connection(), "samples", "sample_uid", "sample_id", ms_samples, {}
+        )
+        # Filled in per measurement batch, as features get upserted
+        feature_ids: Dict[str, int] = {}
 
         # 4. Process measurements in batches
         # Track features we've seen
@@ -177,20 +194,27 @@ class ParseMSService:
                     feature_batch = []
                     self.db.commit()  # Commit to release locks
 
-            # Add measurement
-            measurement_batch.append({
-                'sample_uid': measurement.sample_uid,
-                'feature_uid': measurement.feature_uid,
-                'value': measurement.value,
-                'unit': metadata.units,
-                'file_id': file_id,
-                'col_index': measurement.col_index,
-                'replicate_ix': measurement.replicate_ix
-            })
+            # Add measurement; integer keys are looked up per batch
+            measurement_batch.append((
+                measurement.sample_uid,
+                measurement.feature_uid,
+                measurement.value,
+                metadata.units,
+                file_id,
+                measurement.col_index,
+                measurement.replicate_ix,
+            ))
 
             # Flush measurement batch - commit after each batch to release locks
-            if len(measurement_batch) >= BATCH_SIZE:
-                inserted, skipped = self._batch_insert_measurements(measurement_batch)
+            if len(measurement_batch) >= MEASUREMENT_BATCH_SIZE:
+                # Pending features first, so their feature_ids can be looked up
+                if feature_batch:
+                    created = self._batch_upsert_features(feature_batch)
+                    stats.features_created += created
+                    feature_batch = []
+                inserted, skipped = self._batch_insert_measurements(
+                    measurement_batch, sample_ids, feature_ids
+                )
                 stats.measurements_inserted += inserted
                 stats.measurements_skipped += skipped
                 measurement_batch = []
@@ -205,56 +229,49 @@ class ParseMSService:
             stats.features_created += created
 
         if measurement_batch:
-            inserted, skipped = self._batch_insert_measurements(measurement_batch)
+            inserted, skipped = self._batch_insert_measurements(
+                measurement_batch, sample_ids, feature_ids
+            )
             stats.measurements_inserted += inserted
             stats.measurements_skipped += skipped
 
         stats.features_processed = len(feature_uids_seen)
 
     def _upsert_study(self, study_id: str) -> Study:
-        """Upsert study record."""
-        study = self.db.query(Study).filter(Study.study_id == study_id).first()
+        """Upsert study record.
 
-        if not study:
-            study = Study(study_id=study_id)
-            self.db.add(study)
-            self.db.flush()
-            logger.debug(f"Created study: {study_id}")
-        else:
-            logger.debug(f"Using existing study: {study_id}")
+        Race-safe: parallel workers parsing files of the same study all
+        end up on the single row kept by uq_studies_study_id.
+        """
+        stmt = insert(Study).values(study_id=study_id)
+        stmt = stmt.on_conflict_do_nothing(index_elements=['study_id'])
+        created = self.db.execute(stmt).rowcount
 
+        study = self.db.query(Study).filter(Study.study_id == study_id).one()
+        logger.debug(f"{'Created' if created else 'Using existing'} study: {study_id}")
         return study
 
     def _upsert_analysis(
-        self,
-        analysis_id: str,
-        study_pk: UUID,
-        file_id: Optional[UUID] = None
+        self, analysis_id: str, study_pk: UUID, file_id: Optional[UUID] = None
     ) -> Analysis:
-        """Upsert analysis record."""
+        """Upsert analysis record (race-safe, see _upsert_study)."""
+        stmt = insert(Analysis).values(
+            analysis_id=analysis_id, study_pk=study_pk, file_id=file_id
+        )
+        stmt = stmt.on_conflict_do_nothing(index_elements=['study_pk', 'analysis_id'])
+        created = self.db.execute(stmt).rowcount
+
         analysis = (
             self.db.query(Analysis)
             .filter(
                 Analysis.analysis_id == analysis_id,
                 Analysis.study_pk == study_pk
             )
-            .first()
+            .one()
         )
-
-        if not analysis:
-            analysis = Analysis(
-                analysis_id=analysis_id,
-                study_pk=study_pk,
-                file_id=file_id
-            )
-            self.db.add(analysis)
-            self.db.flush()
-            logger.debug(f"Created analysis: {analysis_id}")
-        else:
-            if file_id and not analysis.file_id:
-                analysis.file_id = file_id
-            logger.debug(f"Using existing analysis: {analysis_id}")
-
+        if not created and file_id and not analysis.file_id:
+            analysis.file_id = file_id
+        logger.debug(f"{'Created' if created else 'Using existing'} analysis: {analysis_id}")
         return analysis
 
     def _upsert_sample(
@@ -266,26 +283,32 @@ class ParseMSService:
     ) -> bool:
         """Upsert sample record.
 
+        Race-safe: sibling analysis files of one study share their samples,
+        so parallel workers may insert the same sample_uid.
+
         Returns:
             True if sample was created, False if existed
         """
-        sample = self.db.query(Sample).filter(Sample.sample_uid == sample_uid).first()
-
-        if not sample:
-            sample = Sample(
-                sample_uid=sample_uid,
-                sample_label=sample_label,
-                study_pk=study_pk,
-                factors_raw=factors_raw
-            )
-            self.db.add(sample)
+        stmt = insert(Sample).values(
+            sample_uid=sample_uid,
+            sample_label=sample_label,
+            study_pk=study_pk,
+            factors_raw=factors_raw
+        )
+        stmt = stmt.on_conflict_do_nothing(index_elements=['sample_uid'])
+        if self.db.execute(stmt).rowcount:
             logger.debug(f"Created sample: {sample_uid}")
             return True
-        else:
-            # Update factors if we have them and sample doesn't
-            if factors_raw and not sample.factors_raw:
-                sample.factors_raw = factors_raw
-            return False
+
+        # Update factors if we have them and sample doesn't
+        if factors_raw:
+            self.db.execute(
+                update(Sample)
+                .where(Sample.sample_uid == sample_uid)
+                .where(func.coalesce(Sample.factors_raw, '') == '')
+                .values(factors_raw=factors_raw)
+            )
+        return False
 
     def _batch_upsert_features(self, batch: list) -> int:
         """Batch upsert features using PostgreSQL INSERT ON CONFLICT.
@@ -337,99 +360,41 @@ class ParseMSService:
             self.db.flush()
             return created
 
-    def _batch_insert_measurements(self, batch: list) -> tuple:
-        """Batch insert measurements, checking for duplicates.
+    def _batch_insert_measurements(
+        self, batch: list, sample_ids: Dict[str, int], feature_ids: Dict[str, int]
+    ) -> tuple:
+        """Bulk insert measurements with COPY, skipping duplicates.
 
-        Handles both:
-        - New file-based uniqueness: (file_id, col_index, feature_uid)
-        - Legacy uniqueness: (sample_uid, feature_uid)
+        Rows that hit either uniqueness rule are skipped:
+        - File-based: (file_id, col_index, feature_id)
+        - Legacy: (sample_id, feature_id)
+
+        Args:
+            batch: Row tuples in MEASUREMENT_COLUMNS order, without the
+                leading sample_id/feature_id
+            sample_ids: sample_uid -> sample_id for the file's samples
+            feature_ids: feature_uid -> feature_id, extended with this batch
 
         Returns:
             Tuple of (inserted_count, skipped_count)
+
+        Raises:
+            KeyError: If a row's sample or feature was never stored
         """
         if not batch:
             return 0, 0
 
-        inserted = 0
-        skipped = 0
-
-        file_id = batch[0].get('file_id')
-
-        # Build sets of existing keys for duplicate checking
-        # 1. Check file-based duplicates (if file_id present)
-        existing_file_keys: set = set()
-        if file_id:
-            existing_rows = (
-                self.db.query(Measurement.col_index, Measurement.feature_uid)
-                .filter(Measurement.file_id == file_id)
-                .all()
-            )
-            for row in existing_rows:
-                existing_file_keys.add((row.col_index, row.feature_uid))
-
-        # 2. Check legacy (sample_uid, feature_uid) duplicates
-        # Get unique sample_uid/feature_uid pairs from this batch
-        batch_sample_features = set((item['sample_uid'], item['feature_uid']) for item in batch)
-
-        existing_legacy_keys: set = set()
-        if batch_sample_features:
-            # Query existing measurements for these sample/feature combinations
-            for sample_uid, feature_uid in batch_sample_features:
-                existing = (
-                    self.db.query(Measurement)
-                    .filter(
-                        Measurement.sample_uid == sample_uid,
-                        Measurement.feature_uid == feature_uid
-                    )
-                    .first()
-                )
-                if existing:
-                    existing_legacy_keys.add((sample_uid, feature_uid))
-
-        # Filter out duplicates
-        to_insert = []
-        for item in batch:
-            # Check file-based key
-            file_key = (item['col_index'], item['feature_uid'])
-            # Check legacy key
-            legacy_key = (item['sample_uid'], item['feature_uid'])
-
-            if file_key in existing_file_keys:
-                skipped += 1
-            elif legacy_key in existing_legacy_keys:
-                skipped += 1
-            else:
-                to_insert.append(item)
-                # Track for within-batch dedup
-                existing_file_keys.add(file_key)
-                existing_legacy_keys.add(legacy_key)
-
-        if not to_insert:
-            return inserted, skipped
-
-        # Insert in smaller batches to avoid memory issues
-        MINI_BATCH = 500
-        for i in range(0, len(to_insert), MINI_BATCH):
-            mini_batch = to_insert[i:i + MINI_BATCH]
-
-            savepoint = self.db.begin_nested()
-            try:
-                self.db.execute(insert(Measurement).values(mini_batch))
-                savepoint.commit()
-                inserted += len(mini_batch)
-            except Exception as e:
-                savepoint.rollback()
-                logger.warning(f"Mini-batch insert failed: {e}")
-
-                # Fallback to individual inserts
-                for item in mini_batch:
-                    item_sp = self.db.begin_nested()
-                    try:
-                        self.db.add(Measurement(**item))
-                        item_sp.commit()
-                        inserted += 1
-                    except Exception:
-                        item_sp.rollback()
-                        skipped += 1
-
-        return inserted, skipped
+        conn = self.db.connection()
+        lookup_ids(
+            conn, "features", "feature_uid", "feature_id", (row[1] for row in batch), feature_ids
+        )
+        rows = [(sample_ids[row[0]], feature_ids[row[1]], *row) for row in batch]
+
+        copied, inserted = copy_insert_ignore(
+            conn,
+            "measurements",
+            MEASUREMENT_COLUMNS,
+            rows,
+            extra_columns={"created_at": "now()"},
+        )
+        return inserted, copied - inserted
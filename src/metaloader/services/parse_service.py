@@ -3,21 +3,29 @@
 import logging
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List, Optional, Set
+from typing import Dict, List, Optional, Set, Tuple
 from uuid import UUID
 
 from sqlalchemy.orm import Session
 from sqlalchemy.dialects.postgresql import insert
-from sqlalchemy import text
+from sqlalchemy import literal_column, text
 
 from metaloader.models import File, Study, Analysis, Sample, Feature, Measurement, SampleFactor
 from metaloader.parsers.mwtab import MwTabParser, MwTabParseResult, is_mwtab_file
+from metaloader.utils.bulk import DEFAULT_BATCH_SIZE, copy_upsert, lookup_ids
 
 logger = logging.getLogger(__name__)
 
 # Batch size for bulk inserts
 BATCH_SIZE = 5000
 
+# Measurements are COPYed, so they go in larger batches
+MEASUREMENT_BATCH_SIZE = DEFAULT_BATCH_SIZE
+
+# Measurement row layout, in COPY column order. Rows carry the integer keys
+# the unique constraint is on; the uids are kept for natural-key lookups.
+MEASUREMENT_COLUMNS = ("sample_id", "feature_id", "sample_uid", "feature_uid", "value", "unit")
+
 
 @dataclass
 class ParseStats:
@@ -65,7 +73,7 @@ class ParseService:
         file_record: Optional[File] = None
         
         if file_id:
-            file_record = self.db.query(File).filter(File.id == file_id).first()
+            file_record = self.db.get(File, file_id)
             if not file_record:
                 raise ValueError(f"File not found: {file_id}")
             
@@ -160,19 +168,27 @@ class ParseService:
             sample_uid_map: Dict[str, str] = {}  # sample_label -> sample_uid
             samples_created = 0
             
-            for sample_label in all_sample_labels:
+            sample_batch: List[dict] = []
+            # Sorted, so concurrent workers lock shared samples in the same order
+            for sample_label in sorted(all_sample_labels):
                 sample_uid = MwTabParser.create_sample_uid(
                     result.metadata.study_id, sample_label
                 )
-                factors_raw = sample_factors_map.get(sample_label)
-                
-                is_new = self._upsert_sample(
-                    sample_uid, sample_label, study.id, factors_raw
-                )
+                sample_batch.append({
+                    'sample_uid': sample_uid,
+                    'sample_label': sample_label,
+                    'study_pk': study.id,
+                    'factors_raw': sample_factors_map.get(sample_label)
+                })
                 sample_uid_map[sample_label] = sample_uid
-                if is_new:
-                    samples_created += 1
-            
+
+                if len(sample_batch) >= BATCH_SIZE:
+                    samples_created += self._batch_upsert_samples(sample_batch)
+                    sample_batch = []
+
+            if sample_batch:
+                samples_created += self._batch_upsert_samples(sample_batch)
+
             stats.samples_created = samples_created
             stats.samples_processed = len(all_sample_labels)
 
@@ -208,49 +224,92 @@ class ParseService:
             raise
 
     def _upsert_study(self, study_id: str) -> Study:
-        """Upsert study record."""
-        study = self.db.query(Study).filter(Study.study_id == study_id).first()
-        
-        if not study:
-            study = Study(study_id=study_id)
-            self.db.add(study)
-            self.db.flush()
-            logger.debug(f"Created study: {study_id}")
-        else:
-            logger.debug(f"Using existing study: {study_id}")
-        
+        """Upsert study record.
+
+        Race-safe: parallel workers parsing files of the same study all
+        end up on the single row kept by uq_studies_study_id.
+        """
+        stmt = insert(Study).values(study_id=study_id)
+        stmt = stmt.on_conflict_do_nothing(index_elements=['study_id'])
+        created = self.db.execute(stmt).rowcount
+
+        study = self.db.query(Study).filter(Study.study_id == study_id).one()
+        logger.debug(f"{'Created' if created else 'Using existing'} study: {study_id}")
         return study
 
     def _upsert_analysis(
         self, analysis_id: str, study_pk: UUID, file_id: Optional[UUID] = None
     ) -> Analysis:
-        """Upsert analysis record."""
+        """Upsert analysis record (race-safe, see _upsert_study)."""
+        stmt = insert(Analysis).values(
+            analysis_id=analysis_id, study_pk=study_pk, file_id=file_id
+        )
+        stmt = stmt.on_conflict_do_nothing(index_elements=['study_pk', 'analysis_id'])
+        created = self.db.execute(stmt).rowcount
+
         analysis = (
             self.db.query(Analysis)
             .filter(
                 Analysis.analysis_id == analysis_id,
                 Analysis.study_pk == study_pk
             )
-            .first()
+            .one()
         )
-        
-        if not analysis:
-            analysis = Analysis(
-                analysis_id=analysis_id, 
-                study_pk=study_pk,
-                file_id=file_id
-            )
-            self.db.add(analysis)
-            self.db.flush()
-            logger.debug(f"Created analysis: {analysis_id}")
-        else:
-            # Update file_id if provided
-            if file_id and not analysis.file_id:
-                analysis.file_id = file_id
-            logger.debug(f"Using existing analysis: {analysis_id}")
-        
+        if not created and file_id and not analysis.file_id:
+            analysis.file_id = file_id
+        logger.debug(f"{'Created' if created else 'Using existing'} analysis: {analysis_id}")
         return analysis
 
+    def _batch_upsert_samples(self, batch: List[dict]) -> int:
+        """Batch upsert samples using PostgreSQL INSERT ON CONFLICT.
+
+        Existing samples get the new label, and the new factors when given;
+        rows that would not change are left alone.
+
+        Returns:
+            Number of new samples created
+        """
+        if not batch:
+            return 0
+
+        # Use savepoint for error isolation
+        savepoint = self.db.begin_nested()
+
+        try:
+            stmt = insert(Sample).values(batch)
+            factors_raw = "COALESCE(NULLIF(EXCLUDED.factors_raw, ''), samples.factors_raw)"
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['sample_uid'],
+                set_={
+                    'sample_label': stmt.excluded.sample_label,
+                    'factors_raw': text(factors_raw)
+                },
+                where=text(
+                    "samples.sample_label IS DISTINCT FROM EXCLUDED.sample_label "
+                    f"OR samples.factors_raw IS DISTINCT FROM {factors_raw}"
+                )
+            )
+            # xmax is 0 only on freshly inserted row versions
+            stmt = stmt.returning(literal_column("xmax = 0").label("inserted"))
+
+            result = self.db.execute(stmt)
+            created = sum(1 for row in result if row.inserted)
+            savepoint.commit()
+            return created
+
+        except Exception as e:
+            savepoint.rollback()
+            logger.warning(f"Batch sample upsert failed, trying individual: {e}")
+
+            created = 0
+            for item in batch:
+                if self._upsert_sample(
+                    item['sample_uid'], item['sample_label'],
+                    item['study_pk'], item['factors_raw']
+                ):
+                    created += 1
+            return created
+
     def _upsert_sample(
         self, 
         sample_uid: str, 
@@ -308,58 +367,126 @@ class ParseService:
         feature_uid_set: Set[str] = set()
         
         # First pass: create all features
+        feature_batch: List[dict] = []
         for metabolite in result.metabolites:
             feature_uid = MwTabParser.create_feature_uid(
                 result.metadata.analysis_id, metabolite.metabolite_name
             )
-            
+
             if feature_uid not in feature_uid_set:
-                is_new = self._upsert_feature(
-                    feature_uid, metabolite.metabolite_name
-                )
+                feature_batch.append({
+                    'feature_uid': feature_uid,
+                    'feature_type': 'metabolite',
+                    'name_raw': metabolite.metabolite_name
+                })
                 feature_uid_set.add(feature_uid)
-                if is_new:
-                    features_created += 1
-        
+
+                if len(feature_batch) >= BATCH_SIZE:
+                    features_created += self._batch_upsert_features(feature_batch)
+                    feature_batch = []
+
+        if feature_batch:
+            features_created += self._batch_upsert_features(feature_batch)
+
         # Flush to ensure features exist
         self.db.flush()
-        
-        # Second pass: batch insert measurements
-        measurement_batch: List[dict] = []
-        
+
+        # Integer keys for the measurement rows
+        conn = self.db.connection()
+        sample_ids = lookup_ids(
+            conn, "samples", "sample_uid", "sample_id", sample_uid_map.values(), {}
+        )
+        feature_ids = lookup_ids(
+            conn, "features", "feature_uid", "feature_id", feature_uid_set, {}
+        )
+
+        # Second pass: batch insert measurements. Keyed by (sample_id,
+        # feature_id): repeated sample columns or metabolite names map to one
+        # row, and ON CONFLICT can only touch a row once per statement, so
+        # the last value wins.
+        measurement_batch: Dict[Tuple[int, int], tuple] = {}
+
+        # (sample_id, sample_uid) of each value column, in metabolite.values order
+        column_keys: List[Optional[tuple]] = []
+        for sample_label in result.sample_columns:
+            sample_uid = sample_uid_map.get(sample_label)
+            if not sample_uid:
+                logger.warning(f"Sample not found for label: {sample_label}")
+                column_keys.append(None)
+            else:
+                column_keys.append((sample_ids[sample_uid], sample_uid))
+
         for metabolite in result.metabolites:
             feature_uid = MwTabParser.create_feature_uid(
                 result.metadata.analysis_id, metabolite.metabolite_name
             )
-            
-            for sample_label, value in metabolite.values.items():
-                sample_uid = sample_uid_map.get(sample_label)
-                if not sample_uid:
-                    logger.warning(f"Sample not found for label: {sample_label}")
+            feature_id = feature_ids[feature_uid]
+
+            for sample_key, value, missing in zip(
+                column_keys, metabolite.values, metabolite.missing
+            ):
+                if not sample_key:
                     continue
-                
-                measurement_batch.append({
-                    'sample_uid': sample_uid,
-                    'feature_uid': feature_uid,
-                    'value': value,
-                    'unit': units
-                })
-                
+
+                # Empty/NA cells are NULL; literal NaN values are kept
+                if missing:
+                    value = None
+                sample_id, sample_uid = sample_key
+                measurement_batch[sample_id, feature_id] = (
+                    sample_id, feature_id, sample_uid, feature_uid, value, units
+                )
+
                 # Process batch when full
-                if len(measurement_batch) >= BATCH_SIZE:
-                    ins, upd = self._batch_upsert_measurements(measurement_batch)
+                if len(measurement_batch) >= MEASUREMENT_BATCH_SIZE:
+                    ins, upd = self._batch_upsert_measurements(
+                        list(measurement_batch.values())
+                    )
                     measurements_inserted += ins
                     measurements_updated += upd
-                    measurement_batch = []
+                    measurement_batch = {}
         
         # Process remaining batch
         if measurement_batch:
-            ins, upd = self._batch_upsert_measurements(measurement_batch)
+            ins, upd = self._batch_upsert_measurements(list(measurement_batch.values()))
             measurements_inserted += ins
             measurements_updated += upd
         
         return features_created, measurements_inserted, measurements_updated
 
+    def _batch_upsert_features(self, batch: List[dict]) -> int:
+        """Batch upsert features using PostgreSQL INSERT ON CONFLICT.
+
+        Returns:
+            Number of new features created
+        """
+        if not batch:
+            return 0
+
+        # Use savepoint for error isolation
+        savepoint = self.db.begin_nested()
+
+        try:
+            # PostgreSQL INSERT ... ON CONFLICT DO NOTHING on feature_uid
+            stmt = insert(Feature).values(batch)
+            stmt = stmt.on_conflict_do_nothing(index_elements=['feature_uid'])
+
+            result = self.db.execute(stmt)
+            savepoint.commit()
+
+            created = result.rowcount if result.rowcount else 0
+            return created
+
+        except Exception as e:
+            savepoint.rollback()
+            logger.warning(f"Batch feature insert failed, trying individual: {e}")
+
+            created = 0
+            for item in batch:
+                if self._upsert_feature(item['feature_uid'], item['name_raw']):
+                    created += 1
+            self.db.flush()
+            return created
+
     def _upsert_feature(self, feature_uid: str, name_raw: str) -> bool:
         """Upsert feature record.
         
@@ -387,8 +514,11 @@ class ParseService:
                 feature.name_raw = name_raw
             return False
 
-    def _batch_upsert_measurements(self, batch: List[dict]) -> tuple[int, int]:
-        """Batch upsert measurements using PostgreSQL INSERT ON CONFLICT.
+    def _batch_upsert_measurements(self, batch: List[tuple]) -> tuple[int, int]:
+        """Batch upsert measurements with COPY and INSERT ON CONFLICT.
+
+        Args:
+            batch: Row tuples in MEASUREMENT_COLUMNS order
 
         Returns:
             Tuple of (inserted_count, updated_count)
@@ -400,24 +530,20 @@ class ParseService:
         savepoint = self.db.begin_nested()
 
         try:
-            # Use PostgreSQL INSERT ... ON CONFLICT DO UPDATE
-            # Use index_elements instead of constraint name for better compatibility
-            stmt = insert(Measurement).values(batch)
-
             # On conflict, update value only if new value is not NULL
-            stmt = stmt.on_conflict_do_update(
-                index_elements=['sample_uid', 'feature_uid'],
-                set_={
-                    'value': text('COALESCE(EXCLUDED.value, measurements.value)'),
-                    'unit': text('COALESCE(EXCLUDED.unit, measurements.unit)')
-                }
+            _, total = copy_upsert(
+                self.db.connection(),
+                "measurements",
+                MEASUREMENT_COLUMNS,
+                batch,
+                conflict_columns=("sample_id", "feature_id"),
+                updates={
+                    "value": "COALESCE(EXCLUDED.value, measurements.value)",
+                    "unit": "COALESCE(EXCLUDED.unit, measurements.unit)",
+                },
+                extra_columns={"created_at": "now()"},
             )
-
-            # Execute and get row count
-            result = self.db.execute(stmt)
             savepoint.commit()
-
-            total = result.rowcount if result.rowcount else len(batch)
             return total, 0
 
         except Exception as e:
@@ -426,7 +552,8 @@ class ParseService:
             logger.warning(f"Batch upsert failed, falling back to individual inserts: {e}")
 
             inserted = 0
-            for item in batch:
+            for row in batch:
+                item = dict(zip(MEASUREMENT_COLUMNS, row))
                 # Use savepoint for each individual insert
                 item_savepoint = self.db.begin_nested()
                 try:
@@ -434,8 +561,8 @@ class ParseService:
                     existing = (
                         self.db.query(Measurement)
                         .filter(
-                            Measurement.sample_uid == item['sample_uid'],
-                            Measurement.feature_uid == item['feature_uid']
+                            Measurement.sample_id == item['sample_id'],
+                            Measurement.feature_id == item['feature_id']
                         )
                         .first()
                     )
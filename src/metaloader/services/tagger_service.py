@@ -1,17 +1,27 @@
 """Service for tagging files with inferred categories."""
 
 import logging
+from collections import deque
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Deque, Dict, List, Optional, Tuple
 from uuid import UUID
 
+from sqlalchemy import select
+from sqlalchemy.engine import Row
 from sqlalchemy.orm import Session
 
 from metaloader.models import File
+from metaloader.utils.bulk import batched_update
 from metaloader.utils.tagger import infer_all_tags
 
 logger = logging.getLogger(__name__)
 
+# Tag columns on files, each with a matching <column>_set counter in TagStats
+TAG_COLUMNS = ("device", "exposure", "sample_type", "platform")
+
+# Most recent warning messages kept in stats; older ones are only logged
+MAX_WARNINGS = 1000
+
 
 @dataclass
 class TagStats:
@@ -23,7 +33,7 @@ class TagStats:
     exposure_set: int = 0
     sample_type_set: int = 0
     platform_set: int = 0
-    warnings: List[str] = field(default_factory=list)
+    warnings: Deque[str] = field(default_factory=lambda: deque(maxlen=MAX_WARNINGS))
 
 
 class TaggerService:
@@ -62,17 +72,18 @@ class TaggerService:
 
         stats = TagStats()
 
-        # Build query
-        query = self.db.query(File)
+        # Only the columns inference and the skip check need, no ORM objects
+        query = select(File.id, File.path_rel, File.filename, File.detected_type,
+                       *(getattr(File, column) for column in TAG_COLUMNS))
 
         if file_id:
-            query = query.filter(File.id == file_id)
+            query = query.where(File.id == file_id)
         elif import_id:
-            query = query.filter(File.import_id == import_id)
+            query = query.where(File.import_id == import_id)
         # else: tag_all - no filter
 
         # Get files
-        files = query.all()
+        files = self.db.execute(query).all()
         stats.files_processed = len(files)
 
         if stats.files_processed == 0:
@@ -81,16 +92,21 @@ class TaggerService:
 
         logger.info(f"Processing {stats.files_processed} files")
 
-        # Process each file
-        for file_record in files:
-            updated = self._tag_file(file_record, overwrite, dry_run, stats)
+        # Collect (file id, value) updates per column
+        updates: Dict[str, List[Tuple[str, str]]] = {column: [] for column in TAG_COLUMNS}
+        for file_row in files:
+            updated = self._tag_file(file_row, overwrite, stats, updates)
             if updated:
                 stats.files_updated += 1
             else:
                 stats.files_skipped += 1
 
-        # Commit if not dry run
+        # Write each column with one UPDATE per batch, if not dry run
         if not dry_run and stats.files_updated > 0:
+            conn = self.db.connection()
+            for column, pairs in updates.items():
+                if pairs:
+                    batched_update(conn, "files", "id", column, pairs, key_type="uuid")
             self.db.commit()
             logger.info(f"Committed changes for {stats.files_updated} files")
 
@@ -98,82 +114,49 @@ class TaggerService:
 
     def _tag_file(
         self,
-        file_record: File,
+        file_row: Row,
         overwrite: bool,
-        dry_run: bool,
-        stats: TagStats
+        stats: TagStats,
+        updates: Dict[str, List[Tuple[str, str]]],
     ) -> bool:
-        """Tag a single file with inferred categories.
+        """Infer categories for a single file and queue its column updates.
 
         Args:
-            file_record: File to tag
+            file_row: Row with the file's id, path, type and tag columns
             overwrite: Overwrite existing values
-            dry_run: Don't actually update
             stats: Stats object to update
+            updates: Pending (file id, value) pairs per column, appended to
 
         Returns:
-            True if file was updated, False if skipped
+            True if any tag would be set, False if skipped
         """
         # Check if file already has all values and overwrite not set
-        has_device = file_record.device is not None
-        has_exposure = file_record.exposure is not None
-        has_sample_type = file_record.sample_type is not None
-        has_platform = file_record.platform is not None
-
-        if not overwrite and all([has_device, has_exposure, has_sample_type, has_platform]):
-            logger.debug(f"Skipping {file_record.filename}: already tagged")
+        if not overwrite and all(getattr(file_row, column) is not None for column in TAG_COLUMNS):
+            logger.debug(f"Skipping {file_row.filename}: already tagged")
             return False
 
         # Infer tags
         tags = infer_all_tags(
-            path_rel=file_record.path_rel,
-            filename=file_record.filename,
-            detected_type=file_record.detected_type
+            path_rel=file_row.path_rel,
+            filename=file_row.filename,
+            detected_type=file_row.detected_type
         )
 
         # Record warnings
         for warning in tags.warnings:
-            warning_msg = f"{file_record.filename}: {warning}"
+            warning_msg = f"{file_row.filename}: {warning}"
             stats.warnings.append(warning_msg)
             logger.warning(warning_msg)
 
-        # Track what we're updating
+        # Queue each inferred value that is new, or replaces one under --overwrite
         updated = False
-
-        # Update device
-        if tags.device is not None:
-            if overwrite or not has_device:
-                if not dry_run:
-                    file_record.device = tags.device
-                stats.device_set += 1
-                updated = True
-                logger.debug(f"{file_record.filename}: device -> {tags.device}")
-
-        # Update exposure
-        if tags.exposure is not None:
-            if overwrite or not has_exposure:
-                if not dry_run:
-                    file_record.exposure = tags.exposure
-                stats.exposure_set += 1
-                updated = True
-                logger.debug(f"{file_record.filename}: exposure -> {tags.exposure}")
-
-        # Update sample_type
-        if tags.sample_type is not None:
-            if overwrite or not has_sample_type:
-                if not dry_run:
-                    file_record.sample_type = tags.sample_type
-                stats.sample_type_set += 1
-                updated = True
-                logger.debug(f"{file_record.filename}: sample_type -> {tags.sample_type}")
-
-        # Update platform
-        if tags.platform is not None:
-            if overwrite or not has_platform:
-                if not dry_run:
-                    file_record.platform = tags.platform
-                stats.platform_set += 1
-                updated = True
-                logger.debug(f"{file_record.filename}: platform -> {tags.platform}")
+        for column in TAG_COLUMNS:
+            value = getattr(tags, column)
+            if value is None or not (overwrite or getattr(file_row, column) is None):
+                continue
+            updates[column].append((str(file_row.id), value))
+            setattr(stats, f"{column}_set", getattr(stats, f"{column}_set") + 1)
+            updated = True
+            logger.debug(f"{file_row.filename}: {column} -> {value}")
 
         return updated
@@ -0,0 +1,368 @@
+"""Set-based helpers for bulk data changes (backfills, loads).
+
+PostgreSQL per-statement overhead dominates at small batch sizes, while
+gains flatten out past roughly 10k rows per statement, so the helpers here
+default to 10k-row batches.
+
+In Alembic migrations, call them inside ``op.get_context().autocommit_block()``
+so each batch commits on its own and locks/WAL stay bounded.
+"""
+
+import io
+import math
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+DEFAULT_BATCH_SIZE = 10_000
+
+
+def keyset_ranges(
+    conn: Connection,
+    table: str,
+    key: str = "id",
+    key_type: str = "uuid",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[Tuple[Optional[str], Optional[str]]]:
+    """Yield key ranges that split a table into batches of batch_size rows.
+
+    Each range is (lower, upper) as text: lower is exclusive, upper is
+    inclusive, None means unbounded. The next bound is found with an index
+    scan on key, so the table is never rescanned from the start.
+
+    Args:
+        conn: Database connection
+        table: Table to split
+        key: Unique, indexed key column
+        key_type: SQL type of key (used to cast the text bounds)
+        batch_size: Rows per range
+
+    Yields:
+        (lower, upper) bounds
+    """
+    lower = None
+    query = text(f"""
+        SELECT {key}::text FROM {table}
+        WHERE (CAST(:lower AS {key_type}) IS NULL OR {key} > CAST(:lower AS {key_type}))
+        ORDER BY {key}
+        OFFSET :offset LIMIT 1
+    """)
+
+    while True:
+        upper = conn.execute(query, {"lower": lower, "offset": batch_size - 1}).scalar()
+        yield lower, upper
+        if upper is None:
+            return
+        lower = upper
+
+
+def batched_execute(
+    conn: Connection,
+    table: str,
+    statement: str,
+    key: str = "id",
+    key_type: str = "uuid",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Run an UPDATE/DELETE once per keyset range of a table.
+
+    The statement must contain a ``{range}`` placeholder where the range
+    predicate on key belongs, e.g.
+    ``"UPDATE files SET x = lower(y) WHERE {range}"``.
+
+    Args:
+        conn: Database connection
+        table: Table whose key drives the batches
+        statement: SQL with a {range} placeholder
+        key: Unique, indexed key column
+        key_type: SQL type of key
+        batch_size: Rows per batch
+
+    Returns:
+        Total number of rows affected
+    """
+    predicate = (
+        f"(CAST(:lower AS {key_type}) IS NULL OR {key} > CAST(:lower AS {key_type})) "
+        f"AND (CAST(:upper AS {key_type}) IS NULL OR {key} <= CAST(:upper AS {key_type}))"
+    )
+    batch = text(statement.format(range=predicate))
+
+    total = 0
+    for lower, upper in keyset_ranges(conn, table, key, key_type, batch_size):
+        total += conn.execute(batch, {"lower": lower, "upper": upper}).rowcount
+    return total
+
+
+def batched_update(
+    conn: Connection,
+    table: str,
+    key: str,
+    column: str,
+    updates: Iterable[Tuple[Any, Any]],
+    key_type: str = "bigint",
+    value_type: str = "text",
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Apply (key, value) updates from Python with one statement per batch.
+
+    Each batch is sent as two arrays and joined via unnest(), instead of one
+    UPDATE per row.
+
+    Args:
+        conn: Database connection
+        table: Table to update
+        key: Key column matched against the first tuple element
+        column: Column set from the second tuple element
+        updates: Iterable of (key, value) pairs
+        key_type: SQL type of key
+        value_type: SQL type of column
+        batch_size: Rows per statement
+
+    Returns:
+        Total number of rows updated
+    """
+    statement = text(f"""
+        UPDATE {table} AS t SET {column} = u.value
+        FROM unnest(CAST(:keys AS {key_type}[]), CAST(:values AS {value_type}[])) AS u(key, value)
+        WHERE t.{key} = u.key
+    """)
+
+    total = 0
+    keys: list = []
+    values: list = []
+    for item_key, item_value in updates:
+        keys.append(item_key)
+        values.append(item_value)
+        if len(keys) >= batch_size:
+            total += conn.execute(statement, {"keys": keys, "values": values}).rowcount
+            keys, values = [], []
+    if keys:
+        total += conn.execute(statement, {"keys": keys, "values": values}).rowcount
+    return total
+
+
+def lookup_ids(
+    conn: Connection,
+    table: str,
+    key: str,
+    id_column: str,
+    keys: Iterable[Any],
+    known: Dict[Any, Any],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Dict[Any, Any]:
+    """Map natural keys to surrogate ids, querying only keys not yet known.
+
+    Keys are sent as one array per batch. Keys with no row in table stay
+    out of the mapping.
+
+    Args:
+        conn: Database connection
+        table: Table holding both columns
+        key: Natural key column matched against keys
+        id_column: Surrogate id column to return
+        keys: Key values to resolve (duplicates are fine)
+        known: Mapping to extend, e.g. kept across batches of one load
+        batch_size: Keys per statement
+
+    Returns:
+        known, updated in place
+    """
+    missing = list({item for item in keys if item not in known})
+    statement = text(f"SELECT {key}, {id_column} FROM {table} WHERE {key} = ANY(:keys)")
+
+    for start in range(0, len(missing), batch_size):
+        result = conn.execute(statement, {"keys": missing[start:start + batch_size]})
+        known.update(result.tuples())
+    return known
+
+
+def copy_text_value(value: Any) -> str:
+    """Format a Python value as a field of COPY ... (FORMAT text) input.
+
+    Args:
+        value: Value to format (None becomes NULL)
+
+    Returns:
+        Escaped field text
+    """
+    if value is None:
+        return "\\N"
+    if isinstance(value, float):
+        if math.isnan(value):
+            return "NaN"
+        if math.isinf(value):
+            return "Infinity" if value > 0 else "-Infinity"
+        return repr(value)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        # bytea hex input; the backslash itself is escaped for text format
+        return "\\\\x" + bytes(value).hex()
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def copy_rows(
+    conn: Connection,
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> int:
+    """Bulk-insert rows with COPY FROM STDIN.
+
+    Rows are streamed in buffers of batch_size so memory stays bounded for
+    large inputs. Requires the psycopg2 driver.
+
+    Args:
+        conn: Database connection
+        table: Target table
+        columns: Column names, in row order
+        rows: Iterable of row tuples
+        batch_size: Rows per COPY buffer
+
+    Returns:
+        Number of rows copied
+    """
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT text)"
+    cursor = conn.connection.dbapi_connection.cursor()
+
+    total = 0
+    try:
+        buffer = io.StringIO()
+        pending = 0
+        for row in rows:
+            buffer.write("\t".join(copy_text_value(value) for value in row))
+            buffer.write("\n")
+            pending += 1
+            if pending >= batch_size:
+                buffer.seek(0)
+                cursor.copy_expert(sql, buffer)
+                total += pending
+                buffer = io.StringIO()
+                pending = 0
+        if pending:
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+            total += pending
+    finally:
+        cursor.close()
+
+    return total
+
+
+def _copy_to_stage(
+    conn: Connection,
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    batch_size: int,
+) -> Tuple[str, int]:
+    """COPY rows into a session-local ``{table}_stage`` temp table.
+
+    The stage is created with exactly the given columns; callers drop it
+    when done, since callers on one pooled connection stage different
+    column sets.
+
+    Returns:
+        Tuple of (stage table name, rows copied)
+    """
+    # Schema-qualified, so the DROP can never hit a regular table
+    stage = f"pg_temp.{table}_stage"
+
+    # Typed like the target columns, without their constraints or defaults.
+    # A stage left behind by a failed autocommit run is replaced.
+    conn.execute(text(f"DROP TABLE IF EXISTS {stage}"))
+    conn.execute(text(
+        f"CREATE TEMP TABLE {stage} AS "
+        f"SELECT {', '.join(columns)} FROM {table} WITH NO DATA"
+    ))
+    return stage, copy_rows(conn, stage, columns, rows, batch_size)
+
+
+def copy_insert_ignore(
+    conn: Connection,
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    extra_columns: Optional[Mapping[str, str]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Tuple[int, int]:
+    """Bulk-insert rows with COPY, skipping rows that violate a unique index.
+
+    Rows are copied into a session-local ``{table}_stage`` temp table, then
+    moved with one ``INSERT ... SELECT ... ON CONFLICT DO NOTHING``, so
+    triggers on table still fire per row. Requires the psycopg2 driver.
+
+    Args:
+        conn: Database connection
+        table: Target table
+        columns: Column names, in row order
+        rows: Iterable of row tuples
+        extra_columns: Further target columns mapped to SQL expressions
+            (e.g. ``{"created_at": "now()"}``)
+        batch_size: Rows per COPY buffer
+
+    Returns:
+        Tuple of (rows copied, rows inserted)
+    """
+    extra = extra_columns or {}
+    stage, copied = _copy_to_stage(conn, table, columns, rows, batch_size)
+
+    target = ", ".join([*columns, *extra])
+    source = ", ".join([*columns, *extra.values()])
+    inserted = conn.execute(text(
+        f"INSERT INTO {table} ({target}) SELECT {source} FROM {stage} ON CONFLICT DO NOTHING"
+    )).rowcount
+    conn.execute(text(f"DROP TABLE {stage}"))
+
+    return copied, inserted
+
+
+def copy_upsert(
+    conn: Connection,
+    table: str,
+    columns: Sequence[str],
+    rows: Iterable[Sequence[Any]],
+    conflict_columns: Sequence[str],
+    updates: Mapping[str, str],
+    extra_columns: Optional[Mapping[str, str]] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Tuple[int, int]:
+    """Bulk-upsert rows with COPY.
+
+    Like copy_insert_ignore, but rows that conflict on conflict_columns
+    update the existing row instead of being skipped. The rows must not
+    repeat a conflict key, or PostgreSQL rejects the whole statement.
+
+    Args:
+        conn: Database connection
+        table: Target table
+        columns: Column names, in row order
+        rows: Iterable of row tuples
+        conflict_columns: Columns of the unique index to upsert on
+        updates: Columns to set on conflict, mapped to SQL expressions
+            (e.g. ``{"value": "COALESCE(EXCLUDED.value, measurements.value)"}``)
+        extra_columns: Further target columns mapped to SQL expressions
+        batch_size: Rows per COPY buffer
+
+    Returns:
+        Tuple of (rows copied, rows inserted or updated)
+    """
+    extra = extra_columns or {}
+    stage, copied = _copy_to_stage(conn, table, columns, rows, batch_size)
+
+    target = ", ".join([*columns, *extra])
+    source = ", ".join([*columns, *extra.values()])
+    assignments = ", ".join(f"{column} = {value}" for column, value in updates.items())
+    affected = conn.execute(text(
+        f"INSERT INTO {table} ({target}) SELECT {source} FROM {stage} "
+        f"ON CONFLICT ({', '.join(conflict_columns)}) DO UPDATE SET {assignments}"
+    )).rowcount
+    conn.execute(text(f"DROP TABLE {stage}"))
+
+    return copied, affected
@@ -1,15 +1,150 @@
 """Streaming SHA256 hash calculation for files."""
 
+import contextlib
 import hashlib
+import mmap
+import os
+import queue
+import stat
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
+from typing import Iterator, Optional, Sequence, Tuple
 
+# Read size for streaming hashes; large reads keep per-call overhead small
+CHUNK_SIZE = 1024 * 1024
 
-def calculate_sha256(file_path: Path, chunk_size: int = 8192) -> str:
+# Files at least this large are hashed from a read-only memory map, which
+# skips the copy into a user-space buffer
+MMAP_THRESHOLD = 100 * 1024 * 1024
+
+# Default hashing threads: hashlib releases the GIL on large buffers and
+# reads wait on storage, so more threads than CPUs keep slow disks busy
+HASH_WORKERS = min(32, (os.cpu_count() or 1) * 4)
+
+
+def calculate_sha256_digest(
+    file_path: Path,
+    chunk_size: int = CHUNK_SIZE,
+    read_ahead: bool = False,
+) -> bytes:
+    """Calculate the raw 32-byte SHA256 digest of a file using streaming.
+
+    This is the form stored in files.sha256 (BYTEA). The file is read
+    unbuffered into one reused buffer, so memory stays at chunk_size
+    regardless of file size; files of MMAP_THRESHOLD bytes or more are
+    hashed straight from a read-only memory map instead.
+
+    Args:
+        file_path: Path to the file
+        chunk_size: Size of chunks to read (default 1 MiB)
+        read_ahead: Read the next chunk in a background thread while the
+            current one is hashed (for files larger than one chunk)
+
+    Returns:
+        SHA256 digest bytes
+
+    Raises:
+        FileNotFoundError: If file does not exist
+        PermissionError: If file cannot be read
+    """
+    try:
+        st = file_path.stat()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"File not found: {file_path}") from None
+
+    if not stat.S_ISREG(st.st_mode):
+        raise ValueError(f"Path is not a file: {file_path}")
+
+    if st.st_size >= MMAP_THRESHOLD:
+        return _sha256_mmap(file_path, chunk_size)
+    if read_ahead and st.st_size > chunk_size:
+        return _sha256_read_ahead(file_path, chunk_size)
+    
+    # Content fingerprint for deduplication, not a security use; this keeps
+    # hashing available on FIPS-restricted OpenSSL builds
+    sha256_hash = hashlib.sha256(usedforsecurity=False)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    
+    with open(file_path, "rb", buffering=0) as f:
+        if hasattr(os, "posix_fadvise"):
+            # Read-ahead hint only; ignore filesystems that reject it
+            with contextlib.suppress(OSError):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+        while size := f.readinto(buffer):
+            sha256_hash.update(view[:size])
+    
+    return sha256_hash.digest()
+
+
+def _sha256_mmap(file_path: Path, chunk_size: int) -> bytes:
+    """Calculate the SHA256 digest of a large file from a memory map."""
+    sha256_hash = hashlib.sha256(usedforsecurity=False)
+
+    with open(file_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if hasattr(mm, "madvise"):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        with memoryview(mm) as view:
+            for offset in range(0, len(view), chunk_size):
+                sha256_hash.update(view[offset:offset + chunk_size])
+
+    return sha256_hash.digest()
+
+
+def _sha256_read_ahead(file_path: Path, chunk_size: int) -> bytes:
+    """Calculate the SHA256 digest of a file, overlapping reads with hashing.
+
+    A reader thread fills two buffers in turn while the calling thread
+    hashes the other one; both file reads and hashlib release the GIL.
+    """
+    sha256_hash = hashlib.sha256(usedforsecurity=False)
+    free: queue.Queue = queue.Queue()
+    filled: queue.Queue = queue.Queue()
+    for _ in range(2):
+        free.put(bytearray(chunk_size))
+
+    with open(file_path, "rb", buffering=0) as f:
+        reader = threading.Thread(target=_fill_buffers, args=(f, free, filled), daemon=True)
+        reader.start()
+        while True:
+            item = filled.get()
+            if isinstance(item, BaseException):
+                raise item
+            buffer, size = item
+            if not size:
+                break
+            with memoryview(buffer) as view:
+                sha256_hash.update(view[:size])
+            free.put(buffer)
+        reader.join()
+
+    return sha256_hash.digest()
+
+
+def _fill_buffers(f, free: queue.Queue, filled: queue.Queue) -> None:
+    """Read a file into buffers taken from free and hand them to filled.
+
+    Ends with a zero-size item at EOF, or the exception if a read fails.
+    """
+    try:
+        while True:
+            buffer = free.get()
+            size = f.readinto(buffer)
+            filled.put((buffer, size))
+            if not size:
+                return
+    except BaseException as e:
+        filled.put(e)
+
+
+def calculate_sha256(file_path: Path, chunk_size: int = CHUNK_SIZE) -> str:
     """Calculate SHA256 hash of a file using streaming to avoid loading entire file into memory.
     
     Args:
         file_path: Path to the file
-        chunk_size: Size of chunks to read (default 8KB)
+        chunk_size: Size of chunks to read (default 1 MiB)
         
     Returns:
         Hexadecimal SHA256 hash string
@@ -18,16 +153,31 @@ def calculate_sha256(file_path: Path, chunk_size: int = 8192) -> str:
         FileNotFoundError: If file does not exist
         PermissionError: If file cannot be read
     """
-    if not file_path.exists():
-        raise FileNotFoundError(f"File not found: {file_path}")
-    
-    if not file_path.is_file():
-        raise ValueError(f"Path is not a file: {file_path}")
-    
-    sha256_hash = hashlib.sha256()
-    
-    with open(file_path, "rb") as f:
-        while chunk := f.read(chunk_size):
-            sha256_hash.update(chunk)
-    
-    return sha256_hash.hexdigest()
+    return calculate_sha256_digest(file_path, chunk_size).hex()
+
+
+def calculate_sha256_digests(
+    file_paths: Sequence[Path],
+    max_workers: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[Tuple[Path, bytes]]:
+    """Calculate SHA256 digests of several files in a thread pool.
+
+    hashlib releases the GIL while hashing large buffers, so threads hash
+    files in parallel.
+
+    Args:
+        file_paths: Files to hash
+        max_workers: Number of threads (default: HASH_WORKERS)
+        chunk_size: Size of chunks to read (default 1 MiB)
+
+    Yields:
+        (path, digest) pairs in the order of file_paths
+
+    Raises:
+        FileNotFoundError: If a file does not exist
+        PermissionError: If a file cannot be read
+    """
+    with ThreadPoolExecutor(max_workers=max_workers or HASH_WORKERS) as executor:
+        digests = executor.map(partial(calculate_sha256_digest, chunk_size=chunk_size), file_paths)
+        yield from zip(file_paths, digests)
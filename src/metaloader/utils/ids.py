@@ -0,0 +1,26 @@
+"""Identifier generation utilities."""
+
+import os
+import time
+import uuid
+
+
+def uuid7() -> uuid.UUID:
+    """Generate a time-ordered UUID (version 7, RFC 9562).
+
+    The first 48 bits hold the Unix timestamp in milliseconds, so values
+    generated in sequence sort (and land in B-tree indexes) in insertion
+    order. The remaining bits are random.
+
+    Returns:
+        New UUIDv7
+    """
+    unix_ts_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+
+    value = ((unix_ts_ms & 0xFFFF_FFFF_FFFF) << 80) | rand
+    # Version 7 in bits 48-51, RFC 4122 variant (0b10) in bits 64-65
+    value = (value & ~(0xF << 76)) | (0x7 << 76)
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)
+
+    return uuid.UUID(int=value)
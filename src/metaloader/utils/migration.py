@@ -0,0 +1,25 @@
+"""Helpers for Alembic migration scripts."""
+
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+from alembic import op
+from metaloader.config import config
+
+
+@contextmanager
+def statement_timeout(value: Optional[str] = None) -> Iterator[None]:
+    """Temporarily change statement_timeout for long-running migration work.
+
+    Meant for CONCURRENTLY index builds and constraint validation on large
+    tables, which can legitimately outlast MIGRATION_STATEMENT_TIMEOUT. The
+    regular timeout is restored afterwards. Works in offline (--sql) mode.
+
+    Args:
+        value: Timeout to use (default: MIGRATION_LONG_STATEMENT_TIMEOUT)
+    """
+    op.execute(f"SET statement_timeout = '{value or config.migration_long_statement_timeout}'")
+    try:
+        yield
+    finally:
+        op.execute(f"SET statement_timeout = '{config.migration_statement_timeout}'")
@@ -0,0 +1,59 @@
+"""Concurrent directory scanning."""
+
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def scan_files(directory: Path, max_workers: Optional[int] = None) -> Iterator[os.DirEntry]:
+    """Yield the regular files below a directory, recursively.
+
+    Each directory is listed with os.scandir in a pool of threads, so
+    listings on high-latency filesystems overlap. Like Path.rglob, symlinked
+    files are included but symlinked directories are not descended into,
+    and unreadable directories are skipped. Files come out in no particular
+    order; closing the iterator early stops the scan.
+
+    Args:
+        directory: Root directory to scan
+        max_workers: Number of threads (default: ThreadPoolExecutor default)
+
+    Yields:
+        os.DirEntry for each file
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {executor.submit(_scan_dir, os.fspath(directory))}
+        try:
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    subdirs, files = future.result()
+                    pending.update(executor.submit(_scan_dir, subdir) for subdir in subdirs)
+                    yield from files
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+def _scan_dir(path: str) -> Tuple[List[str], List[os.DirEntry]]:
+    """List one directory, split into subdirectory paths and file entries."""
+    subdirs: List[str] = []
+    files: List[os.DirEntry] = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                try:
+                    # File types come from the directory listing, no stat needed
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file():
+                        files.append(entry)
+                except OSError:
+                    continue
+    except OSError as e:
+        logger.debug(f"Skipping unreadable directory {path}: {e}")
+    return subdirs, files
@@ -55,6 +55,11 @@ NMR_PATTERNS = [
     r'/NMR/',
 ]
 
+# Each pattern list compiled once as a single alternation
+_GC_RE = re.compile('|'.join(GC_PATTERNS), re.IGNORECASE)
+_NMR_RE = re.compile('|'.join(NMR_PATTERNS), re.IGNORECASE)
+_LCMS_RE = re.compile(r'\bLC[-_\s]?MS\b|\bLCMS\b|\bHPLC\b|\bUPLC\b|\bUHPLC\b', re.IGNORECASE)
+
 
 def infer_device(
     path_rel: Optional[str],
@@ -93,25 +98,22 @@ def infer_device(
     # 2. Check detected_type for MS
     if detected_type in MS_DETECTED_TYPES:
         # Check for GC-MS patterns
-        for pattern in GC_PATTERNS:
-            if re.search(pattern, combined, re.IGNORECASE):
-                return 'GCMS'
+        if _GC_RE.search(combined):
+            return 'GCMS'
         # Default to LC-MS for MS files
         return 'LCMS'
 
     # 3. Fallback: check path/filename patterns
     # Check NMR patterns
-    for pattern in NMR_PATTERNS:
-        if re.search(pattern, combined, re.IGNORECASE):
-            return 'NMR'
+    if _NMR_RE.search(combined):
+        return 'NMR'
 
     # Check GC patterns
-    for pattern in GC_PATTERNS:
-        if re.search(pattern, combined, re.IGNORECASE):
-            return 'GCMS'
+    if _GC_RE.search(combined):
+        return 'GCMS'
 
     # Check generic MS/LC patterns
-    if re.search(r'\bLC[-_\s]?MS\b|\bLCMS\b|\bHPLC\b|\bUPLC\b|\bUHPLC\b', combined, re.IGNORECASE):
+    if _LCMS_RE.search(combined):
         return 'LCMS'
 
     return None
@@ -145,6 +147,11 @@ SAMPLE_TYPE_PATTERNS = {
     ],
 }
 
+_SAMPLE_TYPE_RES = tuple(
+    (sample_type, re.compile('|'.join(patterns), re.IGNORECASE))
+    for sample_type, patterns in SAMPLE_TYPE_PATTERNS.items()
+)
+
 
 def infer_sample_type(
     path_rel: Optional[str],
@@ -164,10 +171,9 @@ def infer_sample_type(
     filename = (filename or '').lower()
     combined = f"{path_rel} {filename}"
 
-    for sample_type, patterns in SAMPLE_TYPE_PATTERNS.items():
-        for pattern in patterns:
-            if re.search(pattern, combined, re.IGNORECASE):
-                return sample_type
+    for sample_type, regex in _SAMPLE_TYPE_RES:
+        if regex.search(combined):
+            return sample_type
 
     return None
 
@@ -198,6 +204,9 @@ CON_PATTERNS = [
     r'\blow[-_\s]?BMI\b',
 ]
 
+_OB_RE = re.compile('|'.join(OB_PATTERNS), re.IGNORECASE)
+_CON_RE = re.compile('|'.join(CON_PATTERNS), re.IGNORECASE)
+
 
 def infer_exposure(
     path_rel: Optional[str],
@@ -219,8 +228,8 @@ def infer_exposure(
     filename = (filename or '').lower()
     combined = f"{path_rel} {filename}"
 
-    has_ob = any(re.search(p, combined, re.IGNORECASE) for p in OB_PATTERNS)
-    has_con = any(re.search(p, combined, re.IGNORECASE) for p in CON_PATTERNS)
+    has_ob = _OB_RE.search(combined) is not None
+    has_con = _CON_RE.search(combined) is not None
 
     if has_ob and has_con:
         # Conflict - both found
@@ -273,6 +282,11 @@ PLATFORM_PATTERNS = [
     (r'\bHPLC\b', 'HPLC'),
 ]
 
+# Kept one regex per pattern: the order of matches sets the platform string
+_PLATFORM_RES = tuple(
+    (re.compile(pattern, re.IGNORECASE), name) for pattern, name in PLATFORM_PATTERNS
+)
+
 
 def infer_platform(
     path_rel: Optional[str],
@@ -296,8 +310,8 @@ def infer_platform(
 
     found_platforms = []
 
-    for pattern, platform_name in PLATFORM_PATTERNS:
-        if re.search(pattern, combined, re.IGNORECASE):
+    for regex, platform_name in _PLATFORM_RES:
+        if regex.search(combined):
             if platform_name not in found_platforms:
                 found_platforms.append(platform_name)
 
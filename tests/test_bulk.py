@@ -0,0 +1,136 @@
+"""Tests for bulk data helpers."""
+
+import re
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from metaloader.utils.bulk import copy_insert_ignore, copy_text_value, copy_upsert, lookup_ids
+
+
+class TestCopyTextValue:
+    """Tests for copy_text_value function."""
+
+    def test_none_is_null(self):
+        """Test that None becomes the COPY NULL marker."""
+        assert copy_text_value(None) == "\\N"
+
+    def test_special_characters_escaped(self):
+        """Test that backslash, tab and newlines are escaped."""
+        assert copy_text_value("a\tb\nc\rd\\e") == "a\\tb\\nc\\rd\\\\e"
+
+    def test_special_floats(self):
+        """Test that NaN and infinities use PostgreSQL spellings."""
+        assert copy_text_value(float("nan")) == "NaN"
+        assert copy_text_value(float("inf")) == "Infinity"
+        assert copy_text_value(float("-inf")) == "-Infinity"
+
+    def test_float_round_trips(self):
+        """Test that floats keep full precision."""
+        assert float(copy_text_value(0.1 + 0.2)) == 0.1 + 0.2
+
+    def test_bytes_as_bytea_hex(self):
+        """Test that bytes are written as escaped bytea hex input."""
+        assert copy_text_value(b"\x01\xff") == "\\\\x01ff"
+
+    def test_uuid_and_int(self):
+        """Test that other values use their string form."""
+        value = uuid.UUID("12345678-1234-5678-1234-567812345678")
+        assert copy_text_value(value) == "12345678-1234-5678-1234-567812345678"
+        assert copy_text_value(42) == "42"
+
+
+class FakeConnection:
+    """Stands in for a pooled connection, tracking temp table columns."""
+
+    def __init__(self):
+        self.tables = {}
+        self.connection = SimpleNamespace(dbapi_connection=self)
+
+    def execute(self, statement):
+        sql = " ".join(str(statement).split())
+        if match := re.match(r"DROP TABLE (IF EXISTS )?(\S+)", sql):
+            if not match.group(1) and match.group(2) not in self.tables:
+                raise RuntimeError(f"table {match.group(2)} does not exist")
+            self.tables.pop(match.group(2), None)
+        elif match := re.match(
+            r"CREATE TEMP TABLE (IF NOT EXISTS )?(\S+) AS SELECT (.+) FROM", sql
+        ):
+            self.tables.setdefault(match.group(2), match.group(3).split(", "))
+        return SimpleNamespace(rowcount=0)
+
+    def cursor(self):
+        return self
+
+    def copy_expert(self, sql, buffer):
+        table, columns = re.match(r"COPY (\S+) \((.+?)\)", sql).groups()
+        for column in columns.split(", "):
+            if column not in self.tables[table]:
+                raise RuntimeError(f"column {column} of relation {table} does not exist")
+
+    def close(self):
+        pass
+
+
+class TestCopyStage:
+    """Tests for the COPY staging table."""
+
+    @pytest.mark.parametrize("first, second", [(7, 4), (4, 7)])
+    def test_column_sets_share_connection(self, first, second):
+        """Test that callers staging different columns can share a connection."""
+        columns = ("sample_uid", "feature_uid", "value", "unit", "file_id", "col_index",
+                   "replicate_ix")
+        conn = FakeConnection()
+
+        for count in (first, second):
+            row = [None] * count
+            copy_insert_ignore(conn, "measurements", columns[:count], [row])
+            copy_upsert(
+                conn, "measurements", columns[:count], [row],
+                conflict_columns=("sample_uid", "feature_uid"), updates={"value": "1"},
+            )
+
+        assert conn.tables == {}
+
+
+class LookupConnection:
+    """Stands in for a connection, answering key lookups from a dict."""
+
+    def __init__(self, ids):
+        self.ids = ids
+        self.queried = []
+
+    def execute(self, statement, params):
+        self.queried.append(sorted(params["keys"]))
+        rows = [(key, self.ids[key]) for key in params["keys"] if key in self.ids]
+        return SimpleNamespace(tuples=lambda: rows)
+
+
+class TestLookupIds:
+    """Tests for lookup_ids function."""
+
+    def test_only_unknown_keys_queried(self):
+        """Test that known and repeated keys are not sent again."""
+        conn = LookupConnection({"a": 1, "b": 2, "c": 3})
+        known = {"a": 1}
+
+        result = lookup_ids(conn, "samples", "sample_uid", "sample_id", ["a", "b", "b", "c"], known)
+
+        assert result is known
+        assert known == {"a": 1, "b": 2, "c": 3}
+        assert conn.queried == [["b", "c"]]
+
+    def test_missing_keys_left_out(self):
+        """Test that keys without a row are not mapped."""
+        conn = LookupConnection({"a": 1})
+
+        assert lookup_ids(conn, "samples", "sample_uid", "sample_id", ["a", "x"], {}) == {"a": 1}
+
+    def test_batches(self):
+        """Test that keys are sent in batches of batch_size."""
+        conn = LookupConnection({})
+
+        lookup_ids(conn, "features", "feature_uid", "feature_id", "abcde", {}, batch_size=2)
+
+        assert sorted(len(keys) for keys in conn.queried) == [1, 2, 2]
@@ -5,7 +5,11 @@ from pathlib import Path
 
 import pytest
 
-from metaloader.utils.hashing import calculate_sha256
+from metaloader.utils.hashing import (
+    calculate_sha256,
+    calculate_sha256_digest,
+    calculate_sha256_digests,
+)
 
 
 def test_calculate_sha256_small_file():
@@ -87,3 +91,84 @@ def test_calculate_sha256_consistency():
         assert hash1 == hash2
     finally:
         temp_path.unlink()
+
+
+def test_calculate_sha256_digest_matches_hex():
+    """Test that the raw digest is the 32-byte form of the hex hash."""
+    content = b"Hello, World!"
+
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        f.write(content)
+        temp_path = Path(f.name)
+
+    try:
+        digest = calculate_sha256_digest(temp_path)
+        assert isinstance(digest, bytes)
+        assert len(digest) == 32
+        assert digest.hex() == calculate_sha256(temp_path)
+    finally:
+        temp_path.unlink()
+
+
+def test_calculate_sha256_small_chunks():
+    """Test that the chunk size does not change the result."""
+    content = bytes(range(256)) * 100
+
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        f.write(content)
+        temp_path = Path(f.name)
+
+    try:
+        assert calculate_sha256(temp_path, chunk_size=7) == calculate_sha256(temp_path)
+    finally:
+        temp_path.unlink()
+
+
+def test_calculate_sha256_digests_in_order():
+    """Test that parallel hashing yields digests in input order."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        paths = []
+        for i in range(5):
+            path = Path(temp_dir) / f"file_{i}.txt"
+            path.write_bytes(f"content {i}".encode() * (i + 1))
+            paths.append(path)
+
+        results = list(calculate_sha256_digests(paths, max_workers=3))
+
+        assert [path for path, _ in results] == paths
+        for path, digest in results:
+            assert digest == calculate_sha256_digest(path)
+
+
+def test_calculate_sha256_mmap_matches_streaming(monkeypatch):
+    """Test that large files hashed via mmap give the streaming result."""
+    from metaloader.utils import hashing
+
+    content = bytes(range(256)) * 1000
+
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        f.write(content)
+        temp_path = Path(f.name)
+
+    try:
+        expected = calculate_sha256_digest(temp_path)
+        monkeypatch.setattr(hashing, "MMAP_THRESHOLD", 1024)
+        assert calculate_sha256_digest(temp_path, chunk_size=4096) == expected
+    finally:
+        temp_path.unlink()
+
+
+def test_calculate_sha256_read_ahead_matches_streaming():
+    """Test that hashing with a reader thread gives the streaming result."""
+    content = bytes(range(256)) * 1000
+
+    with tempfile.NamedTemporaryFile(delete=False) as f:
+        f.write(content)
+        temp_path = Path(f.name)
+
+    try:
+        expected = calculate_sha256_digest(temp_path)
+        assert calculate_sha256_digest(temp_path, chunk_size=4096, read_ahead=True) == expected
+        assert calculate_sha256_digest(temp_path, chunk_size=7, read_ahead=True) == expected
+    finally:
+        temp_path.unlink()
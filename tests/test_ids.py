@@ -0,0 +1,37 @@
+"""Tests for identifier generation utilities."""
+
+import time
+import uuid
+
+from metaloader.utils.ids import uuid7
+
+
+class TestUuid7:
+    """Tests for uuid7 function."""
+
+    def test_version_and_variant(self):
+        """Test that generated UUIDs are version 7 with RFC 4122 variant."""
+        value = uuid7()
+        assert isinstance(value, uuid.UUID)
+        assert value.version == 7
+        assert value.variant == uuid.RFC_4122
+
+    def test_timestamp_prefix(self):
+        """Test that the first 48 bits hold the current Unix time in ms."""
+        before = time.time_ns() // 1_000_000
+        value = uuid7()
+        after = time.time_ns() // 1_000_000
+
+        assert before <= value.int >> 80 <= after
+
+    def test_time_ordered(self):
+        """Test that UUIDs from different milliseconds sort in creation order."""
+        first = uuid7()
+        time.sleep(0.002)
+        second = uuid7()
+        assert first < second
+
+    def test_unique(self):
+        """Test that generated UUIDs are unique."""
+        values = {uuid7() for _ in range(1000)}
+        assert len(values) == 1000
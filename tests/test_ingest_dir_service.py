@@ -0,0 +1,50 @@
+"""Tests for directory ingestion helpers."""
+
+import hashlib
+import tempfile
+from pathlib import Path
+
+from metaloader.services.ingest_dir_service import IngestDirService, IngestDirStats, _hash_file
+
+
+class TestHashFile:
+    """Tests for hashing files in worker threads."""
+
+    def test_returns_digest(self):
+        """Test that the raw SHA256 digest is returned with no error."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file_path = Path(tmpdir) / "study.txt"
+            file_path.write_bytes(b"MS_METABOLITE_DATA_START")
+
+            digest, error = _hash_file(file_path)
+
+        assert digest == hashlib.sha256(b"MS_METABOLITE_DATA_START").digest()
+        assert error is None
+
+    def test_returns_error(self):
+        """Test that errors are returned instead of raised."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            digest, error = _hash_file(Path(tmpdir))
+
+        assert digest is None
+        assert isinstance(error, ValueError)
+
+
+class TestCollectFiles:
+    """Tests for collecting files to ingest."""
+
+    def test_max_files_takes_first_paths_in_order(self):
+        """Test that max_files picks the same sorted subset on every run."""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            root = Path(tmpdir)
+            for sub in ("c", "a", "b"):
+                (root / sub).mkdir()
+                for name in ("2.txt", "1.txt", "skip.raw"):
+                    (root / sub / name).write_text("x")
+
+            stats = IngestDirStats()
+            files = IngestDirService(None)._collect_files(root, {".txt"}, 4, stats)
+
+        assert files == [root / "a" / "1.txt", root / "a" / "2.txt",
+                         root / "b" / "1.txt", root / "b" / "2.txt"]
+        assert stats.files_skipped == 3
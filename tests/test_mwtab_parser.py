@@ -1,5 +1,6 @@
 """Tests for mwTab parser."""
 
+import math
 import tempfile
 from pathlib import Path
 
@@ -26,6 +27,11 @@ class TestNormalization:
         result = MwTabParser.normalize_sample_label("Sample___123___Test")
         assert result == "Sample_123_Test"
 
+    def test_normalize_sample_label_non_ascii(self):
+        """Test that non-ASCII characters are replaced like other invalid ones."""
+        assert MwTabParser.normalize_sample_label(" Sample é#1  x ") == "Sample_1_x"
+        assert MwTabParser.normalize_sample_label("Échantillon-2") == "chantillon-2"
+
     def test_normalize_feature_name_basic(self):
         """Test basic feature name normalization."""
         result = MwTabParser.normalize_feature_name("  Glucose  ")
@@ -181,14 +187,86 @@ MS_METABOLITE_DATA_END
             # Check metabolites
             assert len(result.metabolites) == 2
             assert result.metabolites[0].metabolite_name == "Glucose"
-            assert result.metabolites[0].values["Sample1"] == 100.5
-            assert result.metabolites[0].values["Sample2"] == 200.3
+            assert result.metabolites[0].values[0] == 100.5
+            assert result.metabolites[0].values[1] == 200.3
             assert result.metabolites[1].metabolite_name == "Lactate"
-            assert result.metabolites[1].values["Sample2"] is None  # NA
+            assert result.metabolites[1].missing[1]  # NA
 
             # Check sample columns
-            assert "Sample1" in result.sample_columns
-            assert "Sample2" in result.sample_columns
+            assert result.sample_columns == ["Sample1", "Sample2"]
+
+        finally:
+            temp_path.unlink()
+
+    def test_parse_mwtab_metabolite_values(self):
+        """Test padded, comma-separated, missing and short-row values."""
+        content = """#METABOLOMICS WORKBENCH test STUDY_ID:ST000001 ANALYSIS_ID:AN000001
+MS_METABOLITE_DATA_START
+Samples	S1	S2	S3
+Glucose	 1.5 	1,234.5	N/A
+Lactate	2
+MS_METABOLITE_DATA_END
+"""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
+            f.write(content)
+            temp_path = Path(f.name)
+
+        try:
+            result = MwTabParser(temp_path).parse()
+
+            assert result.sample_columns == ["S1", "S2", "S3"]
+            glucose, lactate = result.metabolites
+            assert glucose.values[:2].tolist() == [1.5, 1234.5]
+            assert list(glucose.missing) == [0, 0, 1]
+            assert lactate.values[0] == 2.0
+            assert list(lactate.missing) == [0, 1, 1]
+            assert result.warnings == []
+
+        finally:
+            temp_path.unlink()
+
+    def test_parse_mwtab_nan_values_kept(self):
+        """Test that literal NaN cells stay distinct from empty cells."""
+        content = """#METABOLOMICS WORKBENCH test STUDY_ID:ST000001 ANALYSIS_ID:AN000001
+MS_METABOLITE_DATA_START
+Samples	S1	S2	S3
+Glucose	NaN		NA
+MS_METABOLITE_DATA_END
+"""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
+            f.write(content)
+            temp_path = Path(f.name)
+
+        try:
+            row = MwTabParser(temp_path).parse().metabolites[0]
+
+            assert math.isnan(row.values[0])
+            assert list(row.missing) == [0, 1, 1]
+
+        finally:
+            temp_path.unlink()
+
+    def test_parse_mwtab_cr_line_endings(self):
+        """Test parsing a file with bare CR line endings."""
+        content = (
+            "#METABOLOMICS WORKBENCH test STUDY_ID:ST000001 ANALYSIS_ID:AN000001\r"
+            "MS_METABOLITE_DATA_START\r"
+            "Samples\tS1\tS2\r"
+            "Glucose\t1.5\t2.5\r"
+            "Lactate\t3\t4\r"
+            "MS_METABOLITE_DATA_END\r"
+        )
+        with tempfile.NamedTemporaryFile(mode='wb', suffix='.txt', delete=False) as f:
+            f.write(content.encode())
+            temp_path = Path(f.name)
+
+        try:
+            result = MwTabParser(temp_path).parse()
+
+            assert result.metadata.study_id == "ST000001"
+            assert result.sample_columns == ["S1", "S2"]
+            assert [m.metabolite_name for m in result.metabolites] == ["Glucose", "Lactate"]
+            assert result.metabolites[1].values.tolist() == [3.0, 4.0]
 
         finally:
             temp_path.unlink()
@@ -217,6 +295,33 @@ NM:INSTRUMENT_NAME	Bruker
         finally:
             temp_path.unlink()
 
+    def test_parse_mwtab_sections_after_metabolite_data(self):
+        """Test that sections after MS_METABOLITE_DATA_END are still parsed."""
+        content = """#METABOLOMICS WORKBENCH test STUDY_ID:ST000001 ANALYSIS_ID:AN000001
+MS_METABOLITE_DATA_START
+Samples	S1
+Glucose	1.5
+MS_METABOLITE_DATA_END
+#SUBJECT_SAMPLE_FACTORS:	SUBJECT	SAMPLE	FACTORS
+SUBJECT_SAMPLE_FACTORS	-	S1	Group:Control
+METABOLITES_START
+metabolite_name	pubchem_id
+Glucose	5793
+METABOLITES_END
+"""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
+            f.write(content)
+            temp_path = Path(f.name)
+
+        try:
+            result = MwTabParser(temp_path).parse()
+
+            assert [m.metabolite_name for m in result.metabolites] == ["Glucose"]
+            assert [s.sample_label for s in result.samples] == ["S1"]
+
+        finally:
+            temp_path.unlink()
+
     def test_parse_mwtab_inline_metadata(self):
         """Test parsing with inline STUDY_ID and ANALYSIS_ID."""
         content = """#METABOLOMICS WORKBENCH file.txt STUDY_ID:ST000315 ANALYSIS_ID:AN000501
@@ -0,0 +1,41 @@
+"""Tests for bulk parse statistics."""
+
+from metaloader.services.parse_dir_service import MAX_ERRORS, ParseDirStats
+
+
+class TestParseDirStatsMerge:
+    """Tests for combining per-file parse results."""
+
+    def test_merge_adds_counts(self):
+        """Test that counts and per-type totals are summed."""
+        total = ParseDirStats(files_total=3)
+        total.merge(ParseDirStats(
+            files_parsed=1, files_success=1, measurements_inserted=10, by_type={"mwtab": 1}
+        ))
+        total.merge(ParseDirStats(
+            files_parsed=1, files_success=1, measurements_inserted=5, by_type={"mwtab": 1}
+        ))
+
+        assert total.files_total == 3
+        assert total.files_success == 2
+        assert total.measurements_inserted == 15
+        assert total.by_type == {"mwtab": 2}
+
+    def test_merge_collects_errors(self):
+        """Test that errors from failed files are kept in order."""
+        total = ParseDirStats()
+        total.merge(ParseDirStats(files_failed=1, errors=["Error parsing a.txt: boom"]))
+        total.merge(ParseDirStats(files_failed=1, errors=["Error parsing b.txt: bad"]))
+
+        assert total.files_failed == 2
+        assert list(total.errors) == ["Error parsing a.txt: boom", "Error parsing b.txt: bad"]
+
+    def test_merge_keeps_most_recent_errors(self):
+        """Test that only the last MAX_ERRORS messages are kept, while counts stay exact."""
+        total = ParseDirStats()
+        for i in range(MAX_ERRORS + 5):
+            total.merge(ParseDirStats(files_failed=1, errors=[f"Error parsing {i}.txt: boom"]))
+
+        assert total.files_failed == MAX_ERRORS + 5
+        assert len(total.errors) == MAX_ERRORS
+        assert total.errors[0] == "Error parsing 5.txt: boom"
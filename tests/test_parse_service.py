@@ -0,0 +1,55 @@
+"""Tests for mwTab measurement batching."""
+
+import tempfile
+from pathlib import Path
+from unittest.mock import MagicMock
+
+from metaloader.parsers.mwtab import MwTabParser
+from metaloader.services import parse_service
+from metaloader.services.parse_service import ParseService
+
+
+class TestProcessMetaboliteData:
+    """Tests for building measurement batches."""
+
+    def test_repeated_sample_column_collapsed(self, monkeypatch):
+        """Test that a repeated sample column yields one row per key, last value winning."""
+        content = """#METABOLOMICS WORKBENCH test STUDY_ID:ST000001 ANALYSIS_ID:AN000001
+MS_METABOLITE_DATA_START
+Samples	S1	S2	S1
+Glucose	1	2	3
+MS_METABOLITE_DATA_END
+"""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.txt', delete=False) as f:
+            f.write(content)
+            temp_path = Path(f.name)
+
+        try:
+            result = MwTabParser(temp_path).parse()
+        finally:
+            temp_path.unlink()
+
+        def fake_lookup_ids(conn, table, key, id_column, keys, known):
+            known.update((item, index) for index, item in enumerate(sorted(set(keys)), 1))
+            return known
+
+        monkeypatch.setattr(parse_service, "lookup_ids", fake_lookup_ids)
+        service = ParseService(MagicMock())
+        service._batch_upsert_features = MagicMock(return_value=1)
+        batches = []
+
+        def fake_upsert(batch):
+            batches.append(batch)
+            return len(batch), 0
+
+        service._batch_upsert_measurements = fake_upsert
+
+        sample_uid_map = {
+            label: MwTabParser.create_sample_uid("ST000001", label) for label in ("S1", "S2")
+        }
+        service._process_metabolite_data(result, sample_uid_map, "uM")
+
+        (batch,) = batches
+        assert sorted((row[2], row[4]) for row in batch) == [
+            ("ST000001:S1", 3.0), ("ST000001:S2", 2.0)
+        ]
@@ -0,0 +1,50 @@
+"""Tests for concurrent directory scanning."""
+
+import tempfile
+from pathlib import Path
+
+from metaloader.utils.scan import scan_files
+
+
+def test_scan_files_finds_nested_files():
+    """Test that files in nested directories are all found."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        expected = set()
+        for sub in ["", "a", "a/b", "c"]:
+            (root / sub).mkdir(parents=True, exist_ok=True)
+            file_path = root / sub / "data.txt"
+            file_path.write_text("x")
+            expected.add(file_path)
+
+        found = {Path(entry.path) for entry in scan_files(root, max_workers=3)}
+
+    assert found == expected
+
+
+def test_scan_files_skips_symlinked_directories():
+    """Test that symlinked directories are not descended into."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        (root / "a").mkdir()
+        (root / "a" / "data.txt").write_text("x")
+        (root / "link").symlink_to(root / "a", target_is_directory=True)
+
+        found = [Path(entry.path) for entry in scan_files(root)]
+
+    assert found == [root / "a" / "data.txt"]
+
+
+def test_scan_files_can_stop_early():
+    """Test that closing the iterator early ends the scan."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        root = Path(temp_dir)
+        for i in range(5):
+            (root / f"d{i}").mkdir()
+            (root / f"d{i}" / "data.txt").write_text("x")
+
+        files = scan_files(root, max_workers=2)
+        first = next(files)
+        files.close()
+
+    assert first.name == "data.txt"